@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+"""Compare the activation function kernels with the former implementation."""
+
+# Core Library modules
+import timeit
+
+# Third party modules
+import numpy
+
+# First party modules
+from nntoolkit.activation_functions import Sigmoid, Softmax
+
+
+def legacy_sigmoid(x):
+    """The sigmoid implementation of nntoolkit 0.2.2."""
+    sigmoid = numpy.vectorize(lambda x: 1.0 / (1 + numpy.exp(-x)))
+    return sigmoid(x)
+
+
+def legacy_softmax(x):
+    """The softmax implementation of nntoolkit 0.2.2."""
+    return numpy.divide(numpy.exp(x), numpy.sum(numpy.exp(x)))
+
+
+def main(shapes=((1, 500), (256, 500), (1024, 2048)), repeat=5):
+    sigmoid, softmax = Sigmoid(), Softmax()
+    rng = numpy.random.RandomState(0)
+    print(
+        "{:12s} {:>14s} {:>14s} {:>14s} {:>8s}".format(
+            "kernel", "shape", "legacy [ms]", "new [ms]", "speedup"
+        )
+    )
+    for shape in shapes:
+        x = rng.uniform(-10, 10, size=shape).astype(numpy.float32)
+        out = numpy.empty_like(x)
+        cases = [
+            ("Sigmoid", legacy_sigmoid, lambda: sigmoid(x, out=out)),
+            ("Softmax", legacy_softmax, lambda: softmax(x, out=out)),
+        ]
+        for name, legacy, new in cases:
+            number = max(1, 10000 // x.size)
+            t_legacy = min(
+                timeit.repeat(lambda: legacy(x), number=number, repeat=repeat)
+            )
+            t_new = min(timeit.repeat(new, number=number, repeat=repeat))
+            print(
+                "{:12s} {:>14s} {:>14.3f} {:>14.3f} {:>7.1f}x".format(
+                    name,
+                    "x".join(map(str, shape)),
+                    1000 * t_legacy / number,
+                    1000 * t_new / number,
+                    t_legacy / t_new,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
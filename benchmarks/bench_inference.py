@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+"""Compare evaluate.get_batch_output with the compiled inference plan."""
+
+# Core Library modules
+import argparse
+import os
+import shutil
+import tempfile
+
+# Third party modules
+import numpy
+from common import best_of, parse_architecture, write_synthetic_model
+
+# First party modules
+import nntoolkit.evaluate as evaluate
+import nntoolkit.utils as utils
+from nntoolkit.inference import CompiledMLP
+
+
+def get_parser():
+    """Get the parser object for this script."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--architecture", default="784:2048:2048:10")
+    parser.add_argument("--batch-sizes", default="1,32,256,1024")
+    return parser
+
+
+def main(architecture, batch_sizes):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        model_file = os.path.join(tmpdir, "model.tar")
+        model = utils.get_model(write_synthetic_model(model_file, architecture))
+    finally:
+        shutil.rmtree(tmpdir)
+    predictor = CompiledMLP(model)
+    n_inputs = parse_architecture(architecture)[0]
+    print(
+        "{:>10s} {:>14s} {:>14s} {:>8s}".format(
+            "batch", "dicts [ms]", "compiled [ms]", "speedup"
+        )
+    )
+    for batch_size in batch_sizes:
+        x = numpy.random.uniform(size=(batch_size, n_inputs)).astype(numpy.float32)
+        t_dict = best_of(lambda: evaluate.get_batch_output(model, x), 10)
+        t_compiled = best_of(lambda: predictor.predict(x), 10)
+        print(
+            "{:>10d} {:>14.3f} {:>14.3f} {:>7.2f}x".format(
+                batch_size, 1000 * t_dict, 1000 * t_compiled, t_dict / t_compiled
+            )
+        )
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    main(args.architecture, list(map(int, args.batch_sizes.split(","))))
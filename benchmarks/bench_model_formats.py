@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""Compare the loading time of the tar and the single-file .nnt format."""
+
+# Core Library modules
+import argparse
+import os
+import shutil
+import tempfile
+
+# Third party modules
+import numpy
+from common import best_of, parse_architecture, write_synthetic_model
+
+# First party modules
+import nntoolkit.nnt as nnt
+import nntoolkit.utils as utils
+from nntoolkit.inference import CompiledMLP
+
+
+def get_parser():
+    """Get the parser object for this script."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--architecture", default="1000:8000:8000:6000:10")
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser
+
+
+def main(architecture, repeat):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        tar_file = write_synthetic_model(
+            os.path.join(tmpdir, "model.tar"), architecture
+        )
+        nnt_file = os.path.join(tmpdir, "model.nnt")
+        utils.convert_model(tar_file, nnt_file)
+        x = numpy.zeros((1, parse_architecture(architecture)[0]), numpy.float32)
+
+        def load_and_predict(load):
+            return lambda: CompiledMLP(load()).predict(x)
+
+        cases = [
+            ("tar", lambda: utils.get_model(tar_file)),
+            ("nnt (read)", lambda: nnt.read_model(nnt_file, mmap=False)),
+            ("nnt (mmap)", lambda: nnt.read_model(nnt_file)),
+        ]
+        print(f"Model: {architecture} ({os.path.getsize(tar_file) / 10**6:0.1f} MB)")
+        print("{:12s} {:>12s} {:>20s}".format("format", "load [s]", "load+predict [s]"))
+        for name, load in cases:
+            print(
+                "{:12s} {:>12.4f} {:>20.4f}".format(
+                    name, best_of(load, repeat), best_of(load_and_predict(load), repeat)
+                )
+            )
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    main(args.architecture, args.repeat)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+"""Compare loading a model from the tar file with extracting it first."""
+
+# Core Library modules
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+
+# Third party modules
+import h5py
+import yaml
+from common import best_of, write_synthetic_model
+
+# First party modules
+import nntoolkit.utils as utils
+from nntoolkit.activation_functions import get_activation_function as get_af
+
+
+def legacy_get_model(modelfile):
+    """Extract ``modelfile`` to a temporary folder and read it from there."""
+    tarfolder = utils.check_and_create_model(modelfile)
+    with open(os.path.join(tarfolder, "model.yml")) as f:
+        model_yml = yaml.safe_load(f)
+    layers = []
+    for layer in model_yml["layers"]:
+        layertmp = {}
+        for key in ["b", "W"]:
+            filename = layer[key]["filename"]
+            with h5py.File(os.path.join(tarfolder, filename), "r") as f:
+                layertmp[key] = f[filename][()]
+        layertmp["activation"] = get_af(layer["activation"])
+        layers.append(layertmp)
+    model_yml["layers"] = layers
+    input_file = os.path.join(tarfolder, "input_semantics.csv")
+    with open(input_file, newline="", encoding="utf8") as csvfile:
+        inputs = [row[0] for row in csv.reader(csvfile, delimiter="\n")]
+    model_yml["inputs"] = inputs
+    model_yml["outputs"] = utils.get_outputs(
+        os.path.join(tarfolder, "output_semantics.csv")
+    )
+    shutil.rmtree(tarfolder)
+    return model_yml
+
+
+def get_parser():
+    """Get the parser object for this script."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--architecture",
+        default="1000:8000:8000:6000:10",
+        help="MLP architecture of the synthetic model (default: ~500 MB)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser
+
+
+def main(architecture, repeat):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        model_file = write_synthetic_model(
+            os.path.join(tmpdir, "model.tar"), architecture
+        )
+        size_mb = os.path.getsize(model_file) / 10**6
+        print(f"Model: {architecture} ({size_mb:0.1f} MB)")
+        t_legacy = best_of(lambda: legacy_get_model(model_file), repeat)
+        t_new = best_of(lambda: utils.get_model(model_file), repeat)
+        print(f"extract then read: {t_legacy:8.3f}s")
+        print(f"read from tar:     {t_new:8.3f}s ({t_legacy / t_new:0.2f}x)")
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    main(args.architecture, args.repeat)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+"""Compare ranking all results with top-k selection."""
+
+# Core Library modules
+import argparse
+
+# Third party modules
+import numpy
+from common import best_of
+
+# First party modules
+import nntoolkit.evaluate as evaluate
+
+
+def legacy_get_results(model_output, output_semantics):
+    """The get_results implementation of nntoolkit 0.2.2."""
+    results = []
+    for symbolnr, prob in enumerate(model_output):
+        results.append(
+            {
+                "symbolnr": symbolnr,
+                "probability": prob,
+                "semantics": output_semantics[symbolnr],
+            }
+        )
+    return sorted(results, key=lambda x: x["probability"], reverse=True)
+
+
+def main(n_outputs, k, batch_size):
+    rng = numpy.random.RandomState(0)
+    outputs = rng.uniform(size=(batch_size, n_outputs)).astype(numpy.float32)
+    semantics = [f"symbol {i}" for i in range(n_outputs)]
+    cases = [
+        ("legacy", lambda: [legacy_get_results(o, semantics) for o in outputs]),
+        ("all", lambda: [evaluate.get_results(o, semantics) for o in outputs]),
+        (f"k={k}", lambda: [evaluate.get_results(o, semantics, k) for o in outputs]),
+        (f"batched k={k}", lambda: evaluate.get_top_k(outputs, k)),
+    ]
+    print(f"{batch_size} output vectors with {n_outputs} classes")
+    for name, function in cases:
+        print("{:>14s} {:>10.3f} ms".format(name, 1000 * best_of(function, 5)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--outputs", type=int, default=1600)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    main(args.outputs, args.k, args.batch_size)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+"""Load-test 'nntoolkit serve' with a local client."""
+
+# Core Library modules
+import argparse
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Third party modules
+import numpy
+from common import parse_architecture, write_synthetic_model
+
+# First party modules
+import nntoolkit.serve as serve
+
+
+def run_client(port, n_inputs, n_requests):
+    """Send ``n_requests`` predictions over one connection; get the latencies."""
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    body = json.dumps({"features": numpy.random.uniform(size=n_inputs).tolist()})
+    latencies = []
+    for _ in range(n_requests):
+        t0 = time.perf_counter()
+        connection.request("POST", "/models/model/predict", body)
+        connection.getresponse().read()
+        latencies.append(time.perf_counter() - t0)
+    connection.close()
+    return latencies
+
+
+def load_test(model_file, n_inputs, concurrency, n_requests, max_batch_size, max_wait):
+    model_server = serve.ModelServer({"model": model_file}, max_batch_size, max_wait)
+    server = serve.create_server(model_server, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            per_client = n_requests // concurrency
+            latencies = sum(
+                executor.map(
+                    lambda _: run_client(port, n_inputs, per_client),
+                    range(concurrency),
+                ),
+                [],
+            )
+        duration = time.perf_counter() - t0
+    finally:
+        server.shutdown()
+        server.server_close()
+        model_server.close()
+    p50, p99 = numpy.percentile(latencies, [50, 99]) * 1000
+    stats = model_server.stats()["model"]
+    print(
+        "{:>10d} {:>12d} {:>10.2f} {:>10.2f} {:>12.1f} {:>12.1f}".format(
+            max_batch_size,
+            concurrency,
+            p50,
+            p99,
+            len(latencies) / duration,
+            stats["mean_batch_size"],
+        )
+    )
+
+
+def get_parser():
+    """Get the parser object for this script."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--architecture", default="784:2048:2048:1600")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--max-batch-sizes", default="1,64")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    return parser
+
+
+def main(args):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        model_file = write_synthetic_model(
+            os.path.join(tmpdir, "model.tar"), args.architecture
+        )
+        n_inputs = parse_architecture(args.architecture)[0]
+        print(
+            "{:>10s} {:>12s} {:>10s} {:>10s} {:>12s} {:>12s}".format(
+                "max batch",
+                "concurrency",
+                "p50 [ms]",
+                "p99 [ms]",
+                "req/s",
+                "mean batch",
+            )
+        )
+        for max_batch_size in map(int, args.max_batch_sizes.split(",")):
+            for concurrency in map(int, args.concurrency.split(",")):
+                load_test(
+                    model_file,
+                    n_inputs,
+                    concurrency,
+                    args.requests,
+                    max_batch_size,
+                    args.max_wait_ms / 1000,
+                )
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main(get_parser().parse_args())
@@ -0,0 +1,105 @@
+"""Helpers to create synthetic models and datasets for the benchmarks."""
+
+# Core Library modules
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+
+# Third party modules
+import h5py
+import numpy
+import yaml
+
+
+def parse_architecture(architecture):
+    """Parse an architecture string like '784:2048:10'."""
+    return list(map(int, architecture.split(":")))
+
+
+def write_synthetic_model(model_file, architecture, dtype=numpy.float32, seed=0):
+    """
+    Write a randomly initialized MLP in the tar model format.
+
+    The layers are generated one by one, so the whole model never has to fit
+    into memory.
+    """
+    neurons = parse_architecture(architecture)
+    rng = numpy.random.RandomState(seed)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        layers = []
+        for i, (n_in, n_out) in enumerate(zip(neurons, neurons[1:])):
+            for name, shape in [
+                (f"W{i}.hdf5", (n_in, n_out)),
+                (f"b{i}.hdf5", (n_out,)),
+            ]:
+                with h5py.File(os.path.join(tmpdir, name), "w") as f:
+                    f.create_dataset(
+                        name, data=rng.uniform(-0.1, 0.1, size=shape).astype(dtype)
+                    )
+            layers.append(
+                {
+                    "W": {"size": [n_in, n_out], "filename": f"W{i}.hdf5"},
+                    "b": {"size": [n_out], "filename": f"b{i}.hdf5"},
+                    "activation": "Sigmoid",
+                }
+            )
+        layers[-1]["activation"] = "Softmax"
+        with open(os.path.join(tmpdir, "model.yml"), "w") as f:
+            yaml.dump({"type": "mlp", "layers": layers}, f, default_flow_style=False)
+        for name, n in [
+            ("input_semantics.csv", neurons[0]),
+            ("output_semantics.csv", neurons[-1]),
+        ]:
+            with open(os.path.join(tmpdir, name), "w") as f:
+                f.writelines(f"{name[:-14]} neuron {j}\n" for j in range(n))
+        with tarfile.open(model_file, "w:") as tar:
+            for name in sorted(os.listdir(tmpdir)):
+                tar.add(os.path.join(tmpdir, name), arcname=name)
+    finally:
+        shutil.rmtree(tmpdir)
+    return model_file
+
+
+def write_synthetic_dataset(
+    data_file, n_rows, n_inputs, n_outputs, seed=0, block_rows=65536, chunk_rows=1024
+):
+    """
+    Write ``n_rows`` random feature vectors with labels to an HDF5 file.
+
+    The rows are generated block by block, so large datasets never have to
+    fit into memory. With ``chunk_rows=None`` the datasets are contiguous.
+    """
+    rng = numpy.random.RandomState(seed)
+    if chunk_rows is not None:
+        chunk_rows = max(1, min(chunk_rows, n_rows))
+    with h5py.File(data_file, "w") as f:
+        x = f.create_dataset(
+            "data",
+            shape=(n_rows, n_inputs),
+            dtype=numpy.float32,
+            chunks=None if chunk_rows is None else (chunk_rows, n_inputs),
+        )
+        y = f.create_dataset(
+            "labels",
+            shape=(n_rows,),
+            dtype=numpy.int64,
+            chunks=None if chunk_rows is None else (chunk_rows,),
+        )
+        for start in range(0, n_rows, block_rows):
+            stop = min(start + block_rows, n_rows)
+            x[start:stop] = rng.uniform(-1, 1, size=(stop - start, n_inputs))
+            y[start:stop] = rng.randint(0, n_outputs, size=stop - start)
+    return data_file
+
+
+def best_of(function, repeat=3):
+    """Return the smallest wall-clock time of ``repeat`` calls of ``function``."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - t0)
+    return min(times)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+"""
+Time the hot paths of nntoolkit on a synthetic model and dataset.
+
+The results are written as JSON. With ``--baseline``, they are compared to
+an earlier run and the script exits with status 1 if a benchmark got slower
+by more than ``--threshold``.
+
+Example::
+
+    $ python benchmarks/run_suite.py -o baseline.json
+    $ python benchmarks/run_suite.py -o current.json --baseline baseline.json
+"""
+
+# Core Library modules
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Third party modules
+import numpy
+from common import (
+    best_of,
+    parse_architecture,
+    write_synthetic_dataset,
+    write_synthetic_model,
+)
+
+# First party modules
+import nntoolkit
+import nntoolkit.cache as cache
+import nntoolkit.create as create
+import nntoolkit.evaluate as evaluate
+import nntoolkit.test as test
+import nntoolkit.utils as utils
+from nntoolkit.inference import CompiledMLP
+
+
+def get_parser():
+    """Get the parser object for this script."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--architecture", default="784:2048:2048:10")
+    parser.add_argument("--batch-sizes", default="1,32,256,1024")
+    parser.add_argument(
+        "--rows", type=int, default=10000, help="rows of the synthetic dataset"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "-o", "--output", default="benchmark.json", help="write the results here"
+    )
+    parser.add_argument("--baseline", help="compare with the results of this file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown which counts as a regression",
+    )
+    return parser
+
+
+def time_cli_startup(repeat):
+    """Time ``nntoolkit --version`` in a fresh interpreter."""
+    command = [sys.executable, "-c", "import nntoolkit.cli as c; c.entry_point()"]
+    return best_of(
+        lambda: subprocess.run(
+            command + ["--version"], stdout=subprocess.DEVNULL, check=True
+        ),
+        repeat,
+    )
+
+
+def time_create(architecture, repeat):
+    """Time ``create.main``, which writes its files into the working directory."""
+    cwd = os.getcwd()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        os.chdir(tmpdir)
+
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                create.main("mlp", architecture, "model.tar")
+
+        return best_of(run, repeat)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmpdir)
+
+
+def run_suite(architecture, batch_sizes, n_rows, repeat):
+    """
+    Run all benchmarks.
+
+    Returns
+    -------
+    results : Dict[str, float]
+        Maps the benchmark name to the best time in seconds.
+    """
+    neurons = parse_architecture(architecture)
+    results = {}
+    tmpdir = tempfile.mkdtemp()
+    try:
+        model_file = write_synthetic_model(
+            os.path.join(tmpdir, "model.tar"), architecture
+        )
+        # Contiguous datasets, so the reads follow the batch size exactly
+        data_file = write_synthetic_dataset(
+            os.path.join(tmpdir, "data.hdf5"),
+            n_rows,
+            neurons[0],
+            neurons[-1],
+            chunk_rows=None,
+        )
+        results["cli_startup"] = time_cli_startup(repeat)
+        results["create.main"] = time_create(architecture, repeat)
+        results["utils.get_model"] = best_of(
+            lambda: utils.get_model(model_file), repeat
+        )
+        model = utils.get_model(model_file)
+        predictor = CompiledMLP(model)
+        rng = numpy.random.RandomState(0)
+        for batch_size in batch_sizes:
+            x = rng.uniform(-1, 1, size=(batch_size, neurons[0]))
+            results[f"evaluate.get_batch_output[batch={batch_size}]"] = best_of(
+                lambda: evaluate.get_batch_output(model, x), repeat
+            )
+            results[f"CompiledMLP.predict[batch={batch_size}]"] = best_of(
+                lambda: predictor.predict(x), repeat
+            )
+
+            def run_test():
+                # Every repeat loads the model like a new process would
+                cache.model_cache.clear()
+                test.main(model_file, data_file, verbose=False, batch_size=batch_size)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[f"test.main[batch={batch_size}]"] = best_of(run_test, repeat)
+    finally:
+        shutil.rmtree(tmpdir)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of every benchmark relative to ``baseline``.
+
+    Returns
+    -------
+    regressions : List[str]
+        The benchmarks which are slower than ``(1 + threshold) * baseline``.
+    """
+    regressions = []
+    print("{:<45s} {:>12s} {:>12s} {:>8s}".format("", "baseline", "current", ""))
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "SLOWER"
+        elif ratio < 1 - threshold:
+            flag = "faster"
+        print(
+            "{:<45s} {:>10.3f}ms {:>10.3f}ms {:>6.2f}x {}".format(
+                name, 1000 * baseline[name], 1000 * seconds, ratio, flag
+            )
+        )
+    return regressions
+
+
+def main(args):
+    batch_sizes = list(map(int, args.batch_sizes.split(",")))
+    results = run_suite(args.architecture, batch_sizes, args.rows, args.repeat)
+    report = {
+        "meta": {
+            "architecture": args.architecture,
+            "rows": args.rows,
+            "repeat": args.repeat,
+            "nntoolkit": nntoolkit.__version__,
+            "numpy": numpy.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.baseline is None:
+        for name, seconds in results.items():
+            print("{:<45s} {:>10.3f}ms".format(name, 1000 * seconds))
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["meta"]["architecture"] != args.architecture:
+        print("Warning: the baseline used a different architecture.")
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_parser().parse_args()))
@@ -1,7 +1,23 @@
 # Core Library modules
 import logging
 
+# Third party modules
+import h5py
+import numpy
+import pytest
+
 
 def pytest_configure(config):
     """Flake8 is very verbose by default. Silence it."""
     logging.getLogger("flake8").setLevel(logging.WARNING)
+
+
+@pytest.fixture
+def test_data(tmp_path):
+    """Create a small labeled data file for the model in tests/misc/model.tar."""
+    data_file = str(tmp_path / "testdata.hdf5")
+    rng = numpy.random.RandomState(0)
+    with h5py.File(data_file, "w") as f:
+        f.create_dataset("data", data=rng.uniform(-1, 1, size=(250, 167)))
+        f.create_dataset("labels", data=rng.randint(0, 369, size=250))
+    return data_file
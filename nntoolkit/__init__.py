@@ -5,20 +5,19 @@
    with using nntoolkit occur, please contact info@martin-thoma.de"""
 
 # Core Library modules
-import os.path
+try:
+    from importlib.metadata import PackageNotFoundError, version
+except ImportError:  # Python < 3.8
+    # Third party modules
+    from pkg_resources import DistributionNotFound as PackageNotFoundError
+    from pkg_resources import get_distribution
+
+    def version(distribution_name):
+        """Get the version of the installed ``distribution_name``."""
+        return get_distribution(distribution_name).version
 
-# Third party modules
-from pkg_resources import DistributionNotFound, get_distribution
 
 try:
-    _dist = get_distribution("nntoolkit")
-    # Normalize case for Windows systems
-    dist_loc = os.path.normcase(_dist.location)
-    here = os.path.normcase(__file__)
-    if not here.startswith(os.path.join(dist_loc, "nntoolkit")):
-        # not installed, but there is another version that *is*
-        raise DistributionNotFound
-except DistributionNotFound:
+    __version__ = version("nntoolkit")
+except PackageNotFoundError:
     __version__ = "Please install this project with setup.py"
-else:
-    __version__ = _dist.version
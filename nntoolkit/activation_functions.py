@@ -66,12 +66,25 @@ def get_activation_function(function_name):
     )()
 
 
+def _get_out(x, out):
+    """Get a floating point output buffer for ``x``."""
+    if out is not None:
+        return out
+    dtype = x.dtype if x.dtype.kind == "f" else numpy.float64
+    return numpy.empty(x.shape, dtype=dtype)
+
+
 # Only activation function classes follow
 # Each activation function has to implement the __str__, __repr__ and
-# __call__ functions
+# __call__ functions. __call__ takes an optional ``out`` buffer which may be
+# ``x`` itself for in-place evaluation.
 class Sigmoid:
 
-    """The sigmoid function :math:`f(x) = 1/(1+e^{-x})`."""
+    """The sigmoid function :math:`f(x) = 1/(1+e^{-x})`.
+
+    It is evaluated as :math:`f(x) = (1 + \\tanh(x/2))/2` which does not
+    overflow for large :math:`|x|`.
+    """
 
     def __repr__(self):
         return "Sigmoid"
@@ -79,14 +92,24 @@ class Sigmoid:
     def __str__(self):
         return "Sigmoid"
 
-    def __call__(self, x):
-        sigmoid = numpy.vectorize(lambda x: 1.0 / (1 + numpy.exp(-x)))
-        return sigmoid(x)
+    def __call__(self, x, out=None):
+        x = numpy.asarray(x)
+        out = _get_out(x, out)
+        numpy.multiply(x, 0.5, out=out)
+        numpy.tanh(out, out=out)
+        out += 1
+        out *= 0.5
+        return out
 
 
 class Softmax:
 
-    """The softmax function."""
+    """The softmax function.
+
+    It is applied row-wise (over the last axis), so every row of a batch gets
+    normalized on its own. The row maximum gets subtracted before
+    exponentiating to prevent overflows.
+    """
 
     def __repr__(self):
         return "Softmax"
@@ -94,8 +117,10 @@ class Softmax:
     def __str__(self):
         return "Softmax"
 
-    def __call__(self, x):
-        def softmax(x):
-            return numpy.divide(numpy.exp(x), numpy.sum(numpy.exp(x)))
-
-        return softmax(x)
+    def __call__(self, x, out=None):
+        x = numpy.asarray(x)
+        out = _get_out(x, out)
+        numpy.subtract(x, x.max(axis=-1, keepdims=True), out=out)
+        numpy.exp(out, out=out)
+        out /= out.sum(axis=-1, keepdims=True)
+        return out
@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+
+"""Coalesce concurrent single-vector predictions into batched forward passes."""
+
+# Core Library modules
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Third party modules
+import numpy as np
+
+# First party modules
+import nntoolkit.cache as cache
+import nntoolkit.evaluate as evaluate
+from nntoolkit.inference import CompiledMLP
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+
+    """
+    Collect single feature vectors and evaluate them in batches.
+
+    A background thread takes the first waiting request, then waits at most
+    ``max_wait`` seconds for more requests until ``max_batch_size`` requests
+    are collected, and runs one forward pass for all of them. Only this
+    thread calls ``predict``, so it does not have to be thread-safe.
+
+    Parameters
+    ----------
+    predict : Callable[[np.ndarray], Sequence[Any]]
+        Maps a matrix with one feature vector per row to one result per row,
+        e.g. :meth:`nntoolkit.inference.CompiledMLP.predict`
+    max_batch_size : int
+    max_wait : float
+        Seconds to wait for more requests after the first one arrived.
+    latency_window : int
+        How many of the latest latencies are kept for the statistics.
+    n_inputs : Optional[int]
+        The length of every feature vector. Defaults to the shape of the
+        first submitted feature vector; :meth:`submit` rejects other shapes,
+        so a wrong vector cannot fail the batch it would be stacked into.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], Sequence[Any]],
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+        latency_window: int = 10000,
+        n_inputs: Optional[int] = None,
+    ):
+        assert max_batch_size >= 1
+        assert max_wait >= 0
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._n_requests = 0
+        self._n_batches = 0
+        self._start_time = time.perf_counter()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._shape: Optional[Tuple[int, ...]] = None
+        if n_inputs is not None:
+            self._shape = (n_inputs,)
+        self._thread = threading.Thread(
+            target=self._run, name="MicroBatcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, features) -> Future:
+        """
+        Queue one feature vector for evaluation.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Resolves to the result of ``predict`` for this feature vector.
+
+        Raises
+        ------
+        ValueError
+            If the shape of ``features`` differs from the expected one.
+        """
+        features = np.asarray(features)
+        future: Future = Future()
+        # Under the lock, no request can get queued after the sentinel of close
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The MicroBatcher is closed.")
+            if self._shape is None:
+                self._shape = features.shape
+            elif features.shape != self._shape:
+                raise ValueError(
+                    f"Expected features of shape {self._shape}, got {features.shape}."
+                )
+            self._queue.put((features, future, time.perf_counter()))
+        return future
+
+    def close(self):
+        """Stop the background thread after the queued requests are done."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        requests = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(requests) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    request = self._queue.get(timeout=timeout)
+                else:
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Stop after this batch
+                self._queue.put(None)
+                break
+            requests.append(request)
+        return requests
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            requests = [
+                request
+                for request in self._collect(first)
+                if request[1].set_running_or_notify_cancel()
+            ]
+            if not requests:
+                continue
+            try:
+                outputs = self.predict(np.stack([request[0] for request in requests]))
+            except Exception as exception:
+                logger.exception("Batch of %i requests failed.", len(requests))
+                for _, future, _ in requests:
+                    future.set_exception(exception)
+                continue
+            now = time.perf_counter()
+            with self._lock:
+                self._n_requests += len(requests)
+                self._n_batches += 1
+                self._latencies.extend(now - request[2] for request in requests)
+            for output, (_, future, _) in zip(outputs, requests):
+                future.set_result(output)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get latency and throughput statistics.
+
+        Latencies are measured from :meth:`submit` until the output is
+        available and reported in milliseconds.
+        """
+        with self._lock:
+            latencies = np.array(self._latencies)
+            n_requests, n_batches = self._n_requests, self._n_batches
+        elapsed = time.perf_counter() - self._start_time
+        stats = {
+            "requests": n_requests,
+            "batches": n_batches,
+            "mean_batch_size": n_requests / n_batches if n_batches else 0.0,
+            "throughput": n_requests / elapsed,
+            "p50_ms": None,
+            "p99_ms": None,
+        }
+        if len(latencies):
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            stats["p50_ms"], stats["p99_ms"] = float(p50), float(p99)
+        return stats
+
+
+class AsyncPredictor:
+
+    """
+    Evaluate a model from many asyncio tasks with micro-batching.
+
+    Predictions are gathered into batches and evaluated on a background
+    thread; NumPy releases the GIL during the matrix multiplications, so the
+    event loop keeps running.
+
+    Parameters
+    ----------
+    model : Dict[str, Any]
+        A model as returned by :func:`nntoolkit.utils.get_model`. Use
+        :meth:`open` to load it without blocking the event loop.
+    max_batch_size : int
+    max_wait : float
+        Seconds to wait for more requests after the first one arrived.
+    k : Optional[int]
+        Only return the ``k`` most probable results per prediction.
+
+    Examples
+    --------
+    >>> async def classify(model_file, feature_vectors):
+    ...     async with await AsyncPredictor.open(model_file) as predictor:
+    ...         return await asyncio.gather(
+    ...             *[predictor.predict(x) for x in feature_vectors]
+    ...         )
+    """
+
+    def __init__(
+        self,
+        model: Dict[str, Any],
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+        k: Optional[int] = None,
+    ):
+        self.model = model
+        self.k = k
+        self._predictor = CompiledMLP(model)
+        self._batcher = MicroBatcher(
+            self._predict_batch,
+            max_batch_size,
+            max_wait,
+            n_inputs=self._predictor.n_inputs,
+        )
+
+    @classmethod
+    async def open(cls, model_file: str, **kwargs) -> "AsyncPredictor":
+        """Load ``model_file`` in a thread and create an AsyncPredictor."""
+        loop = asyncio.get_running_loop()
+        model = await loop.run_in_executor(None, cache.get_model, model_file)
+        if not model:
+            raise ValueError(f"Could not load the model '{model_file}'.")
+        return cls(model, **kwargs)
+
+    def _predict_batch(self, x: np.ndarray) -> List[List[Dict[str, Any]]]:
+        return [
+            evaluate.get_results(output, self.model["outputs"], self.k)
+            for output in self._predictor.predict(x)
+        ]
+
+    async def predict(self, features) -> List[Dict[str, Any]]:
+        """
+        Evaluate the model for one feature vector.
+
+        Returns
+        -------
+        results : List[Dict[str, Any]]
+            The same as :func:`nntoolkit.evaluate.get_results` returns.
+        """
+        features = np.asarray(features).reshape(-1)
+        if len(features) != self._predictor.n_inputs:
+            raise ValueError(
+                f"Expected {self._predictor.n_inputs} features, got {len(features)}."
+            )
+        return await asyncio.wrap_future(self._batcher.submit(features))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get latency and throughput statistics, see :meth:`MicroBatcher.stats`."""
+        return self._batcher.stats()
+
+    def close(self):
+        """Stop the background thread."""
+        self._batcher.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # Joining the background thread blocks, so it happens in a thread
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+"""Evaluate a neural network for many feature vectors."""
+
+# Core Library modules
+import json
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+# Third party modules
+import h5py
+import numpy as np
+
+# First party modules
+import nntoolkit.cache as cache
+import nntoolkit.data as data
+import nntoolkit.evaluate as evaluate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = data.DEFAULT_BATCH_SIZE
+
+
+def get_format(path: str) -> str:
+    """Get the file format of ``path`` by its extension."""
+    for extension, file_format in [
+        (".hdf5", "hdf5"),
+        (".h5", "hdf5"),
+        (".npy", "npy"),
+        (".jsonl", "jsonl"),
+        (".json", "raw"),
+    ]:
+        if path.endswith(extension):
+            return file_format
+    raise ValueError(
+        f"Unknown format of '{path}'. Use .hdf5/.h5, .npy, .json or .jsonl files."
+    )
+
+
+def get_n_rows(input_file: str) -> int:
+    """Get the number of feature vectors in ``input_file``."""
+    if get_format(input_file) != "jsonl":
+        return data.get_n_rows(input_file)
+    else:
+        with open(input_file, "rb") as f:
+            return sum(1 for line in f if line.strip())
+
+
+def iter_feature_batches(
+    input_file: str, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[np.ndarray]:
+    """
+    Iterate over the feature vectors of ``input_file`` in batches.
+
+    Parameters
+    ----------
+    input_file : str
+        An HDF5 file with a ``data`` dataset, a 2D ``.npy`` file, a JSON
+        header of a raw binary file (see :func:`nntoolkit.data.open_memmap`)
+        or a JSON Lines file with one list of floats per line. ``.npy`` and
+        raw files get memory-mapped, so their batches are views.
+    batch_size : int
+
+    Yields
+    ------
+    x : np.ndarray
+        A matrix with one feature vector per row
+    """
+    if get_format(input_file) != "jsonl":
+        for x, _ in data.iter_data(input_file, batch_size):
+            yield x
+    else:
+        with open(input_file, encoding="utf8") as f:
+            batch: List[List[float]] = []
+            for line in f:
+                if not line.strip():
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) == batch_size:
+                    yield np.array(batch)
+                    batch = []
+            if batch:
+                yield np.array(batch)
+
+
+class JSONLWriter:
+
+    """Write one JSON list of the top-k results per line."""
+
+    def __init__(self, output_file: str, n_rows: int, k: int, semantics: List[str]):
+        self.semantics = semantics
+        self._file = open(output_file, "w", encoding="utf8")
+
+    def write(self, indices: np.ndarray, probabilities: np.ndarray):
+        lines = []
+        for row_indices, row_probabilities in zip(indices.tolist(), probabilities):
+            results = [
+                {
+                    "symbolnr": symbolnr,
+                    "probability": float(prob),
+                    "semantics": self.semantics[symbolnr],
+                }
+                for symbolnr, prob in zip(row_indices, row_probabilities)
+            ]
+            lines.append(json.dumps(results) + "\n")
+        self._file.writelines(lines)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class HDF5Writer:
+
+    """Write the top-k results to the datasets ``indices`` and ``probabilities``."""
+
+    def __init__(self, output_file: str, n_rows: int, k: int, semantics: List[str]):
+        self._file = h5py.File(output_file, "w")
+        self._indices = self._file.create_dataset(
+            "indices", shape=(n_rows, k), dtype=np.int64
+        )
+        self._probabilities = self._file.create_dataset(
+            "probabilities", shape=(n_rows, k), dtype=np.float32
+        )
+        self._file.create_dataset(
+            "semantics", data=semantics, dtype=h5py.string_dtype("utf-8")
+        )
+        self._row = 0
+
+    def write(self, indices: np.ndarray, probabilities: np.ndarray):
+        end = self._row + len(indices)
+        self._indices[self._row : end] = indices
+        self._probabilities[self._row : end] = probabilities
+        self._row = end
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class NPYWriter:
+
+    """
+    Write the top-k results to a ``.npy`` file of a structured dtype.
+
+    Every row has the fields ``index`` and ``probability``, each with ``k``
+    entries. The file is memory-mapped, so rows go to disk as they come.
+    """
+
+    def __init__(self, output_file: str, n_rows: int, k: int, semantics: List[str]):
+        dtype = np.dtype([("index", np.int64, (k,)), ("probability", np.float32, (k,))])
+        self._array = np.lib.format.open_memmap(
+            output_file, mode="w+", dtype=dtype, shape=(n_rows,)
+        )
+        self._row = 0
+
+    def write(self, indices: np.ndarray, probabilities: np.ndarray):
+        end = self._row + len(indices)
+        self._array["index"][self._row : end] = indices
+        self._array["probability"][self._row : end] = probabilities
+        self._row = end
+
+    def close(self):
+        self._array.flush()
+        del self._array
+
+
+WRITERS = {"jsonl": JSONLWriter, "hdf5": HDF5Writer, "npy": NPYWriter}
+
+
+def main(
+    model_file: str,
+    input_file: str,
+    output_file: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    k: int = 10,
+) -> int:
+    """
+    Write the top-``k`` predictions for every feature vector of ``input_file``.
+
+    The model and its compiled predictor come from the process-wide cache,
+    see :func:`nntoolkit.cache.get_predictor`. Feature vectors are read, evaluated and
+    written in batches, so the memory usage is bounded by ``batch_size``.
+    A batch gets written by a background thread while the next one is
+    evaluated.
+
+    Parameters
+    ----------
+    model_file : str
+    input_file : str
+        ``.hdf5``/``.h5``, ``.npy``, ``.json`` or ``.jsonl``, see
+        :func:`iter_feature_batches`
+    output_file : str
+        ``.hdf5``/``.h5``, ``.npy`` or ``.jsonl``
+    batch_size : int
+    k : int
+        The number of predictions per feature vector.
+
+    Returns
+    -------
+    n_rows : int
+        The number of evaluated feature vectors.
+    """
+    assert batch_size >= 1
+    predictor = cache.get_predictor(model_file)
+    if predictor is None:
+        raise ValueError(f"Could not load the model '{model_file}'.")
+    k = min(k, predictor.n_outputs)
+    output_format = get_format(output_file)
+    if output_format not in WRITERS:
+        raise ValueError(
+            f"Can not write '{output_file}'. Use .hdf5/.h5, .npy or .jsonl."
+        )
+    n_rows = get_n_rows(input_file)
+    writer = WRITERS[output_format](output_file, n_rows, k, predictor.outputs)
+    t0 = time.perf_counter()
+    total = 0
+    pending: Optional[Future] = None
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for x in iter_feature_batches(input_file, batch_size):
+                indices, probabilities = evaluate.get_top_k(predictor.predict(x), k)
+                if pending is not None:
+                    # At most one batch waits to be written
+                    pending.result()
+                pending = executor.submit(writer.write, indices, probabilities)
+                total += len(x)
+            if pending is not None:
+                pending.result()
+    finally:
+        writer.close()
+    duration = time.perf_counter() - t0
+    logger.info(
+        "Evaluated %i feature vectors (%0.1f rows/sec).",
+        total,
+        total / max(duration, 1e-9),
+    )
+    return total
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+"""A process-wide LRU cache for loaded models."""
+
+# Core Library modules
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# First party modules
+import nntoolkit.inference as inference
+import nntoolkit.profiling as profiling
+import nntoolkit.utils as utils
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+def get_model_nbytes(model: Dict[str, Any]) -> int:
+    """Get the number of bytes of all weight arrays of ``model``."""
+    return sum(
+        getattr(value, "nbytes", 0)
+        for layer in model.get("layers", [])
+        for value in layer.values()
+    )
+
+
+class ModelCache:
+
+    """
+    A least-recently-used cache of loaded models.
+
+    Entries are keyed by the absolute path of the model file together with
+    its modification time and size, so a changed file gets loaded again.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The memory budget for the weights of all cached models. The least
+        recently used models get evicted if it is exceeded. A single model
+        which is larger than the budget does not get cached.
+    loader : Optional[Callable[[str], Optional[Dict[str, Any]]]]
+        The function which loads a model from a file. Defaults to
+        :func:`nntoolkit.utils.get_model`.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        loader: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple, Tuple[Dict[str, Any], int]]"
+        self._entries = OrderedDict()
+        self._predictors: Dict[Tuple, inference.CompiledMLP] = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def get_key(modelfile: str) -> Tuple[str, int, int]:
+        """Get the cache key of ``modelfile``."""
+        path = os.path.abspath(modelfile)
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    def get(self, modelfile: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the model stored in ``modelfile``, loading it if necessary.
+
+        The returned model is shared between all callers and must not be
+        modified.
+        """
+        return self._get(modelfile)[1]
+
+    def get_predictor(self, modelfile: str) -> Optional[inference.CompiledMLP]:
+        """
+        Get a :class:`nntoolkit.inference.CompiledMLP` for ``modelfile``.
+
+        The predictor gets compiled once per cached model, so its scratch
+        buffers are reused by all later calls. It gets dropped together with
+        the model when the model gets evicted.
+        """
+        key, model = self._get(modelfile)
+        if not model:
+            return None
+        with self._lock:
+            if key in self._predictors:
+                return self._predictors[key]
+        predictor = inference.CompiledMLP(model)
+        with self._lock:
+            if key in self._entries:
+                predictor = self._predictors.setdefault(key, predictor)
+        return predictor
+
+    def _get(self, modelfile: str) -> Tuple[Optional[Tuple], Optional[Dict[str, Any]]]:
+        try:
+            key = self.get_key(modelfile)
+        except OSError:
+            # Let the loader report the problem
+            return None, self._load(modelfile)
+        t0 = time.perf_counter()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                model = self._entries[key][0]
+            else:
+                model = None
+                self.misses += 1
+        if model is not None:
+            # The load stages are missing from a profile if the model was
+            # cached, this stage shows why
+            profiler = profiling.get_profiler()
+            if profiler is not None:
+                profiler.add("load: cache hit", time.perf_counter() - t0)
+            return key, model
+        model = self._load(modelfile)
+        if model:
+            self._put(key, model)
+        return key, model
+
+    def _load(self, modelfile: str) -> Optional[Dict[str, Any]]:
+        if self.loader is None:
+            return utils.get_model(modelfile)
+        return self.loader(modelfile)
+
+    def _put(self, key: Tuple, model: Dict[str, Any]):
+        nbytes = get_model_nbytes(model)
+        if nbytes > self.max_bytes:
+            logger.info(
+                "Model '%s' (%i bytes) exceeds the cache budget.", key[0], nbytes
+            )
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (model, nbytes)
+            self._nbytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        while self._nbytes > self.max_bytes and self._entries:
+            key, (_, nbytes) = self._entries.popitem(last=False)
+            self._predictors.pop(key, None)
+            self._nbytes -= nbytes
+            self.evictions += 1
+            logger.debug("Evicted model '%s' from the cache.", key[0])
+
+    def resize(self, max_bytes: int):
+        """Change the memory budget and evict models if necessary."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Remove all models from the cache. The counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._predictors.clear()
+            self._nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get the counters of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "nbytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def _get_default_max_bytes() -> int:
+    value = os.environ.get("NNTOOLKIT_MODEL_CACHE_BYTES")
+    if value is None:
+        return DEFAULT_MAX_BYTES
+    return int(value)
+
+
+model_cache = ModelCache(max_bytes=_get_default_max_bytes())
+
+
+def get_model(modelfile: str) -> Optional[Dict[str, Any]]:
+    """Get the model stored in ``modelfile`` from the process-wide cache."""
+    return model_cache.get(modelfile)
+
+
+def get_predictor(modelfile: str) -> Optional[inference.CompiledMLP]:
+    """Get the compiled predictor of ``modelfile`` from the process-wide cache."""
+    return model_cache.get_predictor(modelfile)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 # Core Library modules
+import contextlib
 import json
 import logging
 import os
@@ -9,7 +10,6 @@ from typing import Any, Dict
 
 # Third party modules
 import click
-import tensorflow as tf
 
 # First party modules
 import nntoolkit.utils
@@ -24,7 +24,36 @@ logging.basicConfig(
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 logger = logging.getLogger(__name__)
 logging.getLogger("tensorflow").setLevel(logging.WARNING)
-tf.get_logger().setLevel(logging.WARNING)
+
+
+def configure_tensorflow():
+    """
+    Silence TensorFlow.
+
+    TensorFlow takes seconds to import, so this is only done by the commands
+    which need it.
+    """
+    # Third party modules
+    import tensorflow as tf
+
+    tf.get_logger().setLevel(logging.WARNING)
+
+
+@contextlib.contextmanager
+def profiled(profile: bool, profile_json):
+    """Profile the body of a ``with`` statement if it was requested."""
+    if not profile and profile_json is None:
+        yield
+        return
+    # First party modules
+    import nntoolkit.profiling
+
+    with nntoolkit.profiling.enable() as profiler:
+        yield
+    if profile:
+        print(profiler.format_table())
+    if profile_json is not None:
+        profiler.write_json(profile_json)
 
 
 @click.group()
@@ -41,6 +70,40 @@ model_option = click.option(
     type=click.Path(dir_okay=False, file_okay=True, exists=True),
 )
 
+prefetch_option = click.option(
+    "--prefetch",
+    "prefetch",
+    help=(
+        "Number of batches which get read ahead in a background thread; "
+        "0 disables prefetching."
+    ),
+    type=click.IntRange(min=0),
+    default=2,
+)
+
+profile_option = click.option(
+    "--profile",
+    is_flag=True,
+    help="Print how long loading the model and every layer took.",
+)
+profile_json_option = click.option(
+    "--profile-json",
+    "profile_json",
+    help="Write the profile as JSON to this file.",
+    type=click.Path(dir_okay=False, file_okay=True, writable=True),
+)
+
+compression_option = click.option(
+    "--compression",
+    type=click.Choice(["gzip", "lzf"]),
+    help="Compress the HDF5 datasets.",
+)
+shuffle_option = click.option(
+    "--shuffle",
+    is_flag=True,
+    help="Apply the HDF5 byte shuffle filter, which helps the compression.",
+)
+
 
 @entry_point.command()
 @model_option
@@ -48,14 +111,49 @@ model_option = click.option(
     "-i",
     "--input",
     "inputvec",
-    help="a file which contains an input vector [[0.12, 0.312, 1.21 ...]]",
+    help=(
+        "a file which contains an input vector [[0.12, 0.312, 1.21 ...]]; "
+        "with --output an .hdf5, .npy or .jsonl file with many input vectors"
+    ),
     type=click.Path(dir_okay=False, file_okay=True, exists=True),
 )
-def evaluate(modelfile, inputvec):
-    # First party modules
-    import nntoolkit.evaluate
+@click.option(
+    "-k",
+    "--top-k",
+    "k",
+    help="How many of the most probable classes get shown.",
+    type=click.IntRange(min=1),
+    default=10,
+)
+@click.option(
+    "-o",
+    "--output",
+    "output_file",
+    help="Evaluate all input vectors and write the top-k results to this "
+    ".hdf5, .npy or .jsonl file.",
+    type=click.Path(dir_okay=False, file_okay=True, writable=True),
+)
+@click.option(
+    "--batchsize",
+    "batch_size",
+    help="How many input vectors get evaluated at once with --output.",
+    type=click.IntRange(min=1),
+    default=1024,
+)
+@profile_option
+@profile_json_option
+def evaluate(modelfile, inputvec, k, output_file, batch_size, profile, profile_json):
+    with profiled(profile, profile_json):
+        if output_file is not None:
+            # First party modules
+            import nntoolkit.bulk
 
-    nntoolkit.evaluate.main_bash(modelfile, inputvec)
+            nntoolkit.bulk.main(modelfile, inputvec, output_file, batch_size, k)
+            return
+        # First party modules
+        import nntoolkit.evaluate
+
+        nntoolkit.evaluate.main_bash(modelfile, inputvec, k=k)
 
 
 type_option = click.option(
@@ -82,13 +180,279 @@ def create():
     default="nntoolkit-model.tar",
     type=click.Path(file_okay=True, dir_okay=False, exists=False, writable=True),
 )
-def create_mlp(architecture, model_file):
+@compression_option
+@shuffle_option
+@click.option(
+    "--seed",
+    help="Seed of the random weights. The same seed gives the same model.",
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of layers which get initialized in parallel.",
+    type=click.IntRange(min=1),
+    default=1,
+)
+def create_mlp(architecture, model_file, compression, shuffle, seed, jobs):
     """Create a multi-layer Perceptron architecture."""
     # First party modules
     import nntoolkit.create
 
     nntoolkit.create.main(
-        architecture=architecture, model_file=model_file, nn_type="mlp"
+        architecture=architecture,
+        model_file=model_file,
+        nn_type="mlp",
+        compression=compression,
+        shuffle=shuffle,
+        seed=seed,
+        jobs=jobs,
+    )
+
+
+@entry_point.command()
+@click.argument(
+    "input_file", type=click.Path(dir_okay=False, file_okay=True, exists=True)
+)
+@click.argument(
+    "output_file", type=click.Path(dir_okay=False, file_okay=True, writable=True)
+)
+@compression_option
+@shuffle_option
+def convert(input_file, output_file, compression, shuffle):
+    """
+    Convert a model file to the format given by the extension of OUTPUT_FILE.
+
+    Use '.tar' for the tar format and '.nnt' for the single-file format.
+    """
+    try:
+        converted = nntoolkit.utils.convert_model(
+            input_file, output_file, compression, shuffle
+        )
+    except ValueError as exception:
+        raise click.UsageError(str(exception))
+    if not converted:
+        sys.exit(1)
+
+
+@entry_point.command()
+@click.argument(
+    "model_file", type=click.Path(dir_okay=False, file_okay=True, exists=True)
+)
+@click.option(
+    "--batchsize",
+    "batch_size",
+    help="The batch size for the memory and latency estimates.",
+    type=click.IntRange(min=1),
+    default=1,
+)
+@click.option(
+    "--gflops",
+    "gflops",
+    help="Peak GFLOP/s for the latency estimate. Measured if not given.",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+)
+@click.option(
+    "--bandwidth",
+    "bandwidth",
+    help="Memory bandwidth in GB/s for the latency estimate. Measured if not given.",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+)
+def inspect(model_file, batch_size, gflops, bandwidth):
+    """Show the size and cost of MODEL_FILE without loading its weights."""
+    # First party modules
+    import nntoolkit.inspection
+
+    try:
+        nntoolkit.inspection.main(model_file, batch_size, gflops, bandwidth)
+    except ValueError as exception:
+        raise click.UsageError(str(exception))
+
+
+@entry_point.command()
+@click.option(
+    "-m",
+    "--model",
+    "models",
+    help="A model file to serve, optionally as NAME=PATH. Can be repeated.",
+    multiple=True,
+    required=True,
+)
+@click.option("--host", "host", default="127.0.0.1")
+@click.option("--port", "port", type=int, default=8000)
+@click.option(
+    "--unix-socket",
+    "unix_socket",
+    help="Listen on this Unix socket instead of host:port.",
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--max-batch-size",
+    "max_batch_size",
+    help="How many concurrent requests get evaluated together at most.",
+    type=click.IntRange(min=1),
+    default=64,
+)
+@click.option(
+    "--max-wait-ms",
+    "max_wait_ms",
+    help="How long to wait for more requests before evaluating a batch.",
+    type=click.FloatRange(min=0),
+    default=2.0,
+)
+def serve(models, host, port, unix_socket, max_batch_size, max_wait_ms):
+    """
+    Serve predictions over HTTP.
+
+    POST {"features": [...], "k": 10} to /models/NAME/predict. GET /stats
+    reports latencies and throughput.
+    """
+    # First party modules
+    import nntoolkit.serve
+
+    model_files = {}
+    for model in models:
+        name, _, path = model.rpartition("=")
+        if not name:
+            name = os.path.splitext(os.path.basename(path))[0]
+        if not os.path.isfile(path):
+            raise click.BadParameter(f"'{path}' does not exist.")
+        model_files[name] = path
+    nntoolkit.serve.main(
+        model_files,
+        host=host,
+        port=port,
+        unix_socket=unix_socket,
+        max_batch_size=max_batch_size,
+        max_wait=max_wait_ms / 1000,
+    )
+
+
+@entry_point.command()
+@model_option
+@click.option(
+    "-i",
+    "--input",
+    "data_file",
+    required=True,
+    help="Labeled data (.hdf5) for the calibration and the accuracy report.",
+    type=click.Path(dir_okay=False, file_okay=True, exists=True),
+)
+@click.option(
+    "-o",
+    "--output",
+    "output_file",
+    required=True,
+    help="Write the quantized model to this .tar or .nnt file.",
+    type=click.Path(dir_okay=False, file_okay=True, writable=True),
+)
+@click.option(
+    "--dtype",
+    "quantization",
+    type=click.Choice(["float16", "int8"]),
+    default="int8",
+    show_default=True,
+)
+@click.option(
+    "--calibration-rows",
+    help="How many rows of the data file calibrate the int8 scales.",
+    type=click.IntRange(min=1),
+    default=1024,
+)
+@click.option(
+    "--batchsize",
+    "batch_size",
+    help="How many test examples get evaluated at once.",
+    type=click.IntRange(min=1),
+    default=1024,
+)
+def quantize(
+    modelfile, data_file, output_file, quantization, calibration_rows, batch_size
+):
+    """Quantize the weights of a model to float16 or int8."""
+    # First party modules
+    import nntoolkit.quantize
+
+    nntoolkit.quantize.main(
+        modelfile,
+        output_file,
+        data_file,
+        quantization,
+        calibration_rows,
+        batch_size,
+    )
+
+
+@entry_point.group()
+def data():
+    """Prepare data files."""
+
+
+@data.command(name="import-idx")
+@click.argument(
+    "images_file", type=click.Path(dir_okay=False, file_okay=True, exists=True)
+)
+@click.argument(
+    "data_file", type=click.Path(dir_okay=False, file_okay=True, writable=True)
+)
+@click.option(
+    "-l",
+    "--labels",
+    "labels_file",
+    help="An IDX file with one label per row of IMAGES_FILE.",
+    type=click.Path(dir_okay=False, file_okay=True, exists=True),
+)
+@click.option(
+    "--chunk-rows",
+    help="Rows per HDF5 chunk.",
+    type=click.IntRange(min=1),
+    default=1024,
+)
+@click.option(
+    "--normalize",
+    is_flag=True,
+    help="Store the features as float32 in [0, 1] instead of the IDX type.",
+)
+@compression_option
+def import_idx(images_file, data_file, labels_file, chunk_rows, normalize, compression):
+    """
+    Convert the IDX file IMAGES_FILE (e.g. MNIST, may be gzipped) to the
+    HDF5 data file DATA_FILE.
+    """
+    # First party modules
+    import nntoolkit.idx
+
+    nntoolkit.idx.import_idx(
+        images_file, data_file, labels_file, chunk_rows, normalize, compression
+    )
+
+
+@data.command()
+@click.argument(
+    "input_file", type=click.Path(dir_okay=False, file_okay=True, exists=True)
+)
+@click.argument(
+    "output_file", type=click.Path(dir_okay=False, file_okay=True, writable=True)
+)
+@click.option(
+    "--chunk-rows",
+    help="Rows per HDF5 chunk. Defaults to about 256 KiB per chunk.",
+    type=click.IntRange(min=1),
+)
+@compression_option
+@shuffle_option
+def repack(input_file, output_file, chunk_rows, compression, shuffle):
+    """
+    Copy the data file INPUT_FILE to OUTPUT_FILE with a new chunk layout and
+    compression and compare the read throughput of both.
+    """
+    # First party modules
+    import nntoolkit.data
+
+    nntoolkit.data.repack_and_report(
+        input_file, output_file, chunk_rows, compression, shuffle
     )
 
 
@@ -154,6 +518,31 @@ def make():
     "hook",
     type=str,
 )
+@click.option(
+    "--engine",
+    "engine",
+    help="'numpy' trains MLPs without Keras/TensorFlow.",
+    type=click.Choice(["keras", "numpy"]),
+    default="keras",
+)
+@click.option(
+    "--shuffle-buffer",
+    "shuffle_buffer",
+    help=(
+        "Number of rows which get shuffled together. The training data is "
+        "streamed, so this bounds the memory for the data."
+    ),
+    type=click.IntRange(min=1),
+    default=65536,
+)
+@click.option(
+    "--seed",
+    "seed",
+    help="Seed for shuffling the training data.",
+    type=int,
+    default=None,
+)
+@prefetch_option
 def train(
     traindata,
     validdata,
@@ -165,12 +554,20 @@ def train(
     epochs,
     momentum,
     hook,
+    engine,
+    shuffle_buffer,
+    seed,
+    prefetch,
 ):
     """Train a neural network."""
     # First party modules
     import nntoolkit.train
 
+    if engine == "keras":
+        configure_tensorflow()
     if model_file is None:
+        if engine == "numpy":
+            raise click.UsageError("The numpy engine needs a model file (-m).")
         model_dict: Dict[str, Any] = json.loads(input())
     else:
         model_dict: Dict[str, Any] = nntoolkit.utils.get_model(model_file)
@@ -182,6 +579,11 @@ def train(
         batch_size=batch_size,
         learning_rate=learning_rate,
         epochs=epochs,
+        momentum=momentum,
+        engine=engine,
+        shuffle_buffer=shuffle_buffer,
+        seed=seed,
+        prefetch=prefetch,
     )
 
 
@@ -191,15 +593,88 @@ def train(
     "-i",
     "--input",
     "test_data",
-    help="a file which contains testing data (.tar)",
+    help="a file which contains testing data (.hdf5, .npy or .json)",
     type=click.Path(dir_okay=False, file_okay=True, exists=True),
 )
-def test(model_file, test_data):
+@click.option(
+    "--batchsize",
+    "batch_size",
+    help="How many test examples get evaluated at once.",
+    type=click.IntRange(min=1),
+    default=1024,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    "jobs",
+    help="Number of worker processes which evaluate parts of the data.",
+    type=click.IntRange(min=1),
+    default=1,
+)
+@click.option(
+    "--metrics",
+    "metric_names",
+    help=(
+        "Comma-separated metrics in addition to the accuracy: confusion, "
+        "precision_recall, top_k, log_loss or 'all'."
+    ),
+    default=None,
+)
+@click.option(
+    "-k",
+    "--top-k",
+    "k",
+    help="The largest k for the top-k accuracy and the predictions file.",
+    type=click.IntRange(min=1),
+    default=5,
+)
+@click.option(
+    "--predictions",
+    "predictions_file",
+    help="Write the top-k predictions of every row to this HDF5 file.",
+    type=click.Path(dir_okay=False),
+    default=None,
+)
+@prefetch_option
+@profile_option
+@profile_json_option
+def test(
+    modelfile,
+    test_data,
+    batch_size,
+    jobs,
+    metric_names,
+    k,
+    predictions_file,
+    prefetch,
+    profile,
+    profile_json,
+):
     """Test a neural network."""
     # First party modules
+    import nntoolkit.metrics
     import nntoolkit.test
 
-    nntoolkit.test.main(model_file, test_data)
+    accumulator = None
+    if metric_names is not None:
+        try:
+            names = nntoolkit.metrics.parse_metrics(metric_names)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--metrics")
+        accumulator = nntoolkit.metrics.MetricsAccumulator(k=k, metrics=names)
+    if predictions_file is not None and jobs > 1:
+        raise click.UsageError("--predictions requires --jobs 1.")
+    with profiled(profile, profile_json):
+        nntoolkit.test.main(
+            modelfile,
+            test_data,
+            batch_size=batch_size,
+            jobs=jobs,
+            accumulator=accumulator,
+            predictions_file=predictions_file,
+            prefetch=prefetch,
+            k=k,
+        )
 
 
 if __name__ == "__main__":
@@ -6,8 +6,8 @@
 import json
 import logging
 import os
-import random
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # Third party modules
 import h5py
@@ -15,29 +15,70 @@ import numpy
 import yaml
 
 # First party modules
+import nntoolkit.data
 import nntoolkit.utils
 
 logger = logging.getLogger(__name__)
 
+# Values of a weight matrix which are drawn at once; 64 MiB as float64
+DEFAULT_BLOCK_VALUES = 2**23
 
-def xaviar10_weight_init(neurons_a: int, neurons_b: int) -> List[List[float]]:
+
+def get_init_range(n_in: int, n_out: int) -> float:
+    """Get the bound of the uniform distribution the weights are drawn from."""
+    fan_in = n_out
+    fan_out = n_in - 2
+    return 4.0 * numpy.sqrt(6.0 / (fan_in + fan_out))
+
+
+def get_layer_seeds(
+    n_layers: int, seed: Optional[int] = None
+) -> List[Tuple[numpy.random.SeedSequence, numpy.random.SeedSequence]]:
     """
-    Initialize the weights between a layer with ``neurons_a`` neurons and a
-    layer with ``neurons_b`` neurons.
+    Get independent random streams for the weights and biases of every layer.
+
+    The streams only depend on ``seed`` and the position of the layer, so
+    layers can be initialized in any order or in parallel.
 
     Returns
     -------
-    W : List[List[float]]
-        A neurons_a × neurons_b matrix.
+    seeds : List[Tuple[SeedSequence, SeedSequence]]
+        One (W, b) pair per layer
     """
-    fan_in = neurons_a
-    fan_out = neurons_b - 2
-    init_weight = 4.0 * numpy.sqrt(6.0 / (fan_in + fan_out))
-    W = [
-        numpy.random.uniform(low=-init_weight, high=init_weight, size=neurons_a)
-        for _ in range(neurons_b)
-    ]
-    return W
+    root = numpy.random.SeedSequence(seed)
+    return [tuple(layer.spawn(2)) for layer in root.spawn(n_layers)]
+
+
+def iter_weight_blocks(
+    n_in: int,
+    n_out: int,
+    seed: numpy.random.SeedSequence,
+    block_rows: Optional[int] = None,
+) -> Iterator[Tuple[int, numpy.ndarray]]:
+    """
+    Draw the weight matrix of a layer block by block.
+
+    The result does not depend on ``block_rows``, as the rows are drawn one
+    after another from a single stream.
+
+    Yields
+    ------
+    (start, block) : Tuple[int, numpy.ndarray]
+        The first row of the block and the float32 rows ``start:start + len(block)``
+    """
+    if block_rows is None:
+        block_rows = max(1, DEFAULT_BLOCK_VALUES // max(n_out, 1))
+    rng = numpy.random.default_rng(seed)
+    init_weight = get_init_range(n_in, n_out)
+    for start in range(0, n_in, block_rows):
+        rows = min(block_rows, n_in - start)
+        block = rng.uniform(low=-init_weight, high=init_weight, size=(rows, n_out))
+        yield start, block.astype(numpy.float32)
+
+
+def get_biases(n_out: int, seed: numpy.random.SeedSequence) -> numpy.ndarray:
+    """Draw the bias vector of a layer uniformly from [0, 1)."""
+    return numpy.random.default_rng(seed).random(n_out).astype(numpy.float32)
 
 
 def is_valid_model_file(model_file_path: str) -> bool:
@@ -51,56 +92,58 @@ def is_valid_model_file(model_file_path: str) -> bool:
     return True
 
 
-def create_hdf5s_for_layer(i: int, layer: Dict[str, Any]):
-    """
-    Create one HDF5 file for the weight matrix W and one for the bias vector b.
-
-    Parameters
-    ----------
-    i : int
-    layer : Dict[str, Any]
-    """
-    Wfile = h5py.File("W%i.hdf5" % i, "w")
-    Wfile.create_dataset(Wfile.id.name, data=layer["W"])
-    Wfile.close()
-
-    bfile = h5py.File("b%i.hdf5" % i, "w")
-    bfile.create_dataset(bfile.id.name, data=layer["b"])
-    bfile.close()
-
-
-def create_layers(neurons: List[int]) -> List[Dict[str, Any]]:
+def _get_dataset_options(
+    shape: Tuple[int, ...], compression: Optional[str], shuffle: bool
+) -> Dict[str, Any]:
+    """Get the options of a float32 dataset; it is contiguous if not compressed."""
+    if compression is None and not shuffle:
+        return {}
+    return nntoolkit.data.get_dataset_options(
+        shape, numpy.float32, compression=compression, shuffle=shuffle
+    )
+
+
+def write_layer(
+    i: int,
+    n_in: int,
+    n_out: int,
+    seeds: Tuple[numpy.random.SeedSequence, numpy.random.SeedSequence],
+    compression: Optional[str] = None,
+    shuffle: bool = False,
+    block_rows: Optional[int] = None,
+):
     """
-    Create the layers of the neural network.
-
-    Parameters
-    ----------
-    neurons : List[int]
-        Indicates how many neurons are in which layer.
+    Initialize layer ``i`` directly into the files ``W{i}.hdf5`` and ``b{i}.hdf5``.
 
-    Returns
-    -------
-    layers_binary : List[Dict[str, Any]]
-        random variables for the weight matrix W and the bias vector b
+    The weight matrix is drawn and written in blocks of rows, so it never has
+    to fit into memory.
     """
-    layers_binary = []
-    for neurons_b, neurons_a in zip(neurons, neurons[1:]):
-        W = xaviar10_weight_init(neurons_a, neurons_b)
-        b = [random.random() for _ in range(neurons_a)]
-        # TODO: parse architecture string to allow arbitrary activation
-        # functions
-        layers_binary.append(
-            {
-                "W": numpy.array(W, dtype=numpy.float32),
-                "b": numpy.array(b, dtype=numpy.float32),
-                "activation": "Sigmoid",
-            }
+    with h5py.File("W%i.hdf5" % i, "w") as f:
+        W = f.create_dataset(
+            f.id.name,
+            shape=(n_in, n_out),
+            dtype=numpy.float32,
+            **_get_dataset_options((n_in, n_out), compression, shuffle),
+        )
+        for start, block in iter_weight_blocks(n_in, n_out, seeds[0], block_rows):
+            W[start : start + len(block)] = block
+    with h5py.File("b%i.hdf5" % i, "w") as f:
+        f.create_dataset(
+            f.id.name,
+            data=get_biases(n_out, seeds[1]),
+            **_get_dataset_options((n_out,), compression, shuffle),
         )
-    layers_binary[-1]["activation"] = "Softmax"
-    return layers_binary
 
 
-def main(nn_type: str, architecture: str, model_file: str):
+def main(
+    nn_type: str,
+    architecture: str,
+    model_file: str,
+    compression: Optional[str] = None,
+    shuffle: bool = False,
+    seed: Optional[int] = None,
+    jobs: int = 1,
+):
     """
     Create a neural network file of ``nn_type`` with ``architecture``.
 
@@ -114,7 +157,17 @@ def main(nn_type: str, architecture: str, model_file: str):
     model_file : str
         A path which should end with .tar. The created model will be written
         there.
+    compression : Optional[str]
+        Compress the weight files with "gzip" or "lzf".
+    shuffle : bool
+        Apply the byte shuffle filter to the weight files.
+    seed : Optional[int]
+        Seed of the random initialization. The same seed gives the same
+        weights, independent of ``jobs``.
+    jobs : int
+        Number of threads which initialize layers in parallel.
     """
+    assert jobs >= 1
     if not is_valid_model_file(model_file):
         return
 
@@ -129,7 +182,10 @@ def main(nn_type: str, architecture: str, model_file: str):
         # TODO: the activation function could be here!
         neurons = list(map(int, architecture.split(":")))
 
-        layers_binary = create_layers(neurons)
+        if seed is None:
+            seed = int(numpy.random.SeedSequence().entropy)
+        logger.info("Initialize the weights with seed %i.", seed)
+        layer_seeds = get_layer_seeds(len(neurons) - 1, seed)
 
         nntoolkit.utils.create_boilerplate_semantics_files(neurons)
         filenames.append("input_semantics.csv")
@@ -140,32 +196,39 @@ def main(nn_type: str, architecture: str, model_file: str):
             f"Only nn_type='mlp' is implmented so far."
         )
 
-    # Write layers
-    for i, layer in enumerate(layers_binary):
-        create_hdf5s_for_layer(i, layer)
-
+    # Write layers; every layer has its own random stream and files
+    shapes = list(zip(neurons, neurons[1:]))
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                write_layer, i, n_in, n_out, layer_seeds[i], compression, shuffle
+            )
+            for i, (n_in, n_out) in enumerate(shapes)
+        ]
+        for future in futures:
+            future.result()
+    for i, (n_in, n_out) in enumerate(shapes):
         layers.append(
             {
                 "W": {
-                    "size": list(layer["W"].shape),
+                    "size": [n_in, n_out],
                     "filename": os.path.abspath(f"W{i}.hdf5"),
                 },
                 "b": {
-                    "size": list(layer["b"].shape),
+                    "size": [n_out],
                     "filename": os.path.abspath(f"b{i}.hdf5"),
                 },
-                "activation": layer["activation"],
+                "activation": "Softmax" if i + 1 == len(shapes) else "Sigmoid",
             }
         )
         filenames.append(os.path.abspath(f"W{i}.hdf5"))
         filenames.append(os.path.abspath(f"b{i}.hdf5"))
-
-        model = {
-            "type": "mlp",
-            "layers": layers,
-            "inputs": [f"input {i}" for i in range(neurons[0])],
-            "outputs": [f"output {i}" for i in range(neurons[-1])],
-        }
+    model = {
+        "type": "mlp",
+        "layers": layers,
+        "inputs": [f"input {i}" for i in range(neurons[0])],
+        "outputs": [f"output {i}" for i in range(neurons[-1])],
+    }
 
     with open("model.yml", "w") as f:
         yaml.dump(model, f, default_flow_style=False)
@@ -0,0 +1,679 @@
+#!/usr/bin/env python
+
+"""
+Read data files in chunks, so they do not have to fit into memory.
+
+Data files are HDF5 files with a ``data`` and optionally a ``labels``
+dataset, ``.npy`` files or JSON headers which describe raw binary files. The
+last two are memory-mapped, so batches are views instead of copies.
+"""
+
+# Core Library modules
+import contextlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Third party modules
+import h5py
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1024
+
+# Slices which get read ahead in a background thread
+DEFAULT_PREFETCH = 2
+
+# Rows which get shuffled together by iter_shuffled_data
+DEFAULT_SHUFFLE_BUFFER = 2**16
+
+# Chunks of about this size balance the per-chunk overhead of sequential
+# reads against the amount of data a random row access has to read. They
+# fit into the default 1 MiB chunk cache of h5py.
+DEFAULT_CHUNK_BYTES = 2**18
+
+COMPRESSIONS = ("gzip", "lzf")
+
+# Data files with these extensions get memory-mapped
+MEMMAP_EXTENSIONS = (".npy", ".json")
+
+
+def get_labels_file(npy_file: str) -> str:
+    """
+    Get the path of the labels of a ``.npy`` data file.
+
+    Examples
+    --------
+    >>> get_labels_file("train.npy")
+    'train.labels.npy'
+    """
+    return os.path.splitext(npy_file)[0] + ".labels.npy"
+
+
+def _open_array(entry, folder: str) -> np.ndarray:
+    if isinstance(entry, str):
+        return np.load(os.path.join(folder, entry), mmap_mode="r")
+    return np.memmap(
+        os.path.join(folder, entry["file"]),
+        dtype=entry.get("dtype", "float32"),
+        mode="r",
+        offset=entry.get("offset", 0),
+        shape=tuple(entry["shape"]),
+    )
+
+
+def open_memmap(data_file: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Memory-map the features and the labels of a ``.npy`` or JSON data file.
+
+    A ``.npy`` file contains the features; the labels are in the file of
+    :func:`get_labels_file`, if it exists. A JSON header looks like this::
+
+        {
+            "data": {"file": "x.f32", "dtype": "float32", "shape": [60000, 784]},
+            "labels": {"file": "y.i64", "dtype": "int64", "shape": [60000]}
+        }
+
+    ``labels`` is optional, an entry can have an ``offset`` in bytes and
+    instead of an object, an entry can be the path of a ``.npy`` file. The
+    paths are relative to the header.
+
+    Returns
+    -------
+    (data, labels): Tuple[np.ndarray, Optional[np.ndarray]]
+        Read-only memory-mapped arrays
+
+    Raises
+    ------
+    ValueError
+        If the labels do not have one entry per row of the data.
+    """
+    if data_file.endswith(".npy"):
+        labels_file = get_labels_file(data_file)
+        data = np.load(data_file, mmap_mode="r")
+        if not os.path.isfile(labels_file):
+            return data, None
+        labels = np.load(labels_file, mmap_mode="r")
+        source = f"'{labels_file}'"
+    else:
+        with open(data_file, encoding="utf8") as f:
+            header = json.load(f)
+        folder = os.path.dirname(os.path.abspath(data_file))
+        data = _open_array(header["data"], folder)
+        if "labels" not in header:
+            return data, None
+        labels = _open_array(header["labels"], folder)
+        source = f"The 'labels' entry of '{data_file}'"
+    if len(labels) != len(data):
+        raise ValueError(
+            f"{source} has {len(labels)} labels, but '{data_file}' has "
+            f"{len(data)} rows."
+        )
+    return data, labels
+
+
+def write_raw_header(
+    header_file: str,
+    data_file: str,
+    shape: Tuple[int, ...],
+    dtype="float32",
+    labels_file: Optional[str] = None,
+    labels_dtype="int64",
+):
+    """
+    Write a JSON header for the raw C-ordered binary files ``data_file`` and
+    ``labels_file``, see :func:`open_memmap`.
+    """
+    folder = os.path.dirname(os.path.abspath(header_file))
+    header: Dict[str, Any] = {
+        "data": {
+            "file": os.path.relpath(os.path.abspath(data_file), folder),
+            "dtype": np.dtype(dtype).name,
+            "shape": list(shape),
+        }
+    }
+    if labels_file is not None:
+        header["labels"] = {
+            "file": os.path.relpath(os.path.abspath(labels_file), folder),
+            "dtype": np.dtype(labels_dtype).name,
+            "shape": [shape[0]],
+        }
+    with open(header_file, "w", encoding="utf8") as f:
+        json.dump(header, f, indent=2)
+
+
+@contextlib.contextmanager
+def open_data(data_file: str) -> Iterator[Tuple[Any, Optional[Any]]]:
+    """
+    Open the features and the labels of a data file.
+
+    Yields
+    ------
+    (data, labels)
+        ``h5py.Dataset`` objects for HDF5 files, memory-mapped arrays for
+        ``.npy`` and JSON files (see :func:`open_memmap`). ``labels`` is None
+        for unlabeled data.
+    """
+    if not os.path.isfile(data_file):
+        raise FileNotFoundError(f"File '{data_file}' does not exist.")
+    if data_file.endswith(MEMMAP_EXTENSIONS):
+        yield open_memmap(data_file)
+        return
+    with h5py.File(data_file, "r") as f:
+        labels = f["labels"] if "labels" in f.keys() else None
+        if labels is not None and len(labels) != len(f["data"]):
+            raise ValueError(
+                f"'{data_file}' has {len(f['data'])} rows of data, "
+                f"but {len(labels)} labels."
+            )
+        yield f["data"], labels
+
+
+def get_n_rows(data_file: str) -> int:
+    """Get the number of rows of a data file."""
+    with open_data(data_file) as (data, _):
+        return len(data)
+
+
+def get_chunk_aligned_batch_size(dataset: h5py.Dataset, batch_size: int) -> int:
+    """
+    Round ``batch_size`` up to a multiple of the rows per chunk of ``dataset``.
+
+    Reading whole chunks prevents that a chunk has to be read (and
+    decompressed) several times.
+    """
+    if getattr(dataset, "chunks", None) is None:
+        return batch_size
+    chunk_rows = dataset.chunks[0]
+    return -(-batch_size // chunk_rows) * chunk_rows
+
+
+def get_shards(data_file: str, n_shards: int) -> List[Tuple[int, int]]:
+    """
+    Split the rows of ``data_file`` into ``n_shards`` contiguous ranges.
+
+    The boundaries are aligned to the chunks of the ``data`` dataset, so no
+    chunk has to be read by two shards. Shards might be empty.
+
+    Returns
+    -------
+    shards : List[Tuple[int, int]]
+        (start, stop) row ranges
+    """
+    assert n_shards >= 1
+    with open_data(data_file) as (data, _):
+        n_rows = len(data)
+        shard_size = get_chunk_aligned_batch_size(data, -(-n_rows // n_shards))
+    return [
+        (min(i * shard_size, n_rows), min((i + 1) * shard_size, n_rows))
+        for i in range(n_shards)
+    ]
+
+
+class ReadStats:
+
+    """
+    Time spent on reading batches and on waiting for them.
+
+    ``batches`` counts the reads. They cover whole chunks, so one read can
+    hold several batches of :func:`iter_data`.
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.read_seconds = 0.0
+        self.wait_seconds = 0.0
+
+
+def _iter_ranges(
+    data: h5py.Dataset,
+    labels: Optional[h5py.Dataset],
+    ranges: List[Tuple[int, int]],
+    stats: ReadStats,
+) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """Read the row ``ranges`` of ``data`` and ``labels`` one after another."""
+    for start, stop in ranges:
+        t0 = time.perf_counter()
+        x = data[start:stop]
+        y = None if labels is None else labels[start:stop]
+        duration = time.perf_counter() - t0
+        stats.batches += 1
+        stats.read_seconds += duration
+        stats.wait_seconds += duration
+        yield x, y
+
+
+def _iter_prefetched(
+    data: h5py.Dataset,
+    labels: Optional[h5py.Dataset],
+    ranges: List[Tuple[int, int]],
+    prefetch: int,
+    stats: ReadStats,
+) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    Read the row ``ranges`` in a background thread, up to ``prefetch`` ahead.
+
+    The rows get read into ``prefetch + 1`` preallocated buffers. A yielded
+    batch is a view of a buffer, which gets reused when the next batch is
+    requested.
+    """
+    if not ranges:
+        return
+    max_rows = max(stop - start for start, stop in ranges)
+    n_buffers = prefetch + 1
+    x_buffers = [
+        np.empty((max_rows,) + data.shape[1:], dtype=data.dtype)
+        for _ in range(n_buffers)
+    ]
+    y_buffers = [
+        None
+        if labels is None
+        else np.empty((max_rows,) + labels.shape[1:], dtype=labels.dtype)
+        for _ in range(n_buffers)
+    ]
+    free: "queue.Queue" = queue.Queue()
+    for i in range(n_buffers):
+        free.put(i)
+    full: "queue.Queue" = queue.Queue()
+    stopped = threading.Event()
+
+    def read():
+        try:
+            for start, stop in ranges:
+                i = free.get()
+                if stopped.is_set():
+                    return
+                t0 = time.perf_counter()
+                n = stop - start
+                if n > 0:
+                    data.read_direct(x_buffers[i], np.s_[start:stop], np.s_[0:n])
+                    if labels is not None:
+                        labels.read_direct(y_buffers[i], np.s_[start:stop], np.s_[0:n])
+                stats.read_seconds += time.perf_counter() - t0
+                full.put((i, n))
+            full.put(None)
+        except Exception as e:  # the consumer re-raises it
+            full.put(e)
+
+    thread = threading.Thread(target=read, name="nntoolkit-prefetch", daemon=True)
+    thread.start()
+    previous = None
+    try:
+        while True:
+            if previous is not None:
+                free.put(previous)
+            t0 = time.perf_counter()
+            item = full.get()
+            stats.wait_seconds += time.perf_counter() - t0
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            previous, n = item
+            stats.batches += 1
+            y = y_buffers[previous]
+            yield x_buffers[previous][:n], None if y is None else y[:n]
+    finally:
+        stopped.set()
+        free.put(0)
+        thread.join()
+
+
+def _iter_blocks(
+    data, labels, ranges: List[Tuple[int, int]], prefetch: int, stats: ReadStats
+) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    # Slices of memory-mapped arrays are views, there is nothing to prefetch
+    if prefetch == 0 or isinstance(data, np.ndarray):
+        return _iter_ranges(data, labels, ranges, stats)
+    return _iter_prefetched(data, labels, ranges, prefetch, stats)
+
+
+def _split_blocks(
+    blocks: Iterator[Tuple[np.ndarray, Optional[np.ndarray]]],
+    batch_size: int,
+    copy: bool,
+) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    Split blocks of rows into batches of ``batch_size`` rows.
+
+    Batches within a block are views of it; only a batch which spans two
+    blocks gets copied. Only the last batch can be smaller. If ``copy`` is
+    True, the blocks are reused buffers and the rows which get carried over
+    to the next block are copied.
+    """
+    rest_x: Optional[np.ndarray] = None
+    rest_y: Optional[np.ndarray] = None
+    for x, y in blocks:
+        if rest_x is not None:
+            # Complete the batch which was started in the previous block
+            n_missing = batch_size - len(rest_x)
+            x_batch = np.concatenate([rest_x, x[:n_missing]])
+            y_batch = None if y is None else np.concatenate([rest_y, y[:n_missing]])
+            x, y = x[n_missing:], None if y is None else y[n_missing:]
+            rest_x = rest_y = None
+            if len(x_batch) < batch_size:
+                rest_x, rest_y = x_batch, y_batch
+                continue
+            yield x_batch, y_batch
+        n_full = len(x) - len(x) % batch_size
+        for i in range(0, n_full, batch_size):
+            yield x[i : i + batch_size], None if y is None else y[i : i + batch_size]
+        if n_full < len(x):
+            rest_x, rest_y = x[n_full:], None if y is None else y[n_full:]
+            if copy:
+                rest_x = rest_x.copy()
+                rest_y = None if rest_y is None else rest_y.copy()
+    if rest_x is not None:
+        yield rest_x, rest_y
+
+
+def iter_data(
+    data_file: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start: int = 0,
+    stop: Optional[int] = None,
+    prefetch: int = 0,
+    stats: Optional[ReadStats] = None,
+) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    Iterate over a data file in slices of rows.
+
+    Parameters
+    ----------
+    data_file : str
+        The path to an HDF5 file with a ``data`` and optionally a ``labels``
+        dataset or to a ``.npy`` or JSON file, see :func:`open_memmap`.
+    batch_size : int
+        The number of rows per slice; only the last one can be smaller. The
+        rows get read in blocks of whole chunks of the ``data`` dataset, so
+        no chunk gets read (and decompressed) twice.
+    start : int
+        The first row
+    stop : Optional[int]
+        The row after the last row. Defaults to the end of the dataset.
+    prefetch : int
+        Read up to this many blocks ahead in a background thread, so reading
+        (and decompressing) overlaps with the computation of the caller. The
+        yielded arrays are then views of reused buffers which are only valid
+        until the next slice is requested. Memory-mapped files are never prefetched;
+        their slices are read-only views.
+    stats : Optional[ReadStats]
+        Gets the time spent on reading and on waiting for the slices.
+
+    Yields
+    ------
+    (x, y): Tuple[np.ndarray, Optional[np.ndarray]]
+        Like :func:`nntoolkit.utils.get_data`, but only for a slice of rows.
+    """
+    assert batch_size >= 1
+    assert prefetch >= 0
+    if stats is None:
+        stats = ReadStats()
+
+    with open_data(data_file) as (data, labels):
+        read_size = get_chunk_aligned_batch_size(data, batch_size)
+        if stop is None:
+            stop = len(data)
+        ranges = [(i, min(i + read_size, stop)) for i in range(start, stop, read_size)]
+        blocks = _iter_blocks(data, labels, ranges, prefetch, stats)
+        copy = prefetch > 0 and not isinstance(data, np.ndarray)
+        for x, y in _split_blocks(blocks, batch_size, copy):
+            yield (x, None if y is None else y.reshape(len(x), 1))
+
+
+def iter_shuffled_data(
+    data_file: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    shuffle_buffer: int = DEFAULT_SHUFFLE_BUFFER,
+    rng: Optional[np.random.Generator] = None,
+    prefetch: int = 0,
+    stats: Optional[ReadStats] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Iterate over a labeled data file in shuffled minibatches.
+
+    The rows get read in blocks of whole chunks in a random order. The blocks
+    are copied into a preallocated buffer until ``shuffle_buffer`` rows are
+    in memory; these rows get shuffled and emitted as minibatches. Rows which
+    do not fill a complete minibatch stay in the buffer. So the memory usage
+    is bounded by the buffer of ``max(shuffle_buffer, batch_size)`` rows plus
+    one chunk, the ``prefetch + 1`` blocks which are read ahead and a copy of
+    the current minibatch and of the left-over rows (less than
+    ``batch_size``), not by the size of the data file.
+
+    Parameters
+    ----------
+    data_file : str
+        The path to an HDF5 file with a ``data`` and a ``labels`` dataset or
+        to a labeled ``.npy`` or JSON file, see :func:`open_memmap`.
+    batch_size : int
+        The number of rows per minibatch; only the last one can be smaller.
+    shuffle_buffer : int
+        The number of rows which get shuffled together. If it is at least the
+        number of rows, all rows get shuffled.
+    rng : Optional[np.random.Generator]
+    prefetch : int
+        Read up to this many blocks ahead in a background thread, see
+        :func:`iter_data`. The minibatches are always new arrays.
+    stats : Optional[ReadStats]
+        Gets the time spent on reading and on waiting for the blocks.
+
+    Yields
+    ------
+    (x, y): Tuple[np.ndarray, np.ndarray]
+        The features and the labels (one per row) of a minibatch
+    """
+    assert batch_size >= 1
+    assert shuffle_buffer >= 1
+    assert prefetch >= 0
+    if rng is None:
+        rng = np.random.default_rng()
+    if stats is None:
+        stats = ReadStats()
+
+    with open_data(data_file) as (data, labels):
+        if labels is None:
+            raise ValueError(f"'{data_file}' has no labels.")
+        if getattr(data, "chunks", None) is None:
+            row_bytes = data.dtype.itemsize * int(np.prod(data.shape[1:]))
+            block_rows = max(1, DEFAULT_CHUNK_BYTES // max(row_bytes, 1))
+        else:
+            block_rows = data.chunks[0]
+        n_rows = len(data)
+        ranges = [
+            (int(start), min(int(start) + block_rows, n_rows))
+            for start in rng.permutation(np.arange(0, n_rows, block_rows))
+        ]
+        blocks = _iter_blocks(data, labels, ranges, prefetch, stats)
+        capacity = min(max(shuffle_buffer, batch_size) + block_rows, n_rows)
+        buffer_x = np.empty((capacity,) + data.shape[1:], dtype=data.dtype)
+        buffer_y = np.empty(capacity, dtype=labels.dtype)
+        n_buffered = 0
+        for i, (x, y) in enumerate(blocks):
+            buffer_x[n_buffered : n_buffered + len(x)] = x
+            buffer_y[n_buffered : n_buffered + len(x)] = y.reshape(-1)
+            n_buffered += len(x)
+            is_last = i + 1 == len(ranges)
+            if n_buffered < shuffle_buffer and not is_last:
+                continue
+            order = rng.permutation(n_buffered)
+            n_emit = n_buffered if is_last else n_buffered - n_buffered % batch_size
+            for start in range(0, n_emit, batch_size):
+                indices = order[start : start + batch_size]
+                yield buffer_x[indices], buffer_y[indices]
+            rest = order[n_emit:]
+            buffer_x[: len(rest)] = buffer_x[rest]
+            buffer_y[: len(rest)] = buffer_y[rest]
+            n_buffered = len(rest)
+
+
+def get_dataset_options(
+    shape: Tuple[int, ...],
+    dtype,
+    chunk_rows: Optional[int] = None,
+    compression: Optional[str] = None,
+    shuffle: bool = False,
+) -> Dict[str, Any]:
+    """
+    Get the keyword arguments of ``h5py.Group.create_dataset`` for a layout.
+
+    Chunks always contain complete rows.
+
+    Parameters
+    ----------
+    shape : Tuple[int, ...]
+        The shape of the dataset
+    dtype : numpy.dtype
+    chunk_rows : Optional[int]
+        Rows per chunk. Defaults to as many rows as fit into
+        ``DEFAULT_CHUNK_BYTES``.
+    compression : Optional[str]
+        "gzip", "lzf" or None
+    shuffle : bool
+        Apply the byte shuffle filter, which often improves the compression
+        of numbers.
+
+    Returns
+    -------
+    options : Dict[str, Any]
+
+    Examples
+    --------
+    >>> get_dataset_options((10000, 1024), "float32", compression="lzf")
+    {'chunks': (64, 1024), 'compression': 'lzf'}
+    """
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"compression='{compression}' is not one of {COMPRESSIONS}.")
+    options: Dict[str, Any] = {}
+    if len(shape) == 0 or 0 in shape:
+        return options
+    row_bytes = int(np.prod(shape[1:], dtype=np.int64)) * np.dtype(dtype).itemsize
+    if chunk_rows is None:
+        chunk_rows = max(1, DEFAULT_CHUNK_BYTES // max(row_bytes, 1))
+    options["chunks"] = (min(chunk_rows, shape[0]),) + tuple(shape[1:])
+    if compression is not None:
+        options["compression"] = compression
+    if shuffle:
+        options["shuffle"] = True
+    return options
+
+
+def repack(
+    input_file: str,
+    output_file: str,
+    chunk_rows: Optional[int] = None,
+    compression: Optional[str] = None,
+    shuffle: bool = False,
+):
+    """
+    Copy all datasets of an HDF5 file with a new chunk layout and compression.
+
+    The datasets are copied in blocks of whole chunks, so they do not have to
+    fit into memory.
+    """
+    with h5py.File(input_file, "r") as f_in, h5py.File(output_file, "w") as f_out:
+        f_out.attrs.update(f_in.attrs)
+        for name, dataset in f_in.items():
+            if not isinstance(dataset, h5py.Dataset):
+                f_in.copy(dataset, f_out, name=name)
+                continue
+            if dataset.ndim == 0:
+                f_out.create_dataset(name, data=dataset[()])
+                continue
+            options = get_dataset_options(
+                dataset.shape, dataset.dtype, chunk_rows, compression, shuffle
+            )
+            copy = f_out.create_dataset(
+                name, shape=dataset.shape, dtype=dataset.dtype, **options
+            )
+            copy.attrs.update(dataset.attrs)
+            # Copy about 64 chunks at once
+            block_rows = options.get("chunks", (1,))[0] * 64
+            for start in range(0, len(dataset), block_rows):
+                copy[start : start + block_rows] = dataset[start : start + block_rows]
+    logger.info("Repacked '%s' to '%s'.", input_file, output_file)
+
+
+def measure_read_throughput(
+    data_file: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    n_random_rows: int = 1000,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """
+    Measure how fast the ``data`` dataset of ``data_file`` can be read.
+
+    Returns
+    -------
+    throughput : Dict[str, float]
+        ``sequential_rows_per_sec`` and ``sequential_mb_per_sec`` for reading
+        all rows with :func:`iter_data`, ``random_rows_per_sec`` for reading
+        ``n_random_rows`` single rows at random positions.
+    """
+    t0 = time.perf_counter()
+    n_rows = 0
+    n_bytes = 0
+    # Slices of memory-mapped files are views; copying them reads the rows
+    for x, _ in iter_data(data_file, batch_size):
+        x = np.array(x)
+        n_rows += len(x)
+        n_bytes += x.nbytes
+    sequential = max(time.perf_counter() - t0, 1e-9)
+    with open_data(data_file) as (data, _):
+        rows = np.random.RandomState(seed).randint(
+            0, len(data), size=min(n_random_rows, len(data))
+        )
+        t0 = time.perf_counter()
+        for row in rows:
+            np.array(data[row])
+        random = max(time.perf_counter() - t0, 1e-9)
+    return {
+        "sequential_rows_per_sec": n_rows / sequential,
+        "sequential_mb_per_sec": n_bytes / sequential / 10**6,
+        "random_rows_per_sec": len(rows) / random,
+    }
+
+
+def repack_and_report(
+    input_file: str,
+    output_file: str,
+    chunk_rows: Optional[int] = None,
+    compression: Optional[str] = None,
+    shuffle: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[str, Dict[str, float]]:
+    """
+    :func:`repack` ``input_file`` and print the read throughput of both files.
+
+    Returns
+    -------
+    report : Dict[str, Dict[str, float]]
+        The file size and :func:`measure_read_throughput` of the ``before``
+        and the ``after`` file.
+    """
+    report = {"before": measure_read_throughput(input_file, batch_size)}
+    repack(input_file, output_file, chunk_rows, compression, shuffle)
+    report["after"] = measure_read_throughput(output_file, batch_size)
+    for name, path in [("before", input_file), ("after", output_file)]:
+        report[name]["file_bytes"] = os.path.getsize(path)
+    print(
+        "{:<7s} {:>14s} {:>17s} {:>12s} {:>17s}".format(
+            "", "file [bytes]", "sequential [MB/s]", "[rows/sec]", "random [rows/sec]"
+        )
+    )
+    for name, stats in report.items():
+        print(
+            "{:<7s} {:>14d} {:>17.1f} {:>12.1f} {:>17.1f}".format(
+                name,
+                stats["file_bytes"],
+                stats["sequential_mb_per_sec"],
+                stats["sequential_rows_per_sec"],
+                stats["random_rows_per_sec"],
+            )
+        )
+    return report
@@ -5,13 +5,14 @@
 # Core Library modules
 import json
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 # Third party modules
 import numpy as np
 
 # First party modules
-import nntoolkit.utils as utils
+import nntoolkit.cache as cache
+import nntoolkit.profiling as profiling
 
 logger = logging.getLogger(__name__)
 
@@ -53,15 +54,48 @@ def get_model_output(model_dict: Dict[str, Any], x: np.ndarray):
     The output vector of the model
     """
     if model_dict["type"] == "mlp":
-        for layer in model_dict["layers"]:
-            b, W, activation = layer["b"], layer["W"], layer["activation"]
-            x = np.dot(x, W)
-            x = activation(x + b)
-        x = x[0]
+        x = get_batch_output(model_dict, x)[0]
     # create_keras_model(model_dict)
     return x
 
 
+def get_batch_output(model_dict: Dict[str, Any], x: np.ndarray) -> np.ndarray:
+    """
+    Get the model output for a batch of feature vectors.
+
+    Parameters
+    ----------
+    model_dict : Dict[str, Any]
+    x : np.ndarray
+        A matrix with one feature vector per row.
+
+    Returns
+    -------
+    A matrix with one output vector per row of ``x``.
+    """
+    if profiling.get_profiler() is not None:
+        for i, layer in enumerate(model_dict["layers"]):
+            b, W, activation = layer["b"], layer["W"], layer["activation"]
+            flops = profiling.dense_layer_flops(len(x), *W.shape)
+            with profiling.stage(f"layer {i}: dot", flops):
+                x = np.dot(x, W)
+                if "W_scale" in layer:
+                    x = x * layer["W_scale"]
+            with profiling.stage(f"layer {i}: bias", x.size):
+                x = x + b
+            with profiling.stage(f"layer {i}: {activation}"):
+                x = activation(x)
+        return x
+    for layer in model_dict["layers"]:
+        b, W, activation = layer["b"], layer["W"], layer["activation"]
+        x = np.dot(x, W)
+        if "W_scale" in layer:
+            # int8 weights with one scale per output neuron
+            x = x * layer["W_scale"]
+        x = activation(x + b)
+    return x
+
+
 def create_keras_model(model_dict):
     # Core Library modules
     import os
@@ -98,8 +132,57 @@ def create_keras_model(model_dict):
     logger.info(f"Stored keras file at: {filepath}")
 
 
+def get_top_k(model_output: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the ``k`` most probable classes without sorting all outputs.
+
+    Parameters
+    ----------
+    model_output : np.ndarray
+        An output vector or a matrix with one output vector per row.
+    k : int
+        Gets reduced to the number of classes if it is larger.
+
+    Returns
+    -------
+    (indices, probabilities) : Tuple[np.ndarray, np.ndarray]
+        Both have the shape of ``model_output`` with the last axis reduced to
+        ``k``. They are sorted by decreasing probability; ties are sorted by
+        the index.
+
+    Examples
+    --------
+    >>> get_top_k(np.array([0.1, 0.5, 0.1, 0.3]), 2)
+    (array([1, 3]), array([0.5, 0.3]))
+    >>> get_top_k(np.array([0.2, 0.2, 0.6]), 2)
+    (array([2, 0]), array([0.6, 0.2]))
+    """
+    model_output = np.asarray(model_output)
+    n = model_output.shape[-1]
+    k = min(k, n)
+    if k < n:
+        indices = np.argpartition(model_output, n - k, axis=-1)[..., n - k :]
+        probabilities = np.take_along_axis(model_output, indices, axis=-1)
+        # The partition picks arbitrary ones of the values which are tied at
+        # the boundary; a stable sort picks those with the smallest indices
+        threshold = probabilities.min(axis=-1, keepdims=True)
+        straddles = np.count_nonzero(model_output >= threshold, axis=-1) > k
+        if np.any(straddles):
+            indices[straddles] = np.argsort(
+                -model_output[straddles], axis=-1, kind="stable"
+            )[..., :k]
+    else:
+        indices = np.broadcast_to(np.arange(n), model_output.shape)
+    probabilities = np.take_along_axis(model_output, indices, axis=-1)
+    order = np.lexsort((indices, -probabilities), axis=-1)
+    return (
+        np.take_along_axis(indices, order, axis=-1),
+        np.take_along_axis(probabilities, order, axis=-1),
+    )
+
+
 def get_results(
-    model_output: List[Any], output_semantics: List[Any]
+    model_output: List[Any], output_semantics: List[Any], k: Optional[int] = None
 ) -> List[Dict[str, Any]]:
     """
     Get the prediction with semantics.
@@ -110,26 +193,32 @@ def get_results(
         A list of probabilities
     output_semantics : List[Any]
         A list of semantics
+    k : Optional[int]
+        Only return the ``k`` most probable results. Semantics are only looked
+        up for those.
 
     Returns
     -------
     A list of dictionaries which have probability and semantics as keys.
     """
-    results = []
-    for symbolnr, prob in enumerate(model_output):
-        results.append(
-            {
-                "symbolnr": symbolnr,
-                "probability": prob,
-                "semantics": output_semantics[symbolnr],
-            }
-        )
-    results = sorted(results, key=lambda x: x["probability"], reverse=True)
-    return results
+    if k is None:
+        k = len(model_output)
+    indices, probabilities = get_top_k(model_output, k)
+    return [
+        {
+            "symbolnr": symbolnr,
+            "probability": prob,
+            "semantics": output_semantics[symbolnr],
+        }
+        for symbolnr, prob in zip(indices.tolist(), probabilities)
+    ]
 
 
 def main(
-    modelfile: str, features: List[float], print_results: bool = True
+    modelfile: str,
+    features: List[float],
+    print_results: bool = True,
+    k: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
     """
     Evaluate the model described in ``modelfile`` with ``inputvec`` as input
@@ -140,24 +229,26 @@ def main(
     features : List[float]
     print_results : bool
         Print results if True. Always return results.
+    k : Optional[int]
+        Only return the ``k`` most probable answers.
 
     Returns
     -------
     List of possible answers, reverse-sorted by probability.
     """
-    model = utils.get_model(modelfile)
-    if not model:
+    predictor = cache.get_predictor(modelfile)
+    if predictor is None:
         return []
-    x = np.array([features])
-    model_output = get_model_output(model, x)
-    results = get_results(model_output, model["outputs"])
+    model_output = predictor.predict_one(features)
+    with profiling.stage("get_results"):
+        results = get_results(model_output, predictor.outputs, k)
 
     if print_results:
-        show_results(results, n=10)
+        show_results(results, n=len(results))
     return results
 
 
-def main_bash(modelfile, inputvec_file, print_results=True):
+def main_bash(modelfile, inputvec_file, print_results=True, k=None):
     """Evaluate the model described in ``modelfile`` with ``inputvec_file`` as
        input data.
 
@@ -168,10 +259,12 @@ def main_bash(modelfile, inputvec_file, print_results=True):
         This list contains floats.
     print_results : bool
         Print results if True.
+    k : Optional[int]
+        Only return the ``k`` most probable answers.
 
     Returns
     -------
     results
     """
     features = json.load(open(inputvec_file))
-    return main(modelfile, features, print_results)
+    return main(modelfile, features, print_results, k)
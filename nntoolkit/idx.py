@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+
+"""
+Convert files in the IDX format (e.g. MNIST) to HDF5 data files.
+
+An IDX file starts with two zero bytes, a byte for the type of the values and
+a byte for the number of dimensions, followed by the size of every dimension
+as big-endian unsigned 32-bit integer and the values in C order.
+"""
+
+# Core Library modules
+import gzip
+import logging
+import struct
+from typing import IO, Iterator, Optional, Tuple
+
+# Third party modules
+import h5py
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IDX_DTYPES = {
+    0x08: np.dtype(">u1"),
+    0x09: np.dtype(">i1"),
+    0x0B: np.dtype(">i2"),
+    0x0C: np.dtype(">i4"),
+    0x0D: np.dtype(">f4"),
+    0x0E: np.dtype(">f8"),
+}
+
+DEFAULT_CHUNK_ROWS = 1024
+
+
+def open_idx(path: str) -> IO[bytes]:
+    """Open an IDX file for reading; ``.gz`` files get decompressed."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_header(f: IO[bytes]) -> Tuple[np.dtype, Tuple[int, ...]]:
+    """
+    Read the header of the IDX file ``f``.
+
+    Returns
+    -------
+    (dtype, shape) : Tuple[np.dtype, Tuple[int, ...]]
+    """
+    zeros, type_code, ndim = struct.unpack(">HBB", f.read(4))
+    if zeros != 0 or type_code not in IDX_DTYPES:
+        raise ValueError("This is not an IDX file.")
+    shape = struct.unpack(f">{ndim}I", f.read(4 * ndim))
+    return IDX_DTYPES[type_code], shape
+
+
+def _read_rows(f: IO[bytes], dtype: np.dtype, row_shape, n_rows: int) -> np.ndarray:
+    n_bytes = n_rows * int(np.prod(row_shape, dtype=np.int64)) * dtype.itemsize
+    buffer = f.read(n_bytes)
+    if len(buffer) != n_bytes:
+        raise ValueError("The IDX file is truncated.")
+    # Convert big-endian values to the native byte order
+    values = np.frombuffer(buffer, dtype=dtype).astype(dtype.newbyteorder("="))
+    return values.reshape((n_rows,) + tuple(row_shape))
+
+
+def read_idx(path: str) -> np.ndarray:
+    """
+    Read a complete IDX file with a single buffer read.
+
+    Examples
+    --------
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "labels.idx")
+    >>> with open(path, "wb") as f:
+    ...     _ = f.write(bytes([0, 0, 0x08, 1, 0, 0, 0, 3, 7, 2, 1]))
+    >>> read_idx(path)
+    array([7, 2, 1], dtype=uint8)
+    """
+    with open_idx(path) as f:
+        dtype, shape = read_header(f)
+        return _read_rows(f, dtype, shape[1:], shape[0])
+
+
+def iter_idx(
+    path: str, block_rows: int = 65536
+) -> Iterator[Tuple[Tuple[int, ...], np.ndarray]]:
+    """
+    Read an IDX file in blocks of ``block_rows`` rows.
+
+    Yields
+    ------
+    (shape, block) : Tuple[Tuple[int, ...], np.ndarray]
+        The shape of the complete file and the next block of rows.
+    """
+    assert block_rows >= 1
+    with open_idx(path) as f:
+        dtype, shape = read_header(f)
+        for start in range(0, shape[0], block_rows):
+            n_rows = min(block_rows, shape[0] - start)
+            yield shape, _read_rows(f, dtype, shape[1:], n_rows)
+
+
+def get_shape(path: str) -> Tuple[int, ...]:
+    """Get the shape of the values in an IDX file by reading its header."""
+    with open_idx(path) as f:
+        return read_header(f)[1]
+
+
+def import_idx(
+    images_file: str,
+    data_file: str,
+    labels_file: Optional[str] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    normalize: bool = False,
+    compression: Optional[str] = None,
+) -> int:
+    """
+    Write an IDX file with features (and one with labels) to an HDF5 file.
+
+    The IDX files are streamed in blocks, so they do not have to fit into
+    memory. Every row of ``images_file`` gets flattened into one row of the
+    ``data`` dataset; the labels go to the ``labels`` dataset.
+
+    Parameters
+    ----------
+    images_file : str
+    data_file : str
+        The HDF5 file which gets written, see :mod:`nntoolkit.data`
+    labels_file : Optional[str]
+    chunk_rows : int
+        Rows per HDF5 chunk
+    normalize : bool
+        Store the features as float32 divided by the largest value of the
+        IDX type (e.g. 255 for unsigned bytes) instead of the IDX type.
+    compression : Optional[str]
+        An HDF5 compression filter like "gzip" or "lzf".
+
+    Returns
+    -------
+    n_rows : int
+    """
+    assert chunk_rows >= 1
+    shape = get_shape(images_file)
+    n_rows, n_features = shape[0], int(np.prod(shape[1:], dtype=np.int64))
+    if n_rows == 0:
+        raise ValueError(f"'{images_file}' does not contain any rows.")
+    if labels_file is not None and get_shape(labels_file)[0] != n_rows:
+        raise ValueError(
+            f"'{images_file}' has {n_rows} rows, but '{labels_file}' has "
+            f"{get_shape(labels_file)[0]} labels."
+        )
+    # Blocks of whole chunks keep every chunk written once
+    block_rows = chunk_rows * max(1, (64 * 2**20) // max(1, chunk_rows * n_features))
+    with h5py.File(data_file, "w") as f:
+        dataset = None
+        row = 0
+        for _, block in iter_idx(images_file, block_rows):
+            x = block.reshape(len(block), n_features)
+            if normalize:
+                x = x.astype(np.float32)
+                if np.issubdtype(block.dtype, np.integer):
+                    x /= np.iinfo(block.dtype).max
+            if dataset is None:
+                dataset = f.create_dataset(
+                    "data",
+                    shape=(n_rows, n_features),
+                    dtype=x.dtype,
+                    chunks=(min(chunk_rows, n_rows), max(n_features, 1)),
+                    compression=compression,
+                )
+            dataset[row : row + len(x)] = x
+            row += len(x)
+        if labels_file is not None:
+            labels = None
+            row = 0
+            for _, block in iter_idx(labels_file, block_rows):
+                if labels is None:
+                    labels = f.create_dataset(
+                        "labels",
+                        shape=(n_rows,) + block.shape[1:],
+                        dtype=block.dtype,
+                        chunks=(min(chunk_rows, n_rows),) + block.shape[1:],
+                        compression=compression,
+                    )
+                labels[row : row + len(block)] = block
+                row += len(block)
+    logger.info(
+        "Wrote %i rows with %i features to '%s'.", n_rows, n_features, data_file
+    )
+    return n_rows
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+
+"""Compiled inference plans for fast, repeated model evaluation."""
+
+# Core Library modules
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Third party modules
+import numpy as np
+
+# First party modules
+import nntoolkit.profiling as profiling
+
+
+def get_weights(layer: Dict[str, Any], dtype=None) -> np.ndarray:
+    """
+    Get the weight matrix ``W`` of ``layer`` as floating point numbers.
+
+    Weights quantized to int8 by :mod:`nntoolkit.quantize` are multiplied
+    with their per-output-neuron scales ``W_scale``.
+    """
+    W = layer["W"]
+    if "W_scale" in layer:
+        if dtype is None:
+            dtype = layer["W_scale"].dtype
+        return W.astype(dtype) * layer["W_scale"].astype(dtype)
+    return np.asarray(W, dtype=dtype)
+
+
+class Layer:
+
+    """
+    A fully connected layer with contiguous weights.
+
+    ``scale`` is None or one factor per output neuron for ``x @ W``.
+    """
+
+    __slots__ = ("W", "b", "activation", "scale")
+
+    def __init__(
+        self,
+        W: np.ndarray,
+        b: np.ndarray,
+        activation,
+        scale: Optional[np.ndarray] = None,
+    ):
+        self.W = W
+        self.b = b
+        self.activation = activation
+        self.scale = scale
+
+    def __repr__(self):
+        return "Layer({}x{}, {})".format(
+            self.W.shape[0], self.W.shape[1], self.activation
+        )
+
+
+class CompiledMLP:
+
+    """
+    A multi-layer perceptron which is prepared for repeated evaluation.
+
+    Biases and full-precision weights get converted to one contiguous dtype
+    once. Quantized weights (int8 or float16) are kept as they are, so they
+    only take their reduced memory; like :func:`nntoolkit.evaluate.get_batch_output`,
+    the per-output-neuron scales of int8 weights get applied to the result of
+    the matrix product. Scratch buffers
+    for the layer outputs are allocated once per batch size and reused, and
+    bias-add and activation are applied in place.
+
+    The scratch buffers are kept per thread, so one instance can be shared
+    between threads, e.g. through :func:`nntoolkit.cache.get_predictor`.
+
+    Parameters
+    ----------
+    model : Dict[str, Any]
+        A model as returned by :func:`nntoolkit.utils.get_model`
+    dtype : Optional[numpy.dtype]
+        The dtype used for the computation. Defaults to the common floating
+        point dtype of all weights, but at least float32.
+    max_batch_sizes : int
+        For how many different batch sizes scratch buffers are kept.
+    """
+
+    def __init__(
+        self,
+        model: Dict[str, Any],
+        dtype: Optional[np.dtype] = None,
+        max_batch_sizes: int = 4,
+    ):
+        if model["type"] != "mlp":
+            raise NotImplementedError(
+                f"type='{model['type']}' is not implemented. "
+                "Only type='mlp' is implemented so far."
+            )
+        if dtype is None:
+            dtype = np.result_type(
+                np.float32,
+                *{
+                    value.dtype
+                    for layer in model["layers"]
+                    for value in layer.values()
+                    if isinstance(value, np.ndarray) and value.dtype.kind == "f"
+                },
+            )
+        self.dtype = np.dtype(dtype)
+        self.layers: List[Layer] = [
+            self._compile_layer(layer) for layer in model["layers"]
+        ]
+        # The semantics of the output neurons
+        self.outputs: Optional[List[Any]] = model.get("outputs")
+        self.max_batch_sizes = max_batch_sizes
+        self._local = threading.local()
+
+    def _compile_layer(self, layer: Dict[str, Any]) -> Layer:
+        W = layer["W"]
+        scale = None
+        if "W_scale" in layer:
+            scale = np.ascontiguousarray(layer["W_scale"], dtype=self.dtype)
+            scale = scale.reshape(-1)
+            W = np.ascontiguousarray(W)
+        elif W.dtype.kind == "f" and W.dtype.itemsize < self.dtype.itemsize:
+            W = np.ascontiguousarray(W)
+        else:
+            W = np.ascontiguousarray(W, dtype=self.dtype)
+        b = np.ascontiguousarray(layer["b"], dtype=self.dtype).reshape(-1)
+        return Layer(W, b, layer["activation"], scale)
+
+    def __repr__(self):
+        return "CompiledMLP({}, dtype={})".format(self.layers, self.dtype)
+
+    @property
+    def n_inputs(self) -> int:
+        """The number of input neurons."""
+        return self.layers[0].W.shape[0]
+
+    @property
+    def n_outputs(self) -> int:
+        """The number of output neurons."""
+        return self.layers[-1].W.shape[1]
+
+    def _get_buffers(self, batch_size: int) -> List[np.ndarray]:
+        cached: "Optional[OrderedDict[int, List[np.ndarray]]]"
+        cached = getattr(self._local, "buffers", None)
+        if cached is None:
+            cached = self._local.buffers = OrderedDict()
+        if batch_size in cached:
+            cached.move_to_end(batch_size)
+            return cached[batch_size]
+        buffers = [
+            np.empty((batch_size, layer.W.shape[1]), dtype=self.dtype)
+            for layer in self.layers
+        ]
+        cached[batch_size] = buffers
+        while len(cached) > self.max_batch_sizes:
+            cached.popitem(last=False)
+        return buffers
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Get the model output for a batch of feature vectors.
+
+        Parameters
+        ----------
+        batch : np.ndarray
+            A matrix with one feature vector per row.
+
+        Returns
+        -------
+        A new matrix with one output vector per row of ``batch``.
+        """
+        x = np.ascontiguousarray(batch, dtype=self.dtype)
+        if x.ndim != 2 or x.shape[1] != self.n_inputs:
+            raise ValueError(
+                f"Expected a batch of shape (n, {self.n_inputs}), got {x.shape}."
+            )
+        profiler = profiling.get_profiler()
+        if profiler is not None:
+            return self._predict_profiled(x, profiler)
+        for layer, out in zip(self.layers, self._get_buffers(len(x))):
+            np.dot(x, layer.W, out=out)
+            if layer.scale is not None:
+                out *= layer.scale
+            out += layer.b
+            layer.activation(out, out=out)
+            x = out
+        return x.copy()
+
+    def _predict_profiled(
+        self, x: np.ndarray, profiler: "profiling.Profiler"
+    ) -> np.ndarray:
+        clock = time.perf_counter
+        for i, (layer, out) in enumerate(zip(self.layers, self._get_buffers(len(x)))):
+            t0 = clock()
+            np.dot(x, layer.W, out=out)
+            if layer.scale is not None:
+                out *= layer.scale
+            t1 = clock()
+            out += layer.b
+            t2 = clock()
+            layer.activation(out, out=out)
+            t3 = clock()
+            profiler.add(
+                f"layer {i}: dot",
+                t1 - t0,
+                profiling.dense_layer_flops(len(x), *layer.W.shape),
+            )
+            profiler.add(f"layer {i}: bias", t2 - t1, out.size)
+            profiler.add(f"layer {i}: {layer.activation}", t3 - t2)
+            x = out
+        return x.copy()
+
+    def predict_one(self, vec: np.ndarray) -> np.ndarray:
+        """Get the output vector of the model for one feature vector."""
+        return self.predict(np.reshape(vec, (1, -1)))[0]
@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+
+"""
+Inspect a model file without loading its weights.
+
+Only ``model.yml`` and the HDF5 metadata of a ``.tar`` model (or the header
+of a ``.nnt`` model) get read. The shapes and dtypes of the weight arrays are
+enough to compute the number of parameters, the memory usage and the
+floating point operations, and to estimate the latency with a roofline
+model: every layer takes at least its operations divided by the peak
+GFLOP/s and at least the bytes it touches divided by the memory bandwidth.
+"""
+
+# Core Library modules
+import os
+import tarfile
+import time
+from typing import Any, Dict, List, Optional
+
+# Third party modules
+import h5py
+import numpy as np
+import yaml
+
+# First party modules
+import nntoolkit.nnt as nnt
+import nntoolkit.profiling as profiling
+import nntoolkit.utils as utils
+
+
+def _get_array_info(shape, dtype, disk_bytes: Optional[int] = None) -> Dict[str, Any]:
+    dtype = np.dtype(dtype)
+    shape = [int(n) for n in shape]
+    return {
+        "shape": shape,
+        "dtype": dtype.name,
+        "nbytes": int(np.prod(shape, dtype=np.int64)) * dtype.itemsize,
+        "disk_bytes": disk_bytes,
+    }
+
+
+def read_metadata(model_file: str) -> Dict[str, Any]:
+    """
+    Read the description of a model without its weight arrays.
+
+    Parameters
+    ----------
+    model_file : str
+        A ``.tar`` or ``.nnt`` model file
+
+    Returns
+    -------
+    metadata : Dict[str, Any]
+        ``type``, ``format``, ``file_bytes``, ``quantization`` and ``layers``.
+        Every layer has an ``activation`` and an ``arrays`` dictionary which
+        maps ``W``, ``b`` (and ``W_scale``) to their ``shape``, ``dtype``,
+        ``nbytes`` in memory and ``disk_bytes`` (None if unknown).
+    """
+    if not os.path.isfile(model_file):
+        raise FileNotFoundError(f"File '{model_file}' does not exist.")
+    metadata: Dict[str, Any] = {"file_bytes": os.path.getsize(model_file)}
+    if nnt.is_nnt_file(model_file):
+        header = nnt.read_header(model_file)
+        metadata["format"] = "nnt"
+        layers = []
+        for layer in header["layers"]:
+            arrays = {
+                key: _get_array_info(value["shape"], value["dtype"])
+                for key, value in layer.items()
+                if isinstance(value, dict) and "offset" in value
+            }
+            for info in arrays.values():
+                info["disk_bytes"] = info["nbytes"]
+            layers.append({"activation": layer["activation"], "arrays": arrays})
+    else:
+        if not tarfile.is_tarfile(model_file):
+            raise ValueError(f"'{model_file}' is neither a .tar nor a .nnt model.")
+        metadata["format"] = "tar"
+        with tarfile.open(model_file) as tar:
+            members = utils.get_tar_index(tar)
+            if not utils.is_valid_model_tar(model_file, members):
+                raise ValueError(f"'{model_file}' is not a valid model file.")
+            with tar.extractfile(members["model.yml"]) as f:
+                header = yaml.safe_load(f)
+            layers = []
+            for layer in header["layers"]:
+                arrays = {}
+                for key, value in layer.items():
+                    if not (isinstance(value, dict) and "filename" in value):
+                        continue
+                    member = members[value["filename"]]
+                    # h5py only reads the metadata of the dataset here
+                    with tar.extractfile(member) as fileobj, h5py.File(
+                        fileobj, "r"
+                    ) as f:
+                        dataset = f[member.name]
+                        arrays[key] = _get_array_info(
+                            dataset.shape, dataset.dtype, member.size
+                        )
+                layers.append({"activation": layer["activation"], "arrays": arrays})
+    metadata["type"] = header["type"]
+    metadata["quantization"] = header.get("quantization")
+    metadata["layers"] = layers
+    return metadata
+
+
+def get_compute_dtype(metadata: Dict[str, Any]) -> np.dtype:
+    """Get the dtype :class:`nntoolkit.inference.CompiledMLP` computes with."""
+    return np.result_type(
+        np.float32,
+        *{
+            np.dtype(info["dtype"])
+            for layer in metadata["layers"]
+            for info in layer["arrays"].values()
+            if np.dtype(info["dtype"]).kind == "f"
+        },
+    )
+
+
+def measure_gflops(dtype=np.float32, n: int = 512, repeat: int = 3) -> float:
+    """Measure the GFLOP/s of an ``n`` × ``n`` matrix product."""
+    a = np.ones((n, n), dtype=dtype)
+    out = np.empty_like(a)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        np.dot(a, a, out=out)
+        best = min(best, time.perf_counter() - t0)
+    return profiling.dense_layer_flops(n, n, n) / max(best, 1e-9) / 10**9
+
+
+def measure_bandwidth(n_bytes: int = 2**26, repeat: int = 3) -> float:
+    """Measure the memory bandwidth in GB/s by copying ``n_bytes``."""
+    source = np.ones(n_bytes, dtype=np.uint8)
+    target = np.empty_like(source)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        np.copyto(target, source)
+        best = min(best, time.perf_counter() - t0)
+    # A copy reads and writes every byte
+    return 2 * n_bytes / max(best, 1e-9) / 10**9
+
+
+def get_report(
+    metadata: Dict[str, Any],
+    batch_size: int = 1,
+    gflops: Optional[float] = None,
+    bandwidth: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Compute the size, the cost and the estimated latency of a model.
+
+    Parameters
+    ----------
+    metadata : Dict[str, Any]
+        As returned by :func:`read_metadata`
+    batch_size : int
+    gflops : Optional[float]
+        Peak GFLOP/s. Gets measured with :func:`measure_gflops` if None.
+    bandwidth : Optional[float]
+        Memory bandwidth in GB/s. Gets measured with :func:`measure_bandwidth`
+        if None.
+
+    Returns
+    -------
+    report : Dict[str, Any]
+        ``memory_bytes`` are the loaded weight arrays, ``compiled_bytes`` the
+        additional copies :class:`nntoolkit.inference.CompiledMLP` makes when
+        it converts them to ``compute_dtype``, ``activation_bytes`` the input,
+        the scratch buffers and the output for one batch. ``peak_bytes`` is
+        their sum. ``latency_s`` is the roofline estimate for one batch.
+    """
+    assert batch_size >= 1
+    compute_dtype = get_compute_dtype(metadata)
+    if gflops is None:
+        gflops = measure_gflops(compute_dtype)
+    if bandwidth is None:
+        bandwidth = measure_bandwidth()
+    itemsize = compute_dtype.itemsize
+    layers: List[Dict[str, Any]] = []
+    for layer in metadata["layers"]:
+        arrays = layer["arrays"]
+        n_in, n_out = arrays["W"]["shape"]
+        flops = profiling.dense_layer_flops(1, n_in, n_out) + n_out
+        # Biases and full-precision weights in another dtype get copied,
+        # quantized weights are used as they are
+        copied = ["b"]
+        W_dtype = np.dtype(arrays["W"]["dtype"])
+        if "W_scale" not in arrays and W_dtype.itemsize >= itemsize:
+            copied.append("W")
+        compiled_bytes = sum(
+            arrays[key]["nbytes"] // np.dtype(arrays[key]["dtype"]).itemsize * itemsize
+            for key in copied
+            if np.dtype(arrays[key]["dtype"]) != compute_dtype
+        )
+        touched_bytes = (n_in * n_out + n_out + batch_size * (n_in + n_out)) * itemsize
+        layers.append(
+            {
+                "shape": [n_in, n_out],
+                "activation": layer["activation"],
+                "parameters": n_in * n_out + n_out,
+                "flops_per_sample": flops,
+                "compiled_bytes": compiled_bytes,
+                "latency_s": max(
+                    batch_size * flops / (gflops * 10**9),
+                    touched_bytes / (bandwidth * 10**9),
+                ),
+            }
+        )
+    n_inputs = layers[0]["shape"][0] if layers else 0
+    n_outputs = layers[-1]["shape"][1] if layers else 0
+    all_arrays = [
+        info for layer in metadata["layers"] for info in layer["arrays"].values()
+    ]
+    disk_bytes = [info["disk_bytes"] for info in all_arrays]
+    activation_bytes = (
+        batch_size
+        * (n_inputs + sum(layer["shape"][1] for layer in layers) + n_outputs)
+        * itemsize
+    )
+    memory_bytes = sum(info["nbytes"] for info in all_arrays)
+    compiled_bytes = sum(layer["compiled_bytes"] for layer in layers)
+    latency = sum(layer["latency_s"] for layer in layers)
+    return {
+        "format": metadata["format"],
+        "quantization": metadata["quantization"],
+        "layers": layers,
+        "parameters": sum(layer["parameters"] for layer in layers),
+        "file_bytes": metadata["file_bytes"],
+        "disk_bytes": None if None in disk_bytes else sum(disk_bytes),
+        "memory_bytes": memory_bytes,
+        "compute_dtype": compute_dtype.name,
+        "compiled_bytes": compiled_bytes,
+        "flops_per_sample": sum(layer["flops_per_sample"] for layer in layers),
+        "batch_size": batch_size,
+        "activation_bytes": activation_bytes,
+        "peak_bytes": memory_bytes + compiled_bytes + activation_bytes,
+        "gflops": gflops,
+        "bandwidth_gb_per_s": bandwidth,
+        "latency_s": latency,
+        "rows_per_sec": batch_size / max(latency, 1e-12),
+    }
+
+
+def format_bytes(n_bytes: Optional[int]) -> str:
+    """
+    Format a number of bytes for humans.
+
+    Examples
+    --------
+    >>> format_bytes(3 * 2**20)
+    '3.0 MiB'
+    """
+    if n_bytes is None:
+        return "unknown"
+    size = float(n_bytes)
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024 or unit == "GiB":
+            break
+        size /= 1024
+    return f"{size:0.1f} {unit}" if unit != "B" else f"{n_bytes} B"
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a report of :func:`get_report`."""
+    print(
+        "{:<6s} {:>14s} {:>12s} {:>12s} {:>14s} {:>12s}".format(
+            "layer", "shape", "activation", "parameters", "FLOPs/sample", "latency"
+        )
+    )
+    for i, layer in enumerate(report["layers"]):
+        print(
+            "{:>6d} {:>14s} {:>12s} {:>12d} {:>14d} {:>9.3f} ms".format(
+                i,
+                "{}x{}".format(*layer["shape"]),
+                layer["activation"],
+                layer["parameters"],
+                layer["flops_per_sample"],
+                1000 * layer["latency_s"],
+            )
+        )
+    quantization = report["quantization"] or "none"
+    print(f"Format: {report['format']}, quantization: {quantization}")
+    print(f"Parameters: {report['parameters']}")
+    print(
+        f"Size on disk: {format_bytes(report['file_bytes'])} file, "
+        f"{format_bytes(report['disk_bytes'])} weights"
+    )
+    print(
+        f"Size in memory: {format_bytes(report['memory_bytes'])} weights, "
+        f"{format_bytes(report['compiled_bytes'])} extra for "
+        f"{report['compute_dtype']} evaluation"
+    )
+    print(f"FLOPs per sample: {report['flops_per_sample']}")
+    print(
+        "Estimates for batch size %i (%0.1f GFLOP/s, %0.1f GB/s): "
+        "peak memory %s, latency %0.3f ms, %0.1f rows/sec"
+        % (
+            report["batch_size"],
+            report["gflops"],
+            report["bandwidth_gb_per_s"],
+            format_bytes(report["peak_bytes"]),
+            1000 * report["latency_s"],
+            report["rows_per_sec"],
+        )
+    )
+
+
+def main(
+    model_file: str,
+    batch_size: int = 1,
+    gflops: Optional[float] = None,
+    bandwidth: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Print and return the :func:`get_report` of ``model_file``."""
+    report = get_report(read_metadata(model_file), batch_size, gflops, bandwidth)
+    print_report(report)
+    return report
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+
+"""Compute classification metrics in a single pass over batched outputs."""
+
+# Core Library modules
+from typing import Any, Dict, Iterable, Optional
+
+# Third party modules
+import h5py
+import numpy as np
+
+# First party modules
+import nntoolkit.evaluate as evaluate
+
+METRICS = ("confusion", "precision_recall", "top_k", "log_loss")
+
+# Probabilities get clipped to [EPSILON, 1] for the log-loss
+EPSILON = 1e-15
+
+
+def parse_metrics(metrics: str) -> Iterable[str]:
+    """
+    Parse a comma-separated list of metric names; "all" selects all of them.
+
+    Examples
+    --------
+    >>> parse_metrics("top_k,log_loss")
+    ['top_k', 'log_loss']
+    """
+    if metrics == "all":
+        return list(METRICS)
+    names = [name.strip() for name in metrics.split(",") if name.strip()]
+    for name in names:
+        if name not in METRICS:
+            raise ValueError(f"Unknown metric '{name}'. Choose from {METRICS}.")
+    return names
+
+
+class MetricsAccumulator:
+
+    """
+    Accumulate classification metrics batch by batch.
+
+    Every batch of model outputs gets consumed once by :meth:`update`; the
+    statistics are updated with vectorized operations, so the metrics of a
+    large data file need only one pass over it.
+
+    Parameters
+    ----------
+    k : int
+        The largest k for the top-k accuracy.
+    metrics : Iterable[str]
+        Which metrics of :data:`METRICS` get computed. The accuracy is always
+        computed.
+
+    Examples
+    --------
+    >>> accumulator = MetricsAccumulator(k=2)
+    >>> accumulator.update(np.array([[0.7, 0.2, 0.1], [0.5, 0.4, 0.1]]), [0, 1])
+    >>> accumulator.result()["top_k"]
+    {1: 0.5, 2: 1.0}
+    """
+
+    def __init__(self, k: int = 5, metrics: Iterable[str] = METRICS):
+        assert k >= 1
+        self.k = k
+        self.metrics = set(metrics)
+        self.n_classes: Optional[int] = None
+        self.n_samples = 0
+        self.n_correct = 0
+        self.confusion: Optional[np.ndarray] = None
+        # rank_counts[r] counts the samples whose label has rank r (0-based),
+        # ranks >= k are counted in rank_counts[k]
+        self.rank_counts = np.zeros(k + 1, dtype=np.int64)
+        self.log_loss_sum = 0.0
+
+    def _init(self, n_classes: int):
+        self.n_classes = n_classes
+        if self.metrics & {"confusion", "precision_recall"}:
+            self.confusion = np.zeros((n_classes, n_classes), dtype=np.int64)
+
+    def update(self, outputs: np.ndarray, labels):
+        """
+        Add a batch.
+
+        Parameters
+        ----------
+        outputs : np.ndarray
+            The probabilities of the model with one row per sample
+        labels : array_like
+            One class index per sample
+        """
+        labels = np.asarray(labels).reshape(-1).astype(np.int64)
+        if self.n_classes is None:
+            self._init(outputs.shape[1])
+        if len(labels) and (labels.min() < 0 or labels.max() >= self.n_classes):
+            raise ValueError(
+                f"The labels have to be in [0, {self.n_classes}), got "
+                f"[{labels.min()}, {labels.max()}]."
+            )
+        rows = np.arange(len(labels))
+        predictions = np.argmax(outputs, axis=1)
+        self.n_samples += len(labels)
+        self.n_correct += int(np.count_nonzero(predictions == labels))
+        if self.confusion is not None:
+            self.confusion += np.bincount(
+                labels * self.n_classes + predictions,
+                minlength=self.n_classes**2,
+            ).reshape(self.n_classes, self.n_classes)
+        label_probabilities = outputs[rows, labels]
+        if "top_k" in self.metrics:
+            ranks = np.count_nonzero(outputs > label_probabilities[:, None], axis=1)
+            self.rank_counts += np.bincount(
+                np.minimum(ranks, self.k), minlength=self.k + 1
+            )
+        if "log_loss" in self.metrics:
+            self.log_loss_sum -= float(
+                np.log(np.clip(label_probabilities, EPSILON, 1)).sum()
+            )
+
+    def merge(self, other: "MetricsAccumulator"):
+        """Add the statistics of ``other``, e.g. of a worker process."""
+        if other.n_classes is None:
+            return
+        if self.n_classes is None:
+            self._init(other.n_classes)
+        self.n_samples += other.n_samples
+        self.n_correct += other.n_correct
+        if self.confusion is not None and other.confusion is not None:
+            self.confusion += other.confusion
+        self.rank_counts += other.rank_counts
+        self.log_loss_sum += other.log_loss_sum
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Get the metrics.
+
+        Returns
+        -------
+        metrics : Dict[str, Any]
+            ``accuracy`` and, depending on the selected metrics, ``top_k``
+            (k → accuracy), ``log_loss``, ``confusion`` (rows are labels,
+            columns are predictions) and ``precision``, ``recall``, ``f1``
+            and ``support`` per class together with their macro averages.
+        """
+        n = max(self.n_samples, 1)
+        result: Dict[str, Any] = {
+            "samples": self.n_samples,
+            "accuracy": self.n_correct / n,
+        }
+        if "top_k" in self.metrics:
+            hits = np.cumsum(self.rank_counts[: self.k])
+            result["top_k"] = {j + 1: float(hits[j]) / n for j in range(self.k)}
+        if "log_loss" in self.metrics:
+            result["log_loss"] = self.log_loss_sum / n
+        if self.confusion is not None and "confusion" in self.metrics:
+            result["confusion"] = self.confusion
+        if self.confusion is not None and "precision_recall" in self.metrics:
+            true_positives = np.diag(self.confusion).astype(np.float64)
+            support = self.confusion.sum(axis=1)
+            predicted = self.confusion.sum(axis=0)
+            precision = true_positives / np.maximum(predicted, 1)
+            recall = true_positives / np.maximum(support, 1)
+            f1 = 2 * precision * recall / np.maximum(precision + recall, EPSILON)
+            result.update(
+                {
+                    "precision": precision,
+                    "recall": recall,
+                    "f1": f1,
+                    "support": support,
+                    "macro_precision": float(precision.mean()),
+                    "macro_recall": float(recall.mean()),
+                    "macro_f1": float(f1.mean()),
+                }
+            )
+        return result
+
+    def format_report(self, semantics=None, n_confusions: int = 10) -> str:
+        """
+        Get a human readable report.
+
+        Parameters
+        ----------
+        semantics : Optional[List[str]]
+            The names of the classes
+        n_confusions : int
+            How many of the most frequent confusions are listed.
+        """
+        result = self.result()
+        if semantics is None or len(semantics) != self.n_classes:
+            semantics = [str(i) for i in range(self.n_classes or 0)]
+        lines = ["Accuracy: %0.4f (%i samples)" % (result["accuracy"], self.n_samples)]
+        for j, accuracy in result.get("top_k", {}).items():
+            lines.append("Top-%i accuracy: %0.4f" % (j, accuracy))
+        if "log_loss" in result:
+            lines.append("Log-loss: %0.4f" % result["log_loss"])
+        if "precision" in result:
+            lines.append(
+                "Macro precision: %0.4f, recall: %0.4f, F1: %0.4f"
+                % (
+                    result["macro_precision"],
+                    result["macro_recall"],
+                    result["macro_f1"],
+                )
+            )
+            lines.append(
+                "{:<18s} {:>9s} {:>9s} {:>9s} {:>9s}".format(
+                    "class", "precision", "recall", "F1", "support"
+                )
+            )
+            for i in np.flatnonzero(result["support"]):
+                lines.append(
+                    "{:<18s} {:>9.4f} {:>9.4f} {:>9.4f} {:>9d}".format(
+                        semantics[i][:18],
+                        result["precision"][i],
+                        result["recall"][i],
+                        result["f1"][i],
+                        result["support"][i],
+                    )
+                )
+        if "confusion" in result:
+            confusions = result["confusion"].copy()
+            np.fill_diagonal(confusions, 0)
+            order = np.argsort(confusions, axis=None)[::-1][:n_confusions]
+            lines.append("Most frequent confusions (label -> prediction):")
+            for label, prediction in zip(*np.unravel_index(order, confusions.shape)):
+                if confusions[label, prediction] == 0:
+                    break
+                lines.append(
+                    "  %s -> %s: %i"
+                    % (
+                        semantics[label],
+                        semantics[prediction],
+                        confusions[label, prediction],
+                    )
+                )
+        return "\n".join(lines)
+
+
+class PredictionWriter:
+
+    """
+    Write per-sample predictions to an HDF5 file batch by batch.
+
+    The file gets the datasets ``labels``, ``indices`` and ``probabilities``
+    with the ``k`` most probable classes of every sample.
+    """
+
+    def __init__(self, path: str, k: int = 5):
+        self.k = k
+        self._file = h5py.File(path, "w")
+        self._datasets: Dict[str, h5py.Dataset] = {}
+        self._rows = 0
+
+    def _create(self, name: str, row_shape, dtype):
+        self._datasets[name] = self._file.create_dataset(
+            name,
+            shape=(0,) + row_shape,
+            maxshape=(None,) + row_shape,
+            dtype=dtype,
+            chunks=(1024,) + row_shape,
+        )
+
+    def write(self, outputs: np.ndarray, labels):
+        """Append the predictions for one batch."""
+        k = min(self.k, outputs.shape[1])
+        if not self._datasets:
+            self._create("labels", (), np.int64)
+            self._create("indices", (k,), np.int64)
+            self._create("probabilities", (k,), np.float32)
+        indices, probabilities = evaluate.get_top_k(outputs, k)
+        end = self._rows + len(outputs)
+        for name, values in [
+            ("labels", np.asarray(labels).reshape(-1)),
+            ("indices", indices),
+            ("probabilities", probabilities),
+        ]:
+            self._datasets[name].resize(end, axis=0)
+            self._datasets[name][self._rows : end] = values
+        self._rows = end
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+"""
+Read and write models in the single-file ``.nnt`` format.
+
+A ``.nnt`` file consists of
+
+* 8 bytes magic number ``NNTK`` followed by the format version and three
+  reserved bytes,
+* the length of the header as a little-endian unsigned 64-bit integer,
+* the header: UTF-8 encoded JSON with the model type, the activation
+  functions, the input and output semantics and the dtype, shape and offset
+  of every weight array,
+* the raw (C-order) weight arrays, each aligned to ``ALIGNMENT`` bytes.
+
+The weight arrays can be memory-mapped, so several processes which load the
+same model share one copy in the page cache and models which are larger than
+the available memory get paged in layer by layer.
+"""
+
+# Core Library modules
+import json
+import struct
+from typing import Any, Dict
+
+# Third party modules
+import numpy as np
+
+# First party modules
+from nntoolkit.activation_functions import get_activation_function as get_af
+
+MAGIC = b"NNTK"
+VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<4sB3xQ")
+
+
+def is_nnt_file(model_file: str) -> bool:
+    """Check if ``model_file`` starts with the magic number of the format."""
+    try:
+        with open(model_file, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def read_header(model_file: str) -> Dict[str, Any]:
+    """
+    Read the header of ``model_file`` without touching the weight arrays.
+
+    Returns
+    -------
+    header : Dict[str, Any]
+        The model description. Arrays are described by their ``dtype``,
+        ``shape`` and ``offset`` within the file.
+    """
+    with open(model_file, "rb") as f:
+        magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"'{model_file}' is not a .nnt model file.")
+        if version != VERSION:
+            raise ValueError(
+                f"'{model_file}' has format version {version}, "
+                f"but only version {VERSION} is supported."
+            )
+        return json.loads(f.read(header_length).decode("utf8"))
+
+
+def read_model(model_file: str, mmap: bool = True) -> Dict[str, Any]:
+    """
+    Read a model in the ``.nnt`` format.
+
+    Parameters
+    ----------
+    model_file : str
+    mmap : bool
+        Memory-map the weight arrays (read-only) if True, otherwise read them
+        into memory.
+
+    Returns
+    -------
+    model : Dict[str, Any]
+        The model in the same structure as :func:`nntoolkit.utils.get_model`
+        returns it.
+    """
+    header = read_header(model_file)
+    if mmap:
+        raw = np.memmap(model_file, dtype=np.uint8, mode="r")
+    else:
+        raw = np.fromfile(model_file, dtype=np.uint8)
+
+    def get_array(description):
+        dtype = np.dtype(description["dtype"])
+        shape = tuple(description["shape"])
+        start = description["offset"]
+        end = start + dtype.itemsize * int(np.prod(shape))
+        return raw[start:end].view(dtype).reshape(shape)
+
+    model = header
+    for layer in model["layers"]:
+        for key, value in layer.items():
+            if isinstance(value, dict) and "offset" in value:
+                layer[key] = get_array(value)
+        layer["activation"] = get_af(layer["activation"])
+    return model
+
+
+def write_model(model: Dict[str, Any], model_file: str):
+    """
+    Write a loaded ``model`` in the ``.nnt`` format.
+
+    Parameters
+    ----------
+    model : Dict[str, Any]
+        A model as returned by :func:`nntoolkit.utils.get_model`. Every numpy
+        array in a layer gets stored.
+    model_file : str
+    """
+    header = {key: value for key, value in model.items() if key != "layers"}
+    header["layers"] = []
+    arrays = []
+    for layer in model["layers"]:
+        layer_header = {}
+        for key, value in layer.items():
+            if isinstance(value, np.ndarray):
+                value = np.ascontiguousarray(value)
+                arrays.append(value)
+                layer_header[key] = {
+                    "dtype": value.dtype.str,
+                    "shape": list(value.shape),
+                    "offset": None,
+                }
+            elif key == "activation":
+                layer_header[key] = str(value)
+            else:
+                layer_header[key] = value
+        header["layers"].append(layer_header)
+
+    # The offsets depend on the header length and vice versa; the header
+    # length only grows with the number of digits of the offsets.
+    header_length = 0
+    while True:
+        offset = _align(_PREAMBLE.size + header_length)
+        descriptions = [
+            description
+            for layer_header in header["layers"]
+            for description in layer_header.values()
+            if isinstance(description, dict) and "offset" in description
+        ]
+        for description, array in zip(descriptions, arrays):
+            description["offset"] = offset
+            offset = _align(offset + array.nbytes)
+        header_bytes = json.dumps(header).encode("utf8")
+        if len(header_bytes) <= header_length:
+            break
+        header_length = len(header_bytes)
+    header_bytes = header_bytes.ljust(header_length)
+
+    with open(model_file, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, header_length))
+        f.write(header_bytes)
+        for description, array in zip(descriptions, arrays):
+            f.seek(description["offset"])
+            array.tofile(f)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+"""
+Measure where the time of loading and evaluating models goes.
+
+Profiling is off by default. Instrumented code asks :func:`get_profiler` for
+the active profiler and only takes timings if there is one, so the cost of a
+disabled profiler is a single global lookup per call.
+
+Examples
+--------
+>>> with enable() as profiler:
+...     with stage("sleep"):
+...         pass
+>>> profiler.report()["sleep"]["calls"]
+1
+"""
+
+# Core Library modules
+import contextlib
+import json
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Third party modules
+import numpy as np
+
+# Upper bin edges of the latency histograms in milliseconds
+HISTOGRAM_EDGES_MS = [
+    base * 10**exponent for exponent in range(-3, 5) for base in (1, 2, 5)
+]
+
+_profiler: Optional["Profiler"] = None
+_null_stage = contextlib.nullcontext()
+
+
+class Profiler:
+
+    """
+    Collect the durations and floating point operations of named stages.
+
+    The wall time runs from the creation of the profiler until :func:`enable`
+    deactivates it (or until now, while it is active).
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = {}
+        self.flops: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.stopped: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"durations": self.durations, "flops": self.flops}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.durations = state["durations"]
+        self.flops = state["flops"]
+
+    def add(self, name: str, seconds: float, flops: int = 0):
+        """Record one call of stage ``name`` which took ``seconds``."""
+        with self._lock:
+            if name not in self.durations:
+                self.durations[name] = []
+                self.flops[name] = 0
+            self.durations[name].append(seconds)
+            self.flops[name] += flops
+
+    @contextlib.contextmanager
+    def stage(self, name: str, flops: int = 0):
+        """Time the body of a ``with`` statement as stage ``name``."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0, flops)
+
+    def merge(self, other: "Profiler"):
+        """Add the records of ``other``, e.g. of a worker process."""
+        for name, durations in other.durations.items():
+            with self._lock:
+                self.durations.setdefault(name, []).extend(durations)
+                self.flops[name] = self.flops.get(name, 0) + other.flops[name]
+
+    def get_wall_seconds(self) -> float:
+        """Get the wall time of the profiler in seconds."""
+        stopped = time.perf_counter() if self.stopped is None else self.stopped
+        return stopped - self.started
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize every stage in the order the stages were first seen.
+
+        Times are in milliseconds. ``share`` is the fraction of the wall time
+        (see :meth:`get_wall_seconds`) the stage took. Stages can be nested,
+        e.g. the layers run inside a batch, so the shares do not add up to 1;
+        stages which ran in parallel worker processes can even exceed it.
+        ``histogram`` counts the calls per latency bin, see
+        :data:`HISTOGRAM_EDGES_MS`.
+        """
+        with self._lock:
+            items = [(name, np.array(d) * 1000) for name, d in self.durations.items()]
+            flops = dict(self.flops)
+        wall = 1000 * self.get_wall_seconds()
+        report = {}
+        for name, durations in items:
+            total = float(durations.sum())
+            counts = np.bincount(
+                np.searchsorted(HISTOGRAM_EDGES_MS, durations),
+                minlength=len(HISTOGRAM_EDGES_MS) + 1,
+            )
+            p50, p99 = np.percentile(durations, [50, 99])
+            report[name] = {
+                "calls": len(durations),
+                "total_ms": total,
+                "mean_ms": total / len(durations),
+                "p50_ms": float(p50),
+                "p99_ms": float(p99),
+                "max_ms": float(durations.max()),
+                "share": total / wall if wall else 0.0,
+                "flops": flops[name],
+                "gflops_per_s": flops[name] / total / 10**6 if total else 0.0,
+                "histogram": {
+                    "edges_ms": HISTOGRAM_EDGES_MS,
+                    "counts": counts.tolist(),
+                },
+            }
+        return report
+
+    def format_table(self) -> str:
+        """Get the report as a table with one row per stage."""
+        lines = [
+            "{:<28s} {:>7s} {:>11s} {:>10s} {:>10s} {:>6s} {:>8s}".format(
+                "stage",
+                "calls",
+                "total [ms]",
+                "p50 [ms]",
+                "p99 [ms]",
+                "share",
+                "GFLOP/s",
+            )
+        ]
+        for name, stats in self.report().items():
+            gflops = "{:>8.2f}".format(stats["gflops_per_s"]) if stats["flops"] else ""
+            lines.append(
+                "{:<28s} {:>7d} {:>11.3f} {:>10.3f} {:>10.3f} {:>5.1f}% {:>8s}".format(
+                    name,
+                    stats["calls"],
+                    stats["total_ms"],
+                    stats["p50_ms"],
+                    stats["p99_ms"],
+                    100 * stats["share"],
+                    gflops,
+                )
+            )
+        lines.append("Wall time: %0.3f ms" % (1000 * self.get_wall_seconds()))
+        return "\n".join(lines)
+
+    def write_json(self, path: str):
+        """Write the report to ``path``."""
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def get_profiler() -> Optional[Profiler]:
+    """Get the active profiler or None if profiling is disabled."""
+    return _profiler
+
+
+@contextlib.contextmanager
+def enable(profiler: Optional[Profiler] = None) -> Iterator[Profiler]:
+    """Activate ``profiler`` (or a new one) for the body of a ``with`` statement."""
+    global _profiler
+    previous = _profiler
+    if profiler is None:
+        profiler = Profiler()
+    _profiler = profiler
+    try:
+        yield profiler
+    finally:
+        profiler.stopped = time.perf_counter()
+        _profiler = previous
+
+
+def stage(name: str, flops: int = 0):
+    """Time a stage with the active profiler; does nothing if there is none."""
+    profiler = _profiler
+    if profiler is None:
+        return _null_stage
+    return profiler.stage(name, flops)
+
+
+def iter_timed(iterable: Iterable, name: str) -> Iterable:
+    """Time how long it takes to get each item of ``iterable`` as stage ``name``."""
+    profiler = _profiler
+    if profiler is None:
+        return iterable
+    return _iter_timed(iterable, name, profiler)
+
+
+def _iter_timed(iterable: Iterable, name: str, profiler: Profiler) -> Iterator:
+    iterator = iter(iterable)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        profiler.add(name, time.perf_counter() - t0)
+        yield item
+
+
+def get_peak_rss() -> Optional[int]:
+    """
+    Get the peak resident set size of this process in bytes.
+
+    Returns None on platforms without the ``resource`` module.
+    """
+    try:
+        # Core Library modules
+        import resource
+    except ImportError:  # pragma: no cover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def dense_layer_flops(batch_size: int, n_in: int, n_out: int) -> int:
+    """Get the multiply-adds of a dense layer, counted as two operations each."""
+    return 2 * batch_size * n_in * n_out
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+
+"""
+Quantize the weights of a trained neural network.
+
+Two post-training quantizations are supported:
+
+* ``float16``: ``W`` and ``b`` are stored as half precision floats.
+* ``int8``: ``W`` is stored as signed 8-bit integers with one float32 scale
+  per output neuron (``W_scale``), ``b`` stays float32. The scales get
+  calibrated on a data file.
+
+Quantized models are regular models with a ``quantization`` entry; they are
+stored in both model formats and evaluated by :mod:`nntoolkit.inference` and
+:mod:`nntoolkit.evaluate`.
+"""
+
+# Core Library modules
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+# Third party modules
+import numpy as np
+
+# First party modules
+import nntoolkit.cache as cache
+import nntoolkit.data as data
+import nntoolkit.test as test
+import nntoolkit.utils as utils
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = ("float16", "int8")
+
+# Candidate percentiles of |W| per output neuron which get mapped to 127
+CLIP_PERCENTILES = (100.0, 99.99, 99.9, 99.0)
+
+
+def quantize_int8(
+    W: np.ndarray, clip: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize ``W`` symmetrically to int8 with one scale per column.
+
+    Parameters
+    ----------
+    W : np.ndarray
+        A weight matrix of shape (n_in, n_out)
+    clip : Optional[np.ndarray]
+        The largest absolute value per column. Larger values get clipped.
+        Defaults to the maximum absolute value of each column.
+
+    Returns
+    -------
+    (W_int8, scale) : Tuple[np.ndarray, np.ndarray]
+        ``W`` is approximately ``W_int8 * scale``.
+
+    Examples
+    --------
+    >>> W_int8, scale = quantize_int8(np.array([[1.0, -0.5], [-2.0, 0.25]]))
+    >>> W_int8
+    array([[  64, -127],
+           [-127,   64]], dtype=int8)
+    """
+    if clip is None:
+        clip = np.abs(W).max(axis=0)
+    scale = np.asarray(clip, dtype=np.float64) / 127
+    scale[scale == 0] = 1
+    W_int8 = np.clip(np.round(W / scale), -127, 127).astype(np.int8)
+    return W_int8, scale.astype(np.float32)
+
+
+def calibrate_int8(
+    W: np.ndarray, x: np.ndarray, reference: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize ``W`` with the clipping which reproduces ``reference`` best.
+
+    Parameters
+    ----------
+    W : np.ndarray
+    x : np.ndarray
+        The inputs of the layer within the quantized network
+    reference : np.ndarray
+        The output ``x @ W`` of the layer within the original network
+
+    Returns
+    -------
+    (W_int8, scale) : Tuple[np.ndarray, np.ndarray]
+    """
+    best = None
+    for percentile in CLIP_PERCENTILES:
+        W_int8, scale = quantize_int8(W, np.percentile(np.abs(W), percentile, axis=0))
+        error = np.mean((np.dot(x, W_int8) * scale - reference) ** 2)
+        if best is None or error < best[0]:
+            best = (error, W_int8, scale)
+    return best[1], best[2]
+
+
+def quantize_model(
+    model: Dict[str, Any],
+    quantization: str,
+    calibration_x: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """
+    Get a quantized copy of ``model``.
+
+    Parameters
+    ----------
+    model : Dict[str, Any]
+        A model as returned by :func:`nntoolkit.utils.get_model`
+    quantization : {"float16", "int8"}
+    calibration_x : Optional[np.ndarray]
+        Feature vectors for choosing the int8 scales. Without them, the
+        scales map the largest weight of every output neuron to 127.
+
+    Returns
+    -------
+    quantized_model : Dict[str, Any]
+    """
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(
+            f"quantization='{quantization}' is not one of {QUANTIZATIONS}."
+        )
+    if model.get("quantization"):
+        raise ValueError(f"The model is already quantized to {model['quantization']}.")
+    quantized = dict(model)
+    quantized["quantization"] = quantization
+    quantized["layers"] = []
+    x = x_reference = calibration_x
+    for layer in model["layers"]:
+        W = np.asarray(layer["W"], dtype=np.float32)
+        b = np.asarray(layer["b"], dtype=np.float32)
+        activation = layer["activation"]
+        if quantization == "float16":
+            quantized["layers"].append(
+                {
+                    "W": W.astype(np.float16),
+                    "b": b.astype(np.float16),
+                    "activation": activation,
+                }
+            )
+            continue
+        if x is None:
+            W_int8, scale = quantize_int8(W)
+        else:
+            reference = np.dot(x_reference, W)
+            W_int8, scale = calibrate_int8(W, x, reference)
+            x_reference = activation(reference + b)
+            x = activation(np.dot(x, W_int8) * scale + b)
+        quantized["layers"].append(
+            {"W": W_int8, "W_scale": scale, "b": b, "activation": activation}
+        )
+    return quantized
+
+
+def get_calibration_data(data_file: str, n_rows: int) -> np.ndarray:
+    """Read the first ``n_rows`` feature vectors of ``data_file``."""
+    for x, _ in data.iter_data(data_file, n_rows, 0, n_rows):
+        return np.asarray(x, dtype=np.float32)
+    raise ValueError(f"'{data_file}' does not contain any data.")
+
+
+def main(
+    model_file: str,
+    output_file: str,
+    data_file: str,
+    quantization: str = "int8",
+    calibration_rows: int = 1024,
+    batch_size: int = test.DEFAULT_BATCH_SIZE,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Quantize ``model_file``, write it to ``output_file`` and compare both.
+
+    Parameters
+    ----------
+    model_file : str
+    output_file : str
+        A ``.tar`` file or a ``.nnt`` file, see :func:`nntoolkit.utils.save_model`
+    data_file : str
+        A labeled HDF5 file. The first ``calibration_rows`` rows calibrate
+        the int8 scales; all rows are used for the accuracy report.
+    quantization : {"float16", "int8"}
+    calibration_rows : int
+    batch_size : int
+
+    Returns
+    -------
+    report : Dict[str, Dict[str, Any]]
+        The accuracy, file size, weight size and throughput of the original
+        and of the quantized model.
+    """
+    model = utils.get_model(model_file)
+    if not model:
+        raise ValueError(f"Could not load the model '{model_file}'.")
+    calibration_x = None
+    if quantization == "int8":
+        calibration_x = get_calibration_data(data_file, calibration_rows)
+    utils.save_model(quantize_model(model, quantization, calibration_x), output_file)
+    logger.info("Wrote the %s model to '%s'.", quantization, output_file)
+
+    report = {}
+    for name, path in [("original", model_file), (quantization, output_file)]:
+        correct, total, duration, _ = test.evaluate_shard(path, data_file, batch_size)
+        report[name] = {
+            "accuracy": correct / total,
+            "file_bytes": os.path.getsize(path),
+            "weight_bytes": cache.get_model_nbytes(cache.get_model(path)),
+            "rows_per_sec": total / max(duration, 1e-9),
+        }
+    print_report(report)
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, Any]]):
+    """Print the comparison of the original and the quantized model."""
+    print(
+        "{:<10s} {:>9s} {:>14s} {:>15s} {:>12s}".format(
+            "model", "accuracy", "file [bytes]", "weights [bytes]", "rows/sec"
+        )
+    )
+    for name, stats in report.items():
+        print(
+            "{:<10s} {:>9.4f} {:>14d} {:>15d} {:>12.1f}".format(
+                name,
+                stats["accuracy"],
+                stats["file_bytes"],
+                stats["weight_bytes"],
+                stats["rows_per_sec"],
+            )
+        )
+    original, quantized = report.values()
+    print(
+        "Accuracy delta: %+0.4f, file size: %0.2fx smaller, speedup: %0.2fx"
+        % (
+            quantized["accuracy"] - original["accuracy"],
+            original["file_bytes"] / quantized["file_bytes"],
+            quantized["rows_per_sec"] / original["rows_per_sec"],
+        )
+    )
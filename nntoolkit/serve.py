@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+
+"""Serve predictions of loaded models over HTTP."""
+
+# Core Library modules
+import json
+import logging
+import os
+import socketserver
+import stat
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+# Third party modules
+import numpy as np
+
+# First party modules
+import nntoolkit.evaluate as evaluate
+import nntoolkit.utils as utils
+from nntoolkit.batching import MicroBatcher
+from nntoolkit.inference import CompiledMLP
+
+logger = logging.getLogger(__name__)
+
+
+class ModelServer:
+
+    """
+    Keep models loaded and answer predictions with micro-batching.
+
+    Parameters
+    ----------
+    model_files : Dict[str, str]
+        Maps the model names to model files.
+    max_batch_size : int
+    max_wait : float
+        Seconds to wait for more requests before a batch gets evaluated.
+    """
+
+    def __init__(
+        self,
+        model_files: Dict[str, str],
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+    ):
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.batchers: Dict[str, MicroBatcher] = {}
+        for name, model_file in model_files.items():
+            model = utils.get_model(model_file)
+            if not model:
+                raise ValueError(f"Could not load the model '{model_file}'.")
+            self.models[name] = model
+            predictor = CompiledMLP(model)
+            self.batchers[name] = MicroBatcher(
+                predictor.predict,
+                max_batch_size,
+                max_wait,
+                n_inputs=predictor.n_inputs,
+            )
+            logger.info("Loaded model '%s' from '%s'.", name, model_file)
+
+    def predict(self, name: str, features, k: int = 10):
+        """
+        Get the ``k`` most probable results of model ``name``.
+
+        Returns
+        -------
+        results : List[Dict[str, Any]]
+            Like :func:`nntoolkit.evaluate.get_results`, but at most ``k``.
+        """
+        model = self.models[name]
+        features = np.asarray(features, dtype=np.float64).reshape(-1)
+        n_inputs = len(model["inputs"])
+        if len(features) != n_inputs:
+            raise ValueError(f"Expected {n_inputs} features, got {len(features)}.")
+        output = self.batchers[name].submit(features).result()
+        return [
+            {
+                "symbolnr": result["symbolnr"],
+                "probability": float(result["probability"]),
+                "semantics": result["semantics"],
+            }
+            for result in evaluate.get_results(output, model["outputs"], k)
+        ]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the latency and throughput statistics of every model."""
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+    def close(self):
+        """Stop all background threads."""
+        for batcher in self.batchers.values():
+            batcher.close()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+
+    """
+    Answer ``POST /models/<name>/predict``, ``GET /models`` and ``GET /stats``.
+
+    A prediction request has the body ``{"features": [...], "k": 10}``.
+    """
+
+    server_version = "nntoolkit"
+    # Keep connections alive; every response has a Content-Length
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def address_string(self):
+        # Unix sockets do not have a client address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status: int, content):
+        body = json.dumps(content).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        model_server = self.server.model_server
+        if self.path == "/models":
+            self._send_json(200, sorted(model_server.models))
+        elif self.path == "/stats":
+            self._send_json(200, model_server.stats())
+        else:
+            self._send_json(404, {"error": f"Unknown path '{self.path}'."})
+
+    def do_POST(self):
+        model_server = self.server.model_server
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "models" or parts[2] != "predict":
+            self._send_json(404, {"error": f"Unknown path '{self.path}'."})
+            return
+        if parts[1] not in model_server.models:
+            self._send_json(404, {"error": f"Unknown model '{parts[1]}'."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            results = model_server.predict(
+                parts[1], request["features"], int(request.get("k", 10))
+            )
+        except (ValueError, KeyError, TypeError) as exception:
+            self._send_json(400, {"error": str(exception)})
+            return
+        self._send_json(200, results)
+
+
+class HTTPServer(ThreadingHTTPServer):
+
+    """An HTTP server which handles every connection in its own thread."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+
+    """An HTTP server listening on a Unix socket."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def create_server(
+    model_server: ModelServer,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    unix_socket: Optional[str] = None,
+) -> socketserver.BaseServer:
+    """
+    Create an HTTP server for ``model_server``.
+
+    It listens on ``unix_socket`` if it is given, otherwise on ``host:port``.
+    A socket left over at ``unix_socket`` gets replaced, any other file
+    raises a :class:`FileExistsError`.
+    """
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            if not stat.S_ISSOCK(os.stat(unix_socket).st_mode):
+                raise FileExistsError(
+                    f"'{unix_socket}' exists and is not a Unix socket."
+                )
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, RequestHandler)
+    else:
+        server = HTTPServer((host, port), RequestHandler)
+    server.model_server = model_server
+    return server
+
+
+def main(
+    model_files: Dict[str, str],
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    unix_socket: Optional[str] = None,
+    max_batch_size: int = 64,
+    max_wait: float = 0.002,
+):
+    """Serve ``model_files`` until the process gets interrupted."""
+    model_server = ModelServer(model_files, max_batch_size, max_wait)
+    server = create_server(model_server, host, port, unix_socket)
+    address = unix_socket if unix_socket is not None else f"http://{host}:{port}"
+    logger.info("Serving %s on %s", ", ".join(sorted(model_files)), address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        model_server.close()
+        print(json.dumps(model_server.stats(), indent=2))
@@ -2,15 +2,114 @@
 
 """Test a neural network."""
 
+# Core Library modules
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
 # Third party modules
 import numpy
 
 # First party modules
-import nntoolkit.evaluate as evaluate
-import nntoolkit.utils as utils
+import nntoolkit.cache as cache
+import nntoolkit.data as data
+import nntoolkit.metrics as metrics
+import nntoolkit.profiling as profiling
+
+DEFAULT_BATCH_SIZE = data.DEFAULT_BATCH_SIZE
+
+
+def count_correct(predictor, x: numpy.ndarray, y: numpy.ndarray) -> int:
+    """
+    Count how many rows of ``x`` get classified as the label in ``y``.
 
+    Parameters
+    ----------
+    predictor : nntoolkit.inference.CompiledMLP
+    x : numpy.ndarray
+        A matrix with one feature vector per row
+    y : numpy.ndarray
+        A matrix with one label per row
 
-def main(model_file: str, test_data: str, verbose=True) -> float:
+    Returns
+    -------
+    The number of correctly classified rows
+    """
+    y_pred = numpy.argmax(predictor.predict(x), axis=1)
+    return int(numpy.count_nonzero(y_pred == y[:, 0]))
+
+
+def evaluate_shard(
+    model_file: str,
+    test_data: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start: int = 0,
+    stop: Optional[int] = None,
+    verbose: bool = False,
+    accumulator: Optional[metrics.MetricsAccumulator] = None,
+    writer: Optional[metrics.PredictionWriter] = None,
+    prefetch: int = data.DEFAULT_PREFETCH,
+) -> Tuple[int, int, float, float]:
+    """
+    Evaluate a model on the rows ``start:stop`` of ``test_data``.
+
+    The model and the data file get opened by the calling process, so this
+    can run in a worker process. If given, ``accumulator`` gets updated and
+    ``writer`` gets the predictions of every batch. The next ``prefetch``
+    batches get read in a background thread, see :func:`nntoolkit.data.iter_data`.
+
+    Returns
+    -------
+    (correct, total, duration, wait) : Tuple[int, int, float, float]
+        The number of correctly classified rows, the number of rows, the
+        time in seconds it took and how many of these seconds were spent on
+        waiting for data.
+    """
+    predictor = cache.get_predictor(model_file)
+    correct = 0
+    total = 0
+    t0 = time.perf_counter()
+    stats = data.ReadStats()
+    batches = data.iter_data(test_data, batch_size, start, stop, prefetch, stats)
+    for x, y in profiling.iter_timed(batches, "read batch"):
+        with profiling.stage("batch"):
+            if accumulator is None and writer is None:
+                correct += count_correct(predictor, x, y)
+            else:
+                outputs = predictor.predict(x)
+                y_pred = numpy.argmax(outputs, axis=1)
+                correct += int(numpy.count_nonzero(y_pred == y[:, 0]))
+                if accumulator is not None:
+                    accumulator.update(outputs, y)
+                if writer is not None:
+                    writer.write(outputs, y)
+        total += len(x)
+        if verbose:
+            print("%i: %0.2f" % (total, float(correct) / total))
+    return correct, total, time.perf_counter() - t0, stats.wait_seconds
+
+
+def _evaluate_shard(args):
+    *args, accumulator, prefetch, profile = args
+    kwargs = {"accumulator": accumulator, "prefetch": prefetch}
+    if not profile:
+        return evaluate_shard(*args, **kwargs), accumulator, None
+    with profiling.enable() as profiler:
+        result = evaluate_shard(*args, **kwargs)
+    return result, accumulator, profiler
+
+
+def main(
+    model_file: str,
+    test_data: str,
+    verbose=True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    jobs: int = 1,
+    accumulator: Optional[metrics.MetricsAccumulator] = None,
+    predictions_file: Optional[str] = None,
+    prefetch: int = data.DEFAULT_PREFETCH,
+    k: int = 5,
+) -> float:
     """
     Evaluate a model
 
@@ -20,27 +119,125 @@ def main(model_file: str, test_data: str, verbose=True) -> float:
         Path to a model file
     test_data : str
         Path to a testdata.hdf5 file
+    verbose : bool
+        Print the accuracy after each batch if True.
+    batch_size : int
+        How many rows get read and pushed through the network at once. The
+        memory usage is bounded by this, not by the size of the data file.
+    jobs : int
+        Number of worker processes. Each one evaluates a contiguous range of
+        rows and opens the model and the data file itself.
+    accumulator : Optional[nntoolkit.metrics.MetricsAccumulator]
+        Gets updated with all rows and its report gets printed. With several
+        jobs, every worker fills an empty accumulator with the same settings
+        and these get merged into ``accumulator``.
+    predictions_file : Optional[str]
+        Stream the top-k predictions of every row to this HDF5 file, see
+        :class:`nntoolkit.metrics.PredictionWriter`. Requires ``jobs == 1``.
+    prefetch : int
+        Number of batches which get read ahead in a background thread; 0
+        reads them in the computing thread.
+    k : int
+        How many of the most probable classes get written to
+        ``predictions_file`` per row.
 
     Returns
     -------
     Testing results
     """
-    model = utils.get_model(model_file)
-    data = utils.get_data(test_data)
-    x_vec, y_vec = data
-    correct = 0
-    total = 0
-    for x, y in zip(x_vec, y_vec):
-        x = numpy.array([x])
-        y_pred = evaluate.get_model_output(model, x)
-        y_pred = numpy.argmax(y_pred)
-        if y_pred == y[0]:
-            correct += 1
-        total += 1
-        if verbose and total % 100 == 0:
-            print("%i: %0.2f" % (total, float(correct) / total))
+    assert batch_size >= 1
+    assert jobs >= 1
+    if predictions_file is not None and jobs > 1:
+        raise ValueError("Writing the predictions requires jobs=1.")
+    t0 = time.perf_counter()
+    if jobs == 1:
+        writer = None
+        if predictions_file is not None:
+            writer = metrics.PredictionWriter(predictions_file, k)
+        try:
+            results = [
+                evaluate_shard(
+                    model_file,
+                    test_data,
+                    batch_size,
+                    verbose=verbose,
+                    accumulator=accumulator,
+                    writer=writer,
+                    prefetch=prefetch,
+                )
+            ]
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        shards = data.get_shards(test_data, jobs)
+        profiler = profiling.get_profiler()
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = []
+            for result, worker_accumulator, worker_profiler in executor.map(
+                _evaluate_shard,
+                [
+                    (
+                        model_file,
+                        test_data,
+                        batch_size,
+                        start,
+                        stop,
+                        False,
+                        None
+                        if accumulator is None
+                        else metrics.MetricsAccumulator(
+                            accumulator.k, accumulator.metrics
+                        ),
+                        prefetch,
+                        profiler is not None,
+                    )
+                    for start, stop in shards
+                ],
+            ):
+                results.append(result)
+                if worker_accumulator is not None:
+                    accumulator.merge(worker_accumulator)
+                if worker_profiler is not None:
+                    profiler.merge(worker_profiler)
+    # executor.map keeps the order of the shards
+    correct = sum(result[0] for result in results)
+    total = sum(result[1] for result in results)
+    throughput = total / max(time.perf_counter() - t0, 1e-9)
     print(
-        "Correct: %i/%i = %0.2f of total correct"
-        % (correct, total, float(correct) / total)
+        "Correct: %i/%i = %0.2f of total correct (%0.1f rows/sec)"
+        % (correct, total, float(correct) / total, throughput)
     )
+    wait = sum(result[3] for result in results)
+    print(
+        "Waited %0.3f s for data (%0.1f%% of the time)"
+        % (wait, 100 * wait / max(sum(result[2] for result in results), 1e-9))
+    )
+    if jobs > 1:
+        print_scaling_report(shards, results, throughput)
+    if accumulator is not None:
+        semantics = cache.get_model(model_file).get("outputs")
+        print(accumulator.format_report(semantics))
     return float(correct) / total
+
+
+def print_scaling_report(shards, results, throughput: float):
+    """
+    Print the throughput of every worker and the scaling efficiency.
+
+    The scaling efficiency is the overall throughput divided by the sum of
+    the throughputs of the workers. It is 1 if there is no overhead for
+    starting the workers and merging their results.
+    """
+    worker_throughputs = []
+    print("{:>6s} {:>21s} {:>14s}".format("worker", "rows", "rows/sec"))
+    for i, ((start, stop), (_, total, duration, _)) in enumerate(zip(shards, results)):
+        worker_throughputs.append(total / max(duration, 1e-9))
+        print(
+            "{:>6d} {:>21s} {:>14.1f}".format(
+                i, f"{start}-{stop}", worker_throughputs[-1]
+            )
+        )
+    print(
+        "Scaling efficiency: %0.2f" % (throughput / max(sum(worker_throughputs), 1e-9))
+    )
@@ -6,36 +6,76 @@
 # Core Library modules
 import logging
 import os
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
 # Third party modules
 import numpy as np
-from keras import optimizers
 
 # First party modules
+import nntoolkit.data as data
+import nntoolkit.inference as inference
+import nntoolkit.profiling as profiling
 import nntoolkit.utils as utils
+from nntoolkit.activation_functions import Sigmoid, Softmax
 
 logger = logging.getLogger(__name__)
 
 
-def minibatch_gradient_descent(
+def compile_keras_model(model_dict: Dict[str, Any], lr: float):
+    """Create the Keras model of ``model_dict`` and compile it for SGD."""
+    # Third party modules
+    from keras import optimizers
+
+    assert lr > 0
+
+    for layer in model_dict["layers"]:
+        assert os.path.isfile(layer["W"]["filename"])
+        assert os.path.isfile(layer["b"]["filename"])
+
+    model = create_mlp_from_dict(model_dict)
+    optimizer = optimizers.SGD(lr=lr, decay=1e-6, momentum=0.9, nesterov=True)
+    model.compile(loss="sparse_categorical_crossentropy", optimizer=optimizer)
+    return model
+
+
+def iter_epochs(
+    training_data: str,
+    batch_size: int,
+    shuffle_buffer: int = data.DEFAULT_SHUFFLE_BUFFER,
+    rng: Optional[np.random.Generator] = None,
+    prefetch: int = data.DEFAULT_PREFETCH,
+    stats: Optional[data.ReadStats] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield the shuffled minibatches of ``training_data`` epoch after epoch."""
+    if rng is None:
+        rng = np.random.default_rng()
+    while True:
+        yield from data.iter_shuffled_data(
+            training_data, batch_size, shuffle_buffer, rng, prefetch, stats
+        )
+
+
+def streaming_gradient_descent(
     model_dict: Dict[str, Any],
-    x: np.ndarray,
-    y: List[Any],
+    training_data: str,
     batch_size: int = 256,
     lr: float = 0.1,
     epochs: int = 100,
+    shuffle_buffer: int = data.DEFAULT_SHUFFLE_BUFFER,
+    seed=None,
+    prefetch: int = data.DEFAULT_PREFETCH,
+    stats: Optional[data.ReadStats] = None,
 ):
     """
-    Train a given neural network.
+    Train a Keras model on the minibatches streamed from the HDF5 file
+    ``training_data``.
 
     Parameters
     ----------
     model_dict : Dict[str, Any]
         The path to a parsed model
-    x : np.ndarray
-        contains features
-    y : List[classes]
+    training_data : str
     batch_size : positive integer
         Defines after how many training examples the values of the neural
         network get adjusted
@@ -88,23 +128,20 @@ def minibatch_gradient_descent(
         ]
     }
     """
-    assert lr > 0
     assert batch_size >= 1
-
-    for layer in model_dict["layers"]:
-        assert os.path.isfile(layer["W"]["filename"])
-        assert os.path.isfile(layer["b"]["filename"])
-
-    model = create_mlp_from_dict(model_dict)
-    optimizer = optimizers.SGD(lr=lr, decay=1e-6, momentum=0.9, nesterov=True)
-    model.compile(loss="sparse_categorical_crossentropy", optimizer=optimizer)
-
-    y_cat = y.reshape(-1)
+    model = compile_keras_model(model_dict, lr)
+    n_rows = data.get_n_rows(training_data)
     model.fit(
-        x,
-        y_cat,
+        iter_epochs(
+            training_data,
+            batch_size,
+            shuffle_buffer,
+            np.random.default_rng(seed),
+            prefetch,
+            stats,
+        ),
+        steps_per_epoch=-(-n_rows // batch_size),
         epochs=epochs,
-        batch_size=batch_size,
     )
     return model
 
@@ -171,6 +208,193 @@ def create_mlp_from_dict(model: Dict[str, Any]):
     return model
 
 
+class NumpyMLPTrainer:
+
+    """
+    Train a multi-layer perceptron with minibatch SGD and momentum in NumPy.
+
+    Hidden layers have to use the Sigmoid activation function and the output
+    layer the Softmax activation function; the loss is the cross-entropy.
+    All gradients and deltas are computed in preallocated buffers and the
+    parameters get updated in place.
+
+    Parameters
+    ----------
+    model : Dict[str, Any]
+        A model as returned by :func:`nntoolkit.utils.get_model`. It does not
+        get modified; the trained model is :attr:`model`.
+    lr : float
+        Learning rate
+    momentum : float
+    dtype : numpy.dtype
+        The dtype of the parameters during training.
+    """
+
+    def __init__(
+        self,
+        model: Dict[str, Any],
+        lr: float = 0.1,
+        momentum: float = 0.9,
+        dtype=np.float32,
+    ):
+        assert lr > 0
+        assert 0 <= momentum < 1
+        if model["type"] != "mlp":
+            raise NotImplementedError(
+                f"type='{model['type']}' is not implemented. "
+                "Only type='mlp' is implemented so far."
+            )
+        activations = [layer["activation"] for layer in model["layers"]]
+        if not all(isinstance(act, Sigmoid) for act in activations[:-1]) or (
+            not isinstance(activations[-1], Softmax)
+        ):
+            raise NotImplementedError(
+                f"The numpy engine needs Sigmoid hidden layers and a Softmax "
+                f"output layer, not {activations}."
+            )
+        self.lr = lr
+        self.momentum = momentum
+        self.model = dict(model)
+        # Training continues with dequantized weights
+        self.model.pop("quantization", None)
+        self.model["layers"] = [
+            {
+                "W": np.array(inference.get_weights(layer, dtype)),
+                "b": np.array(layer["b"], dtype=dtype).reshape(-1),
+                "activation": layer["activation"],
+            }
+            for layer in model["layers"]
+        ]
+        self.layers = self.model["layers"]
+        self.dtype = np.dtype(dtype)
+        self._grads = [
+            {key: np.empty_like(layer[key]) for key in "Wb"} for layer in self.layers
+        ]
+        self._velocities = [
+            {key: np.zeros_like(layer[key]) for key in "Wb"} for layer in self.layers
+        ]
+        self._batch_size = None
+
+    def _allocate(self, batch_size: int):
+        """Allocate the activation, delta and scratch buffers for ``batch_size``."""
+        if self._batch_size == batch_size:
+            return
+        self._activations = [
+            np.empty((batch_size, layer["W"].shape[1]), dtype=self.dtype)
+            for layer in self.layers
+        ]
+        self._deltas = [np.empty_like(a) for a in self._activations]
+        # For the sigmoid derivative of the hidden layers
+        self._scratch = [np.empty_like(a) for a in self._activations[:-1]]
+        self._batch_size = batch_size
+
+    def train_batch(self, x: np.ndarray, y: np.ndarray) -> float:
+        """
+        Do one SGD step on a minibatch.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            A matrix with one feature vector per row
+        y : np.ndarray
+            The class index of every row
+
+        Returns
+        -------
+        loss : float
+            The mean cross-entropy of the minibatch before the update.
+        """
+        x = np.ascontiguousarray(x, dtype=self.dtype)
+        y = np.asarray(y).reshape(-1).astype(np.intp)
+        n = len(x)
+        self._allocate(n)
+        rows = np.arange(n)
+
+        # Forward pass
+        a = x
+        for layer, out in zip(self.layers, self._activations):
+            np.dot(a, layer["W"], out=out)
+            out += layer["b"]
+            layer["activation"](out, out=out)
+            a = out
+        probabilities = self._activations[-1][rows, y]
+        loss = -float(np.mean(np.log(np.maximum(probabilities, 1e-12))))
+
+        # Backward pass: softmax + cross-entropy, then sigmoid layers
+        delta = self._deltas[-1]
+        np.copyto(delta, self._activations[-1])
+        delta[rows, y] -= 1
+        delta /= n
+        for i in range(len(self.layers) - 1, -1, -1):
+            a_in = x if i == 0 else self._activations[i - 1]
+            grad = self._grads[i]
+            np.dot(a_in.T, delta, out=grad["W"])
+            np.sum(delta, axis=0, out=grad["b"])
+            if i > 0:
+                delta_in = self._deltas[i - 1]
+                np.dot(delta, self.layers[i]["W"].T, out=delta_in)
+                # delta_in *= a_in * (1 - a_in) without temporary arrays
+                delta_in *= a_in
+                scratch = self._scratch[i - 1]
+                np.multiply(delta_in, a_in, out=scratch)
+                delta_in -= scratch
+                delta = delta_in
+            for key in "Wb":
+                velocity = self._velocities[i][key]
+                velocity *= self.momentum
+                grad[key] *= self.lr
+                velocity -= grad[key]
+                self.layers[i][key] += velocity
+        return loss
+
+    def train_batches(self, batches: Iterable[Tuple[np.ndarray, np.ndarray]]) -> float:
+        """
+        Do one SGD step per (x, y) minibatch of ``batches``.
+
+        Returns
+        -------
+        loss : float
+            The mean loss of all minibatches.
+        """
+        losses = [self.train_batch(x, y) for x, y in batches]
+        return float(np.mean(losses))
+
+
+def numpy_streaming_gradient_descent(
+    model: Dict[str, Any],
+    training_data: str,
+    batch_size: int = 256,
+    lr: float = 0.1,
+    epochs: int = 100,
+    momentum: float = 0.9,
+    shuffle_buffer: int = data.DEFAULT_SHUFFLE_BUFFER,
+    seed=None,
+    prefetch: int = data.DEFAULT_PREFETCH,
+    stats: Optional[data.ReadStats] = None,
+) -> Dict[str, Any]:
+    """
+    Train a loaded model with the NumPy engine on the HDF5 file
+    ``training_data`` without loading it into memory.
+
+    The minibatches come from :func:`nntoolkit.data.iter_shuffled_data`,
+    which reads ``prefetch`` blocks ahead in a background thread.
+
+    Returns
+    -------
+    model : Dict[str, Any]
+        The trained model
+    """
+    trainer = NumpyMLPTrainer(model, lr=lr, momentum=momentum)
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        batches = data.iter_shuffled_data(
+            training_data, batch_size, shuffle_buffer, rng, prefetch, stats
+        )
+        loss = trainer.train_batches(batches)
+        logger.info(f"Epoch {epoch + 1}/{epochs}: loss={loss:0.4f}")
+    return trainer.model
+
+
 def main(
     model_dict: Dict[str, Any],
     model_output_file: str,
@@ -178,14 +402,70 @@ def main(
     batch_size: int,
     learning_rate: float,
     epochs: int,
+    momentum: float = 0.9,
+    engine: str = "keras",
+    shuffle_buffer: int = data.DEFAULT_SHUFFLE_BUFFER,
+    seed: Optional[int] = None,
+    prefetch: int = data.DEFAULT_PREFETCH,
 ):
-    """Train model_file with training_data."""
-    data = utils.get_data(training_data)
-    x, y = data
-    assert y is not None
+    """
+    Train model_file with training_data.
 
-    model = minibatch_gradient_descent(
-        model_dict, x, y, batch_size, learning_rate, epochs
+    The training data gets streamed from the HDF5 file, so it does not have to
+    fit into memory. The time spent on waiting for data and the peak resident
+    set size get logged at the end.
+
+    Parameters
+    ----------
+    engine : {"keras", "numpy"}
+        The numpy engine needs a model as returned by
+        :func:`nntoolkit.utils.get_model` and does not use Keras.
+    shuffle_buffer : int
+        The number of rows which get shuffled together, see
+        :func:`nntoolkit.data.iter_shuffled_data`.
+    seed : Optional[int]
+        Seed for shuffling the training data
+    prefetch : int
+        Number of blocks which get read ahead in a background thread; 0 reads
+        them in the training thread.
+    """
+    stats = data.ReadStats()
+    t0 = time.perf_counter()
+    if engine == "numpy":
+        model = numpy_streaming_gradient_descent(
+            model_dict,
+            training_data,
+            batch_size,
+            learning_rate,
+            epochs,
+            momentum,
+            shuffle_buffer,
+            seed,
+            prefetch,
+            stats,
+        )
+        utils.save_model(model, model_output_file)
+    elif engine == "keras":
+        model = streaming_gradient_descent(
+            model_dict,
+            training_data,
+            batch_size,
+            learning_rate,
+            epochs,
+            shuffle_buffer,
+            seed,
+            prefetch,
+            stats,
+        )
+        utils.write_model(model_dict, model, model_output_file)
+    else:
+        raise NotImplementedError(f"engine='{engine}' is not implemented.")
+    logger.info(
+        "Waited %0.3f s for data (%0.1f%% of the training time)",
+        stats.wait_seconds,
+        100 * stats.wait_seconds / max(time.perf_counter() - t0, 1e-9),
     )
-    utils.write_model(model_dict, model, model_output_file)
     logger.info(f"Saved model to {model_output_file}")
+    peak_rss = profiling.get_peak_rss()
+    if peak_rss is not None:
+        logger.info("Peak RSS: %0.1f MiB", peak_rss / 2**20)
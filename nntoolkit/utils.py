@@ -4,6 +4,7 @@
 
 # Core Library modules
 import csv
+import io
 import logging
 import os
 import shutil
@@ -17,6 +18,9 @@ import numpy as np
 import yaml
 
 # First party modules
+import nntoolkit.data as data
+import nntoolkit.nnt as nnt
+import nntoolkit.profiling as profiling
 from nntoolkit.activation_functions import get_activation_function as get_af
 
 logger = logging.getLogger(__name__)
@@ -40,6 +44,24 @@ def is_valid_folder(parser, arg):
         return arg
 
 
+def read_semantics(csvfile, quotechar: str = '"') -> List[str]:
+    """
+    Parse an opened semantics csv file which has one entry per line.
+
+    Parameters
+    ----------
+    csvfile :
+        A text file object, opened with ``newline=""``.
+    quotechar : str
+
+    Returns
+    -------
+    semantics : List[str]
+    """
+    spamreader = csv.reader(csvfile, delimiter="\n", quotechar=quotechar)
+    return [row[0] for row in spamreader]
+
+
 def get_outputs(output_file):
     """
     Parse ``output_file`` which is a csv file and defines the semantics of the
@@ -48,93 +70,143 @@ def get_outputs(output_file):
     For example, output neuron 1 means class "0" in the MNIST classification
     task.
     """
-    outputs = []
     mode = "rt"
     with open(output_file, mode, newline="", encoding="utf8") as csvfile:
-        spamreader = csv.reader(csvfile, delimiter="\n", quotechar="|")
-        for row in spamreader:
-            outputs.append(row[0])
-    return outputs
+        return read_semantics(csvfile, quotechar="|")
+
+
+def get_tar_index(tar: tarfile.TarFile) -> Dict[str, tarfile.TarInfo]:
+    """
+    Map the names of all regular files in ``tar`` to their members.
+
+    Each member knows the offset and the size of its data within the archive,
+    so files can be read without scanning the archive again.
+    """
+    return {member.name: member for member in tar.getmembers() if member.isfile()}
+
+
+def is_valid_model_tar(modelfile: str, members) -> bool:
+    """Check if the tar file ``modelfile`` with ``members`` is a model."""
+    for filename in ["model.yml", "input_semantics.csv", "output_semantics.csv"]:
+        if filename not in members:
+            article = "an" if filename[0] in "aeiou" else "a"
+            logging.error("'%s' does not have %s %s.", modelfile, article, filename)
+            return False
+    return True
 
 
 def check_and_create_model(modelfile):
+    """
+    Extract the model tar file ``modelfile`` to a new temporary folder.
+
+    Returns
+    -------
+    tarfolder : Optional[str]
+        The path of the temporary folder or None if ``modelfile`` is not a
+        valid model file. The caller has to remove the folder.
+    """
     if not os.path.isfile(modelfile):
         logging.error("File '%s' does not exist.", modelfile)
         return None
     if not tarfile.is_tarfile(modelfile):
         logging.error("'%s' is not a valid tar file.", modelfile)
         return None
-    tar = tarfile.open(modelfile)
-    filenames = tar.getnames()
-    if "model.yml" not in filenames:
-        logging.error("'%s' does not have a model.yml.", modelfile)
-        return None
-    if "input_semantics.csv" not in filenames:
-        logging.error("'%s' does not have an input_semantics.csv.", modelfile)
-        return None
-    if "output_semantics.csv" not in filenames:
-        logging.error("'%s' does not have an output_semantics.csv.", modelfile)
-        return None
-    tarfolder = tempfile.mkdtemp()
-    tar.extractall(path=tarfolder)
-    tar.close()
+    with tarfile.open(modelfile) as tar:
+        if not is_valid_model_tar(modelfile, get_tar_index(tar)):
+            return None
+        tarfolder = tempfile.mkdtemp()
+        tar.extractall(path=tarfolder)
     return tarfolder
 
 
-def get_model(modelfile: str) -> Dict[str, Any]:
-    """Check if ``modelfile`` is valid.
+def read_hdf5_member(
+    tar: tarfile.TarFile, member: tarfile.TarInfo, dataset: Optional[str] = None
+) -> np.ndarray:
+    """
+    Read a dataset of an HDF5 file which is stored within ``tar``.
 
     Parameters
     ----------
-    modelfile : str
-        path to a model.tar file which describes a neural network.
+    tar : tarfile.TarFile
+    member : tarfile.TarInfo
+        The HDF5 file within ``tar``
+    dataset : Optional[str]
+        The name of the dataset. Defaults to the name of the member.
 
     Returns
     -------
-    model : Dict[str, Any]
-        describes the model if everything seems to be fine. Return `False` if
-        errors occur.
+    data : np.ndarray
     """
-    tarfolder = check_and_create_model(modelfile)
-    if not tarfolder:
-        return
+    if dataset is None:
+        dataset = member.name
+    with tar.extractfile(member) as fileobj, h5py.File(fileobj, "r") as f:
+        return f[dataset][()]
 
-    model_yml = yaml.safe_load(open(os.path.join(tarfolder, "model.yml")))
-    if model_yml["type"] == "mlp":
-        layers = []
-        for layer in model_yml["layers"]:
-            layertmp = {}
 
-            f = h5py.File(os.path.join(tarfolder, layer["b"]["filename"]), "r")
-            layertmp["b"] = f[layer["b"]["filename"]][()]
+def get_model(modelfile: str) -> Dict[str, Any]:
+    """Check if ``modelfile`` is valid.
 
-            f = h5py.File(os.path.join(tarfolder, layer["W"]["filename"]), "r")
-            layertmp["W"] = f[layer["W"]["filename"]][()]
+    All files are read directly from the tar file; nothing gets extracted to
+    the file system.
 
-            layertmp["activation"] = get_af(layer["activation"])
+    Parameters
+    ----------
+    modelfile : str
+        path to a model.tar file which describes a neural network. Models in
+        the single-file format of :mod:`nntoolkit.nnt` are memory-mapped.
 
-            layers.append(layertmp)
-    model_yml["layers"] = layers
-    inputs = []
+    Returns
+    -------
+    model : Dict[str, Any]
+        describes the model if everything seems to be fine. Return `None` if
+        errors occur.
+    """
+    if not os.path.isfile(modelfile):
+        logging.error("File '%s' does not exist.", modelfile)
+        return None
+    if nnt.is_nnt_file(modelfile):
+        with profiling.stage("load: nnt"):
+            return nnt.read_model(modelfile)
+    if not tarfile.is_tarfile(modelfile):
+        logging.error("'%s' is not a valid tar file.", modelfile)
+        return None
 
-    # if sys.version_info.major < 3:
-    #     mode = 'rb'
-    #     arguments = {}
-    # else:
-    mode = "rt"
-    arguments = {"newline": "", "encoding": "utf8"}
-
-    input_semantics_file = os.path.join(tarfolder, "input_semantics.csv")
-    with open(input_semantics_file, mode, **arguments) as csvfile:
-        spamreader = csv.reader(csvfile, delimiter="\n", quotechar='"')
-        for row in spamreader:
-            inputs.append(row[0])
-    outputs = get_outputs(os.path.join(tarfolder, "output_semantics.csv"))
-    model_yml["inputs"] = inputs
-    model_yml["outputs"] = outputs
-
-    # Cleanup
-    shutil.rmtree(tarfolder)
+    with tarfile.open(modelfile) as tar:
+        with profiling.stage("load: tar index"):
+            members = get_tar_index(tar)
+        if not is_valid_model_tar(modelfile, members):
+            return None
+
+        with profiling.stage("load: model.yml"), tar.extractfile(
+            members["model.yml"]
+        ) as f:
+            model_yml = yaml.safe_load(f)
+        if model_yml["type"] == "mlp":
+            layers = []
+            for layer in model_yml["layers"]:
+                layertmp = {}
+                with profiling.stage("load: hdf5"):
+                    for key, value in layer.items():
+                        if isinstance(value, dict) and "filename" in value:
+                            layertmp[key] = read_hdf5_member(
+                                tar, members[value["filename"]]
+                            )
+                layertmp["activation"] = get_af(layer["activation"])
+                layers.append(layertmp)
+        model_yml["layers"] = layers
+
+        semantics = {}
+        for filename, quotechar in [
+            ("input_semantics.csv", '"'),
+            ("output_semantics.csv", "|"),
+        ]:
+            with profiling.stage("load: semantics"), tar.extractfile(
+                members[filename]
+            ) as f:
+                csvfile = io.TextIOWrapper(f, encoding="utf8", newline="")
+                semantics[filename] = read_semantics(csvfile, quotechar=quotechar)
+    model_yml["inputs"] = semantics["input_semantics.csv"]
+    model_yml["outputs"] = semantics["output_semantics.csv"]
     return model_yml
 
 
@@ -142,6 +214,9 @@ def get_data(data_file: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
     """
     Get data as x and y numpy arrays for a hdf5 file.
 
+    ``.npy`` and JSON data files (see :func:`nntoolkit.data.open_memmap`) are
+    not loaded, but memory-mapped.
+
     Parameters
     ----------
     data_file : str
@@ -154,6 +229,10 @@ def get_data(data_file: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
     if not os.path.isfile(data_file):
         raise FileNotFoundError(f"File '{data_file}' does not exist.")
 
+    if data_file.endswith(data.MEMMAP_EXTENSIONS):
+        x, y = data.open_memmap(data_file)
+        return (x, None if y is None else y.reshape(len(y), 1))
+
     with h5py.File(data_file, "r") as f:
         x = f["data"][()]
 
@@ -186,7 +265,7 @@ def create_boilerplate_semantics_files(neurons: List[int]):
             f.write("output neuron %i\n" % i)
 
 
-def create_semantics_files(model: Dict[str, Any]):
+def create_semantics_files(model: Dict[str, Any], folder: str = "."):
     """
     Create semantic input and output files which can contain semantic
     meaningful values.
@@ -195,22 +274,132 @@ def create_semantics_files(model: Dict[str, Any]):
     ----------
     model : Dict[str, Any]
         A neural network model
+    folder : str
+        The folder where the files get written to.
     """
-    # input_semantics
-    with open("input_semantics.csv", "w") as csvfile:
-        spamwriter = csv.writer(
-            csvfile, delimiter="\n", quotechar='"', quoting=csv.QUOTE_MINIMAL
-        )
-        for semantic in model["inputs"]:
-            spamwriter.writerow(semantic)
+    for filename, key, quotechar in [
+        ("input_semantics.csv", "inputs", '"'),
+        ("output_semantics.csv", "outputs", "|"),
+    ]:
+        path = os.path.join(folder, filename)
+        with open(path, "w", newline="", encoding="utf8") as csvfile:
+            spamwriter = csv.writer(
+                csvfile,
+                delimiter="\n",
+                quotechar=quotechar,
+                quoting=csv.QUOTE_MINIMAL,
+                lineterminator="\n",
+            )
+            for semantic in model[key]:
+                spamwriter.writerow([semantic])
+
+
+def write_model_tar(
+    model: Dict[str, Any],
+    model_file_path: str,
+    compression: Optional[str] = None,
+    shuffle: bool = False,
+):
+    """
+    Write a loaded ``model`` in the tar model format.
+
+    Parameters
+    ----------
+    model : Dict[str, Any]
+        A model as returned by :func:`get_model`
+    model_file_path : str
+        Where the tar file gets written to.
+    compression : Optional[str]
+        Compress the weight files with "gzip" or "lzf".
+    shuffle : bool
+        Apply the byte shuffle filter to the weight files.
+    """
+    tarfolder = tempfile.mkdtemp()
+    try:
+        model_yml = {
+            key: value
+            for key, value in model.items()
+            if key not in ["layers", "inputs", "outputs"]
+        }
+        model_yml["layers"] = []
+        for i, layer in enumerate(model["layers"]):
+            layer_yml = {"activation": str(layer["activation"])}
+            for key in sorted(layer):
+                if not isinstance(layer[key], np.ndarray):
+                    continue
+                filename = f"{key}{i}.hdf5"
+                options = {}
+                if compression is not None or shuffle:
+                    options = data.get_dataset_options(
+                        layer[key].shape,
+                        layer[key].dtype,
+                        compression=compression,
+                        shuffle=shuffle,
+                    )
+                with h5py.File(os.path.join(tarfolder, filename), "w") as f:
+                    f.create_dataset(filename, data=layer[key], **options)
+                layer_yml[key] = {
+                    "size": list(layer[key].shape),
+                    "filename": filename,
+                }
+            model_yml["layers"].append(layer_yml)
+        with open(os.path.join(tarfolder, "model.yml"), "w") as f:
+            yaml.dump(model_yml, f, default_flow_style=False)
+        create_semantics_files(model, tarfolder)
+
+        with tarfile.open(model_file_path, "w:") as tar:
+            for name in sorted(os.listdir(tarfolder)):
+                tar.add(os.path.join(tarfolder, name), arcname=name)
+    finally:
+        shutil.rmtree(tarfolder)
+
+
+def convert_model(
+    input_file: str,
+    output_file: str,
+    compression: Optional[str] = None,
+    shuffle: bool = False,
+) -> bool:
+    """
+    Convert a model between the tar format and the ``.nnt`` format.
+
+    The format of ``output_file`` is chosen by its extension: ``.tar`` for
+    the tar format, the single-file format of :mod:`nntoolkit.nnt` otherwise.
+    ``compression`` and ``shuffle`` are only supported by the tar format,
+    see :func:`write_model_tar`.
 
-    # output_semantics
-    with open("output_semantics.csv", "w") as csvfile:
-        spamwriter = csv.writer(
-            csvfile, delimiter="\n", quotechar='"', quoting=csv.QUOTE_MINIMAL
+    Returns
+    -------
+    False if it failed.
+    """
+    model = get_model(input_file)
+    if not model:
+        return False
+    save_model(model, output_file, compression, shuffle)
+    return True
+
+
+def save_model(
+    model: Dict[str, Any],
+    model_file_path: str,
+    compression: Optional[str] = None,
+    shuffle: bool = False,
+):
+    """
+    Write a loaded ``model`` to ``model_file_path``.
+
+    The format is chosen by the extension: ``.tar`` for the tar format, the
+    single-file format of :mod:`nntoolkit.nnt` otherwise.
+    """
+    if model_file_path.endswith(".tar"):
+        write_model_tar(model, model_file_path, compression, shuffle)
+    elif compression is not None or shuffle:
+        raise ValueError(
+            "The .nnt format stores the weights uncompressed to memory-map "
+            "them. Use a .tar file for compressed weights."
         )
-        for semantic in model["outputs"]:
-            spamwriter.writerow(semantic)
+    else:
+        nnt.write_model(model, model_file_path)
 
 
 def write_model(model_dict: Dict[str, Any], model, model_file_path: str) -> bool:
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+
+# Third party modules
+import numpy
+
+# First party modules
+from nntoolkit.activation_functions import Sigmoid, Softmax, get_activation_function
+
+
+def test_sigmoid():
+    x = numpy.array([[-800.0, -1.0, 0.0, 1.0, 800.0]])
+    expected = [[0.0, 1.0 / (1 + numpy.e), 0.5, 1.0 / (1 + numpy.exp(-1)), 1.0]]
+    numpy.testing.assert_allclose(Sigmoid()(x), expected, atol=1e-12)
+
+
+def test_softmax_is_row_wise_and_stable():
+    x = numpy.array([[1.0, 2.0, 3.0], [1000.0, 1001.0, 1002.0]])
+    y = Softmax()(x)
+    assert numpy.all(numpy.isfinite(y))
+    numpy.testing.assert_allclose(y.sum(axis=1), [1.0, 1.0])
+    numpy.testing.assert_allclose(y[0], y[1])
+
+
+def test_in_place_evaluation():
+    x = numpy.random.RandomState(0).uniform(-5, 5, size=(4, 6)).astype(numpy.float32)
+    for name in ["Sigmoid", "Softmax"]:
+        activation = get_activation_function(name)
+        expected = activation(x)
+        assert expected.dtype == numpy.float32
+        buffer = x.copy()
+        assert activation(buffer, out=buffer) is buffer
+        numpy.testing.assert_allclose(buffer, expected)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import json
+import os
+
+# Third party modules
+import h5py
+import numpy
+import pytest
+from click.testing import CliRunner
+
+# First party modules
+import nntoolkit.bulk as bulk
+import nntoolkit.cli as cli
+import nntoolkit.data as data
+import nntoolkit.evaluate as evaluate
+import nntoolkit.utils as utils
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+@pytest.fixture
+def features():
+    rng = numpy.random.RandomState(0)
+    return rng.uniform(-1, 1, size=(25, 167))
+
+
+def write_input(path, features):
+    if path.endswith(".hdf5"):
+        with h5py.File(path, "w") as f:
+            f.create_dataset("data", data=features)
+    elif path.endswith(".npy"):
+        numpy.save(path, features)
+    elif path.endswith(".json"):
+        features.astype(numpy.float32).tofile(path + ".f32")
+        data.write_raw_header(path, path + ".f32", features.shape)
+    else:
+        with open(path, "w") as f:
+            for row in features:
+                f.write(json.dumps(row.tolist()) + "\n")
+
+
+def read_indices(path):
+    if path.endswith(".hdf5"):
+        with h5py.File(path, "r") as f:
+            return f["indices"][:]
+    elif path.endswith(".npy"):
+        return numpy.load(path)["index"]
+    with open(path) as f:
+        return numpy.array(
+            [[result["symbolnr"] for result in json.loads(line)] for line in f]
+        )
+
+
+@pytest.mark.parametrize("input_format", ["hdf5", "npy", "json", "jsonl"])
+@pytest.mark.parametrize("output_format", ["hdf5", "npy", "jsonl"])
+def test_bulk_matches_single_evaluation(
+    tmp_path, features, input_format, output_format
+):
+    input_file = str(tmp_path / f"input.{input_format}")
+    output_file = str(tmp_path / f"output.{output_format}")
+    write_input(input_file, features)
+
+    assert bulk.main(model_file, input_file, output_file, batch_size=7, k=3) == 25
+
+    model = utils.get_model(model_file)
+    expected = [
+        evaluate.get_top_k(evaluate.get_model_output(model, numpy.array([x])), 3)[0]
+        for x in features
+    ]
+    numpy.testing.assert_array_equal(read_indices(output_file), expected)
+
+
+def test_unknown_format(tmp_path, features):
+    with pytest.raises(ValueError):
+        bulk.get_format("features.csv")
+    input_file = str(tmp_path / "input.npy")
+    write_input(input_file, features)
+    with pytest.raises(ValueError):
+        bulk.main(model_file, input_file, str(tmp_path / "output.json"))
+
+
+def test_cli_bulk_evaluate(tmp_path, features):
+    input_file = str(tmp_path / "input.npy")
+    output_file = str(tmp_path / "output.jsonl")
+    write_input(input_file, features)
+    result = CliRunner().invoke(
+        cli.evaluate, ["-m", model_file, "-i", input_file, "-o", output_file, "-k", "2"]
+    )
+    assert result.exit_code == 0, result.output
+    with open(output_file) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 25
+    assert all(len(line) == 2 for line in lines)
+
+
+@pytest.mark.parametrize("output_format", ["hdf5", "jsonl"])
+def test_non_ascii_semantics(tmp_path, features, output_format):
+    model = utils.get_model(model_file)
+    model["outputs"] = ["α %i" % i for i in range(len(model["outputs"]))]
+    unicode_model = str(tmp_path / "model.nnt")
+    utils.save_model(model, unicode_model)
+    input_file = str(tmp_path / "input.npy")
+    write_input(input_file, features)
+    output_file = str(tmp_path / f"output.{output_format}")
+    bulk.main(unicode_model, input_file, output_file, k=3)
+    if output_format == "hdf5":
+        with h5py.File(output_file, "r") as f:
+            semantics = list(f["semantics"].asstr()[()])
+    else:
+        with open(output_file, encoding="utf8") as f:
+            semantics = [result["semantics"] for result in json.loads(f.readline())]
+    assert all(name.startswith("α") for name in semantics)
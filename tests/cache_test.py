@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import os
+import shutil
+
+# Third party modules
+import numpy
+
+# First party modules
+import nntoolkit.evaluate as evaluate
+from nntoolkit.cache import ModelCache, model_cache
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+def fake_loader(modelfile):
+    size = os.path.getsize(modelfile)
+    return {"type": "mlp", "layers": [{"W": numpy.zeros(size, dtype=numpy.uint8)}]}
+
+
+def test_hits_and_misses(tmp_path):
+    a = tmp_path / "a.tar"
+    a.write_bytes(b"x" * 10)
+    cache = ModelCache(max_bytes=100, loader=fake_loader)
+    assert cache.get(str(a)) is cache.get(str(a))
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # A changed file gets loaded again
+    a.write_bytes(b"x" * 20)
+    assert len(cache.get(str(a))["layers"][0]["W"]) == 20
+    assert cache.stats()["misses"] == 2
+
+
+def test_lru_eviction(tmp_path):
+    paths = []
+    for name in ["a", "b", "c"]:
+        path = tmp_path / f"{name}.tar"
+        path.write_bytes(b"x" * 40)
+        paths.append(str(path))
+    cache = ModelCache(max_bytes=100, loader=fake_loader)
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])
+    cache.get(paths[2])  # evicts b, the least recently used model
+    assert cache.stats()["evictions"] == 1
+    cache.get(paths[0])
+    assert cache.stats()["hits"] == 2
+    cache.get(paths[1])
+    assert cache.stats()["misses"] == 4
+
+
+def test_too_large_model_is_not_cached(tmp_path):
+    path = tmp_path / "a.tar"
+    path.write_bytes(b"x" * 200)
+    cache = ModelCache(max_bytes=100, loader=fake_loader)
+    cache.get(str(path))
+    assert len(cache) == 0
+
+
+def test_evaluate_uses_cache(tmp_path):
+    modelfile = str(tmp_path / "model.tar")
+    shutil.copy(model_file, modelfile)
+    before = model_cache.stats()
+    features = [0 for i in range(167)]
+    first = evaluate.main(modelfile, features, print_results=False)
+    second = evaluate.main(modelfile, features, print_results=False)
+    after = model_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert first == second
+
+
+def test_predictor_is_reused(tmp_path):
+    modelfile = str(tmp_path / "model.tar")
+    shutil.copy(model_file, modelfile)
+    cache = ModelCache()
+    predictor = cache.get_predictor(modelfile)
+    assert cache.get_predictor(modelfile) is predictor
+    assert predictor.outputs == cache.get(modelfile)["outputs"]
+
+    # The predictor gets dropped together with the model
+    cache.clear()
+    assert cache.get_predictor(modelfile) is not predictor
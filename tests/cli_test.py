@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import os
+import subprocess
+import sys
+
+# Third party modules
+from click.testing import CliRunner
+
+# First party modules
+import nntoolkit.cli as cli
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+# Importing the CLI takes about 0.2s on a laptop; TensorFlow alone needs
+# several seconds.
+STARTUP_BUDGET_SECONDS = 2.0
+
+
+def get_import_times(module):
+    """Get the cumulative import time in seconds of all imported modules."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative) / 10**6
+    return times
+
+
+def test_cli_startup_budget():
+    times = get_import_times("nntoolkit.cli")
+    for heavy_module in ["tensorflow", "keras", "pkg_resources"]:
+        assert heavy_module not in times
+    assert times["nntoolkit.cli"] < STARTUP_BUDGET_SECONDS
+
+
+def test_convert(tmp_path):
+    nnt_file = str(tmp_path / "model.nnt")
+    result = CliRunner().invoke(cli.entry_point, ["convert", model_file, nnt_file])
+    assert result.exit_code == 0
+    assert os.path.isfile(nnt_file)
+
+
+def test_evaluate_shows_top_k():
+    features = os.path.join(current_folder, "misc", "features.json")
+    result = CliRunner().invoke(
+        cli.entry_point, ["evaluate", "-m", model_file, "-i", features, "-k", "20"]
+    )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    # A headline and two separator lines around the 20 results
+    assert len(lines) == 23
+    assert lines[1] == lines[-1] == "#" * 50
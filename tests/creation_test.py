@@ -3,6 +3,10 @@
 # Core Library modules
 import os
 
+# Third party modules
+import h5py
+import numpy
+
 # First party modules
 import nntoolkit.create as create
 
@@ -29,3 +33,77 @@ def test_create_nontar_model():
     model_file = os.path.join(misc_folder, "model-nonexistent.bla")
     create.main("mlp", "10:12:8", model_file)
     # TODO: Check if error was logged
+
+
+def read_weights(folder):
+    weights = {}
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".hdf5"):
+            with h5py.File(os.path.join(folder, name), "r") as f:
+                weights[name] = f[name][()]
+    return weights
+
+
+def create_in(folder, monkeypatch, **kwargs):
+    os.makedirs(folder)
+    monkeypatch.chdir(folder)
+    create.main("mlp", "30:20:10:5", "model.tar", **kwargs)
+    return read_weights(folder)
+
+
+def test_seeded_creation_is_deterministic(tmp_path, monkeypatch):
+    expected = create_in(str(tmp_path / "a"), monkeypatch, seed=42)
+    parallel = create_in(str(tmp_path / "b"), monkeypatch, seed=42, jobs=3)
+    other_seed = create_in(str(tmp_path / "c"), monkeypatch, seed=43)
+    assert sorted(expected) == ["W0.hdf5", "W1.hdf5", "W2.hdf5"] + [
+        "b0.hdf5",
+        "b1.hdf5",
+        "b2.hdf5",
+    ]
+    for name, values in expected.items():
+        assert values.dtype == numpy.float32
+        numpy.testing.assert_array_equal(parallel[name], values)
+        assert not numpy.array_equal(other_seed[name], values)
+
+
+def test_weight_blocks_do_not_change_the_weights():
+    seed = create.get_layer_seeds(1, 0)[0][0]
+    whole = numpy.concatenate(
+        [block for _, block in create.iter_weight_blocks(50, 7, seed, 50)]
+    )
+    blocks = numpy.concatenate(
+        [block for _, block in create.iter_weight_blocks(50, 7, seed, 3)]
+    )
+    numpy.testing.assert_array_equal(blocks, whole)
+    init_weight = create.get_init_range(50, 7)
+    assert numpy.all(numpy.abs(whole) <= init_weight)
+
+
+def test_write_layer_is_order_independent(tmp_path, monkeypatch):
+    expected = create_in(str(tmp_path / "a"), monkeypatch, seed=7)
+    folder = tmp_path / "b"
+    folder.mkdir()
+    monkeypatch.chdir(folder)
+    shapes = [(30, 20), (20, 10), (10, 5)]
+    seeds = create.get_layer_seeds(len(shapes), 7)
+    # Layers in reverse order and in small blocks, as parallel jobs could do
+    for i in reversed(range(len(shapes))):
+        create.write_layer(i, *shapes[i], seeds[i], block_rows=3)
+    written = read_weights(str(folder))
+    assert sorted(written) == sorted(expected)
+    for name, values in expected.items():
+        numpy.testing.assert_array_equal(written[name], values)
+
+
+def test_compressed_creation(tmp_path, monkeypatch):
+    expected = create_in(str(tmp_path / "a"), monkeypatch, seed=1)
+    compressed = create_in(
+        str(tmp_path / "b"), monkeypatch, seed=1, compression="gzip", shuffle=True
+    )
+    for name, values in expected.items():
+        numpy.testing.assert_array_equal(compressed[name], values)
+        with h5py.File(str(tmp_path / "b" / name), "r") as f:
+            assert f[name].compression == "gzip"
+            assert f[name].shuffle
+        with h5py.File(str(tmp_path / "a" / name), "r") as f:
+            assert f[name].chunks is None
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import json
+import threading
+
+# Third party modules
+import h5py
+import numpy
+import pytest
+
+# First party modules
+import nntoolkit.data as data
+import nntoolkit.utils as utils
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = str(tmp_path / "data.hdf5")
+    rng = numpy.random.RandomState(0)
+    with h5py.File(path, "w") as f:
+        f.create_dataset("data", data=rng.uniform(size=(1000, 5)), chunks=(64, 5))
+        f.create_dataset("labels", data=rng.randint(0, 3, size=1000))
+    return path
+
+
+def test_iter_data(data_file):
+    chunks = list(data.iter_data(data_file, batch_size=100))
+    assert [len(x) for x, _ in chunks] == [100] * 10
+    x_vec, y_vec = utils.get_data(data_file)
+    numpy.testing.assert_array_equal(numpy.concatenate([x for x, _ in chunks]), x_vec)
+    numpy.testing.assert_array_equal(numpy.concatenate([y for _, y in chunks]), y_vec)
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_iter_data_keeps_batch_size(data_file, prefetch):
+    # 7 rows per batch do not divide the 64 rows per chunk
+    batches = [
+        (x.copy(), y.copy())
+        for x, y in data.iter_data(data_file, batch_size=7, prefetch=prefetch)
+    ]
+    assert [len(x) for x, _ in batches] == [7] * 142 + [6]
+    x_vec, y_vec = utils.get_data(data_file)
+    numpy.testing.assert_array_equal(numpy.concatenate([x for x, _ in batches]), x_vec)
+    numpy.testing.assert_array_equal(numpy.concatenate([y for _, y in batches]), y_vec)
+
+
+def test_iter_data_without_labels(tmp_path):
+    path = str(tmp_path / "data.hdf5")
+    with h5py.File(path, "w") as f:
+        f.create_dataset("data", data=numpy.zeros((10, 2)))
+    assert [y for _, y in data.iter_data(path, batch_size=3)] == [None] * 4
+
+
+def test_iter_data_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        next(data.iter_data(str(tmp_path / "missing.hdf5")))
+
+
+@pytest.mark.parametrize("prefetch", [1, 3])
+def test_iter_data_prefetch(data_file, prefetch):
+    stats = data.ReadStats()
+    chunks = [
+        (x.copy(), y.copy())
+        for x, y in data.iter_data(data_file, 100, prefetch=prefetch, stats=stats)
+    ]
+    expected = list(data.iter_data(data_file, 100))
+    assert len(chunks) == len(expected) == 10
+    # The reads cover whole chunks of 64 rows
+    assert stats.batches == 8
+    for (x, y), (x_expected, y_expected) in zip(chunks, expected):
+        numpy.testing.assert_array_equal(x, x_expected)
+        numpy.testing.assert_array_equal(y, y_expected)
+    assert stats.read_seconds > 0
+
+
+def get_prefetch_threads():
+    return [
+        thread
+        for thread in threading.enumerate()
+        if thread.name == "nntoolkit-prefetch"
+    ]
+
+
+def test_iter_data_prefetch_stop_early(data_file):
+    batches = data.iter_data(data_file, 64, prefetch=2)
+    next(batches)
+    assert len(get_prefetch_threads()) == 1
+    batches.close()
+    assert get_prefetch_threads() == []
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_iter_data_short_labels(data_file, prefetch):
+    with h5py.File(data_file, "a") as f:
+        del f["labels"]
+        f.create_dataset("labels", data=numpy.zeros(10))
+    with pytest.raises(ValueError):
+        list(data.iter_data(data_file, 64, prefetch=prefetch))
+    assert get_prefetch_threads() == []
+
+
+def test_iter_data_prefetch_error(data_file, monkeypatch):
+    def read_direct(*args):
+        raise OSError("broken file")
+
+    monkeypatch.setattr(h5py.Dataset, "read_direct", read_direct)
+    # The error of the reader thread gets raised in the consumer
+    with pytest.raises(OSError):
+        list(data.iter_data(data_file, 64, prefetch=2))
+    assert get_prefetch_threads() == []
+
+
+@pytest.mark.parametrize("shuffle_buffer", [1, 200, 10**6])
+def test_iter_shuffled_data(data_file, shuffle_buffer):
+    rng = numpy.random.default_rng(0)
+    batches = list(
+        data.iter_shuffled_data(data_file, 100, shuffle_buffer, rng, prefetch=2)
+    )
+    assert [len(x) for x, _ in batches] == [100] * 10
+    x = numpy.concatenate([x for x, _ in batches])
+    y = numpy.concatenate([y for _, y in batches])
+    x_vec, y_vec = utils.get_data(data_file)
+    # Every row comes exactly once and keeps its label
+    order = numpy.argsort(x[:, 0])
+    expected_order = numpy.argsort(x_vec[:, 0])
+    numpy.testing.assert_array_equal(x[order], x_vec[expected_order])
+    numpy.testing.assert_array_equal(y[order], y_vec.reshape(-1)[expected_order])
+    assert not numpy.array_equal(x, x_vec)
+
+
+def test_iter_shuffled_data_without_labels(tmp_path):
+    path = str(tmp_path / "data.hdf5")
+    with h5py.File(path, "w") as f:
+        f.create_dataset("data", data=numpy.zeros((10, 2)))
+    with pytest.raises(ValueError):
+        list(data.iter_shuffled_data(path))
+
+
+@pytest.fixture
+def memmap_files(tmp_path):
+    """The same features and labels as .npy files and as raw files."""
+    rng = numpy.random.RandomState(0)
+    x = rng.uniform(size=(300, 5)).astype(numpy.float32)
+    y = rng.randint(0, 3, size=300)
+    npy_file = str(tmp_path / "data.npy")
+    numpy.save(npy_file, x)
+    numpy.save(data.get_labels_file(npy_file), y)
+    header_file = str(tmp_path / "data.json")
+    x.tofile(str(tmp_path / "x.f32"))
+    y.astype(numpy.int64).tofile(str(tmp_path / "y.i64"))
+    data.write_raw_header(
+        header_file,
+        str(tmp_path / "x.f32"),
+        x.shape,
+        "float32",
+        str(tmp_path / "y.i64"),
+    )
+    return x, y, [npy_file, header_file]
+
+
+def test_iter_memmap_data(memmap_files):
+    x, y, paths = memmap_files
+    for path in paths:
+        batches = list(data.iter_data(path, batch_size=128, prefetch=2))
+        assert [len(x_batch) for x_batch, _ in batches] == [128, 128, 44]
+        # Batches are views of the file
+        assert all(isinstance(x_batch, numpy.memmap) for x_batch, _ in batches)
+        numpy.testing.assert_array_equal(numpy.concatenate([b[0] for b in batches]), x)
+        numpy.testing.assert_array_equal(
+            numpy.concatenate([b[1] for b in batches]).reshape(-1), y
+        )
+        x_vec, y_vec = utils.get_data(path)
+        numpy.testing.assert_array_equal(x_vec, x)
+        assert y_vec.shape == (300, 1)
+        assert data.get_n_rows(path) == 300
+        assert data.get_shards(path, 2) == [(0, 150), (150, 300)]
+
+
+def test_iter_shuffled_memmap_data(memmap_files):
+    x, y, paths = memmap_files
+    for path in paths:
+        rng = numpy.random.default_rng(0)
+        batches = list(data.iter_shuffled_data(path, 64, 100, rng))
+        x_shuffled = numpy.concatenate([x_batch for x_batch, _ in batches])
+        y_shuffled = numpy.concatenate([y_batch for _, y_batch in batches])
+        order = numpy.argsort(x_shuffled[:, 0])
+        numpy.testing.assert_array_equal(x_shuffled[order], x[numpy.argsort(x[:, 0])])
+        numpy.testing.assert_array_equal(y_shuffled[order], y[numpy.argsort(x[:, 0])])
+
+
+def test_memmap_short_labels(memmap_files):
+    _, y, (npy_file, header_file) = memmap_files
+    numpy.save(data.get_labels_file(npy_file), y[:10])
+    with pytest.raises(ValueError, match="data.labels.npy"):
+        data.open_memmap(npy_file)
+    with open(header_file) as f:
+        header = json.load(f)
+    header["labels"]["shape"] = [10]
+    with open(header_file, "w") as f:
+        json.dump(header, f)
+    with pytest.raises(ValueError, match="data.json"):
+        list(data.iter_data(header_file))
+
+
+def test_unlabeled_npy(tmp_path):
+    path = str(tmp_path / "features.npy")
+    numpy.save(path, numpy.zeros((4, 2)))
+    assert [y for _, y in data.iter_data(path, batch_size=3)] == [None] * 2
+
+
+def test_get_shards(data_file):
+    assert data.get_shards(data_file, 3) == [(0, 384), (384, 768), (768, 1000)]
+    assert data.get_shards(data_file, 1) == [(0, 1000)]
+
+
+def test_get_dataset_options():
+    assert data.get_dataset_options((10, 3), "float64", chunk_rows=4, shuffle=True) == {
+        "chunks": (4, 3),
+        "shuffle": True,
+    }
+    # Chunks do not get larger than the dataset
+    assert data.get_dataset_options((3,), "int64")["chunks"] == (3,)
+    with pytest.raises(ValueError):
+        data.get_dataset_options((10, 3), "float64", compression="zip")
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "lzf"])
+def test_repack(data_file, tmp_path, compression, capsys):
+    output_file = str(tmp_path / "repacked.hdf5")
+    report = data.repack_and_report(
+        data_file, output_file, chunk_rows=100, compression=compression, shuffle=True
+    )
+    assert set(report) == {"before", "after"}
+    assert "random [rows/sec]" in capsys.readouterr().out
+    with h5py.File(output_file, "r") as f:
+        assert f["data"].chunks == (100, 5)
+        assert f["data"].compression == compression
+    for expected, result in zip(utils.get_data(data_file), utils.get_data(output_file)):
+        numpy.testing.assert_array_equal(result, expected)
+
+
+def test_write_compressed_model_tar(tmp_path):
+    model = {
+        "type": "mlp",
+        "layers": [
+            {
+                "W": numpy.ones((4, 3), dtype=numpy.float32),
+                "b": numpy.zeros(3, dtype=numpy.float32),
+                "activation": "Softmax",
+            }
+        ],
+        "inputs": [f"in {i}" for i in range(4)],
+        "outputs": [f"out {i}" for i in range(3)],
+    }
+    model_file = str(tmp_path / "model.tar")
+    utils.save_model(model, model_file, compression="gzip")
+    numpy.testing.assert_array_equal(
+        utils.get_model(model_file)["layers"][0]["W"], model["layers"][0]["W"]
+    )
+    with pytest.raises(ValueError):
+        utils.save_model(model, str(tmp_path / "model.nnt"), compression="gzip")
@@ -5,6 +5,9 @@ import json
 import os
 import tempfile
 
+# Third party modules
+import numpy
+
 # First party modules
 import nntoolkit.evaluate as evaluate
 
@@ -63,3 +66,39 @@ def test_show_empty_results():
     """Show an empty results list."""
     print_string = evaluate.show_results([])
     assert print_string == "-- No results --"
+
+
+def test_top_k():
+    """Top-k selection equals a full sort, also for batches."""
+    outputs = numpy.random.RandomState(0).uniform(size=(4, 50))
+    outputs[0, :10] = 0.5  # ties are sorted by index
+    indices, probabilities = evaluate.get_top_k(outputs, 12)
+    expected = numpy.argsort(-outputs, axis=1, kind="stable")[:, :12]
+    numpy.testing.assert_array_equal(indices, expected)
+    numpy.testing.assert_array_equal(
+        probabilities, numpy.take_along_axis(outputs, expected, axis=1)
+    )
+    assert evaluate.get_top_k(outputs[0], 100)[0].shape == (50,)
+
+
+def test_top_k_tie_at_boundary():
+    """Ties at the k-th place are broken by the index like a full sort."""
+    indices, _ = evaluate.get_top_k(numpy.array([[0.2, 0.2, 0.6]]), 2)
+    numpy.testing.assert_array_equal(indices, [[2, 0]])
+    outputs = numpy.random.RandomState(1).randint(0, 4, size=(20, 30)) / 4
+    for k in [1, 5, 29]:
+        expected = numpy.argsort(-outputs, axis=1, kind="stable")[:, :k]
+        numpy.testing.assert_array_equal(evaluate.get_top_k(outputs, k)[0], expected)
+        # The top-k results are a prefix of the full ranking
+        full = evaluate.get_results(outputs[0], list(range(30)))
+        assert evaluate.get_results(outputs[0], list(range(30)), k) == full[:k]
+
+
+def test_main_with_k():
+    current_folder = os.path.dirname(os.path.realpath(__file__))
+    model_file = os.path.join(current_folder, "misc", "model.tar")
+    features = [0 for i in range(167)]
+    results = evaluate.main(model_file, features, print_results=False)
+    assert len(results) == 369
+    top_5 = evaluate.main(model_file, features, print_results=False, k=5)
+    assert top_5 == results[:5]
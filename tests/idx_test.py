@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import gzip
+import struct
+
+# Third party modules
+import h5py
+import numpy
+import pytest
+from click.testing import CliRunner
+
+# First party modules
+import nntoolkit.cli as cli
+import nntoolkit.idx as idx
+import nntoolkit.utils as utils
+
+
+def write_idx(path, array, type_code=0x08):
+    dtype = idx.IDX_DTYPES[type_code]
+    content = struct.pack(">HBB", 0, type_code, array.ndim)
+    content += struct.pack(f">{array.ndim}I", *array.shape)
+    content += array.astype(dtype).tobytes()
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wb") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def mnist_like(tmp_path):
+    rng = numpy.random.RandomState(0)
+    images = rng.randint(0, 256, size=(100, 28, 28)).astype(numpy.uint8)
+    labels = rng.randint(0, 10, size=100).astype(numpy.uint8)
+    images_file = str(tmp_path / "images-idx3-ubyte.gz")
+    labels_file = str(tmp_path / "labels-idx1-ubyte")
+    write_idx(images_file, images)
+    write_idx(labels_file, labels)
+    return images, labels, images_file, labels_file
+
+
+@pytest.mark.parametrize("type_code", sorted(idx.IDX_DTYPES))
+def test_read_idx(tmp_path, type_code):
+    array = numpy.arange(-12, 12).reshape(2, 3, 4)
+    path = str(tmp_path / "array.idx")
+    write_idx(path, array, type_code)
+    result = idx.read_idx(path)
+    assert result.dtype.isnative
+    numpy.testing.assert_array_equal(result, array.astype(result.dtype))
+
+
+def test_truncated(tmp_path):
+    path = str(tmp_path / "array.idx")
+    write_idx(path, numpy.zeros((10, 3)))
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(path, "wb") as f:
+        f.write(content[:-1])
+    with pytest.raises(ValueError):
+        idx.read_idx(path)
+
+
+def test_import_idx(tmp_path, mnist_like):
+    images, labels, images_file, labels_file = mnist_like
+    data_file = str(tmp_path / "data.hdf5")
+    assert idx.import_idx(images_file, data_file, labels_file, chunk_rows=16) == 100
+    with h5py.File(data_file, "r") as f:
+        assert f["data"].chunks == (16, 784)
+    x, y = utils.get_data(data_file)
+    numpy.testing.assert_array_equal(x, images.reshape(100, 784))
+    numpy.testing.assert_array_equal(y[:, 0], labels)
+
+
+def test_import_idx_label_mismatch(tmp_path, mnist_like):
+    _, _, images_file, _ = mnist_like
+    labels_file = str(tmp_path / "few-labels")
+    write_idx(labels_file, numpy.zeros(10))
+    with pytest.raises(ValueError):
+        idx.import_idx(images_file, str(tmp_path / "data.hdf5"), labels_file)
+
+
+def test_cli_import_idx(tmp_path, mnist_like):
+    images, _, images_file, labels_file = mnist_like
+    data_file = str(tmp_path / "data.hdf5")
+    result = CliRunner().invoke(
+        cli.entry_point,
+        ["data", "import-idx", images_file, data_file, "-l", labels_file]
+        + ["--normalize", "--compression", "gzip"],
+    )
+    assert result.exit_code == 0, result.output
+    x, _ = utils.get_data(data_file)
+    assert x.dtype == numpy.float32
+    numpy.testing.assert_allclose(x, images.reshape(100, 784) / 255, rtol=1e-6)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Third party modules
+import numpy
+import pytest
+
+# First party modules
+import nntoolkit.evaluate as evaluate
+import nntoolkit.utils as utils
+from nntoolkit.inference import CompiledMLP
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+def test_predict_matches_reference():
+    model = utils.get_model(model_file)
+    predictor = CompiledMLP(model)
+    x = numpy.random.RandomState(0).uniform(-1, 1, size=(20, 167))
+    expected = evaluate.get_batch_output(model, x)
+    for batch_size in [1, 20, 7, 20]:
+        numpy.testing.assert_allclose(
+            predictor.predict(x[:batch_size]), expected[:batch_size], rtol=1e-4
+        )
+    numpy.testing.assert_allclose(
+        predictor.predict_one(x[3]), evaluate.get_model_output(model, x[3:4]), rtol=1e-4
+    )
+
+
+def test_predict_returns_new_arrays():
+    predictor = CompiledMLP(utils.get_model(model_file))
+    x = numpy.zeros((2, 167))
+    first = predictor.predict(x)
+    second = predictor.predict(x + 1)
+    assert first is not second
+    assert not numpy.allclose(first, second)
+
+
+def test_predict_wrong_shape():
+    predictor = CompiledMLP(utils.get_model(model_file))
+    with pytest.raises(ValueError):
+        predictor.predict(numpy.zeros((2, 3)))
+
+
+def test_predict_from_threads():
+    predictor = CompiledMLP(utils.get_model(model_file))
+    x = numpy.random.RandomState(0).uniform(-1, 1, size=(8, 167))
+    expected = predictor.predict(x)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outputs = list(executor.map(lambda _: predictor.predict(x), range(16)))
+    for output in outputs:
+        numpy.testing.assert_allclose(output, expected)
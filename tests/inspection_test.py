@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import os
+
+# Third party modules
+import h5py
+import numpy
+import pytest
+from click.testing import CliRunner
+
+# First party modules
+import nntoolkit.cache as cache
+import nntoolkit.cli as cli
+import nntoolkit.inspection as inspection
+import nntoolkit.quantize as quantize
+import nntoolkit.utils as utils
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+def forbid_weight_reads(monkeypatch):
+    """Fail if any weight data gets read."""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Weight data was read.")
+
+    monkeypatch.setattr(h5py.Dataset, "__getitem__", fail)
+    monkeypatch.setattr(h5py.Dataset, "read_direct", fail)
+    monkeypatch.setattr(numpy, "memmap", fail)
+
+
+@pytest.fixture
+def model_files(tmp_path):
+    model = utils.get_model(model_file)
+    paths = {"tar": model_file, "nnt": str(tmp_path / "model.nnt")}
+    utils.save_model(model, paths["nnt"])
+    paths["int8"] = str(tmp_path / "int8.tar")
+    utils.save_model(quantize.quantize_model(model, "int8"), paths["int8"])
+    return paths
+
+
+@pytest.mark.parametrize("name", ["tar", "nnt", "int8"])
+def test_report_matches_loaded_model(model_files, name):
+    model = utils.get_model(model_files[name])
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        forbid_weight_reads(monkeypatch)
+        metadata = inspection.read_metadata(model_files[name])
+    report = inspection.get_report(metadata, batch_size=32, gflops=10, bandwidth=10)
+    assert report["parameters"] == sum(
+        layer["W"].size + layer["b"].size for layer in model["layers"]
+    )
+    assert report["memory_bytes"] == cache.get_model_nbytes(model)
+    assert report["flops_per_sample"] == sum(
+        2 * layer["W"].size + layer["b"].size for layer in model["layers"]
+    )
+    assert report["compute_dtype"] == "float32"
+    if name == "int8":
+        assert report["quantization"] == "int8"
+    # Quantized weights do not get copied for the evaluation
+    assert report["compiled_bytes"] == 0
+    assert report["peak_bytes"] > report["memory_bytes"]
+    # The largest layer is compute-bound at 10 GFLOP/s and batch size 32
+    assert report["latency_s"] == pytest.approx(
+        32 * report["flops_per_sample"] / 10**10
+    )
+
+
+def test_main(monkeypatch, capsys):
+    forbid_weight_reads(monkeypatch)
+    report = inspection.main(model_file, batch_size=4, gflops=1, bandwidth=1)
+    assert report["parameters"] == 519369
+    assert "Parameters: 519369" in capsys.readouterr().out
+
+
+def test_measure():
+    assert inspection.measure_gflops(n=64) > 0
+    assert inspection.measure_bandwidth(n_bytes=2**20) > 0
+
+
+def test_cli_inspect(tmp_path):
+    result = CliRunner().invoke(
+        cli.inspect, [model_file, "--batchsize", "64", "--gflops", "5"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Estimates for batch size 64" in result.output
+
+    not_a_model = str(tmp_path / "model.tar")
+    with open(not_a_model, "w") as f:
+        f.write("no model")
+    result = CliRunner().invoke(cli.inspect, [not_a_model])
+    assert result.exit_code == 2
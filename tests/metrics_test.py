@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import os
+
+# Third party modules
+import h5py
+import numpy
+import pytest
+from click.testing import CliRunner
+
+# First party modules
+import nntoolkit.cli as cli
+import nntoolkit.metrics as metrics
+import nntoolkit.test as test
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+def get_outputs(n_rows=200, n_classes=7, seed=0):
+    rng = numpy.random.RandomState(seed)
+    outputs = rng.uniform(size=(n_rows, n_classes))
+    outputs /= outputs.sum(axis=1, keepdims=True)
+    labels = rng.randint(0, n_classes, size=n_rows)
+    return outputs, labels
+
+
+def test_matches_reference():
+    outputs, labels = get_outputs()
+    accumulator = metrics.MetricsAccumulator(k=3)
+    for start in range(0, len(labels), 64):
+        accumulator.update(outputs[start : start + 64], labels[start : start + 64])
+    result = accumulator.result()
+
+    predictions = numpy.argmax(outputs, axis=1)
+    assert result["accuracy"] == numpy.mean(predictions == labels)
+    confusion = numpy.zeros((7, 7), dtype=int)
+    for label, prediction in zip(labels, predictions):
+        confusion[label, prediction] += 1
+    numpy.testing.assert_array_equal(result["confusion"], confusion)
+    numpy.testing.assert_allclose(
+        result["recall"], numpy.diag(confusion) / confusion.sum(axis=1)
+    )
+    numpy.testing.assert_allclose(
+        result["precision"], numpy.diag(confusion) / confusion.sum(axis=0)
+    )
+    top_3 = numpy.argsort(-outputs, axis=1)[:, :3]
+    assert result["top_k"][3] == numpy.mean((top_3 == labels[:, None]).any(axis=1))
+    assert result["top_k"][1] == result["accuracy"]
+    expected_log_loss = -numpy.mean(numpy.log(outputs[numpy.arange(200), labels]))
+    assert result["log_loss"] == pytest.approx(expected_log_loss)
+
+
+def test_merge():
+    outputs, labels = get_outputs()
+    full = metrics.MetricsAccumulator()
+    full.update(outputs, labels)
+    merged = metrics.MetricsAccumulator()
+    for start in [0, 100]:
+        part = metrics.MetricsAccumulator()
+        part.update(outputs[start : start + 100], labels[start : start + 100])
+        merged.merge(part)
+    numpy.testing.assert_array_equal(merged.confusion, full.confusion)
+    assert merged.result()["top_k"] == full.result()["top_k"]
+    assert merged.result()["log_loss"] == pytest.approx(full.result()["log_loss"])
+
+
+def test_selected_metrics():
+    outputs, labels = get_outputs()
+    accumulator = metrics.MetricsAccumulator(metrics=["log_loss"])
+    accumulator.update(outputs, labels)
+    assert accumulator.confusion is None
+    assert set(accumulator.result()) == {"samples", "accuracy", "log_loss"}
+
+
+def test_invalid_labels():
+    outputs, _ = get_outputs(n_rows=2, n_classes=3)
+    with pytest.raises(ValueError):
+        metrics.MetricsAccumulator().update(outputs, [0, 3])
+    with pytest.raises(ValueError):
+        metrics.parse_metrics("accuracy,f2")
+
+
+def test_main_jobs(test_data):
+    single = metrics.MetricsAccumulator()
+    test.main(model_file, test_data, verbose=False, batch_size=32, accumulator=single)
+    parallel = metrics.MetricsAccumulator()
+    test.main(
+        model_file,
+        test_data,
+        verbose=False,
+        batch_size=32,
+        jobs=2,
+        accumulator=parallel,
+    )
+    assert parallel.n_samples == single.n_samples == 250
+    numpy.testing.assert_array_equal(parallel.confusion, single.confusion)
+    assert parallel.result()["top_k"] == single.result()["top_k"]
+
+    # Counts of the accumulator which was passed in get added only once
+    test.main(
+        model_file,
+        test_data,
+        verbose=False,
+        batch_size=32,
+        jobs=2,
+        accumulator=parallel,
+    )
+    assert parallel.n_samples == 2 * single.n_samples
+    numpy.testing.assert_array_equal(parallel.confusion, 2 * single.confusion)
+
+
+def test_predictions_file(tmp_path, test_data):
+    predictions_file = str(tmp_path / "predictions.hdf5")
+    accuracy = test.main(
+        model_file,
+        test_data,
+        verbose=False,
+        batch_size=50,
+        predictions_file=predictions_file,
+        k=2,
+    )
+    with h5py.File(predictions_file, "r") as f, h5py.File(test_data, "r") as d:
+        assert f["indices"].shape == (250, 2)
+        assert f["probabilities"].shape == (250, 2)
+        numpy.testing.assert_array_equal(f["labels"][()], d["labels"][()])
+        assert numpy.mean(f["indices"][:, 0] == f["labels"][()]) == accuracy
+
+
+def test_cli_metrics(test_data):
+    result = CliRunner().invoke(
+        cli.test, ["-m", model_file, "-i", test_data, "--metrics", "all", "-k", "3"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Top-3 accuracy" in result.output
+    assert "Log-loss" in result.output
+    assert "Most frequent confusions" in result.output
+
+
+def test_cli_predictions_without_metrics(tmp_path, test_data):
+    predictions_file = str(tmp_path / "predictions.hdf5")
+    result = CliRunner().invoke(
+        cli.test,
+        [
+            "-m",
+            model_file,
+            "-i",
+            test_data,
+            "-k",
+            "2",
+            "--predictions",
+            predictions_file,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    with h5py.File(predictions_file, "r") as f:
+        assert f["indices"].shape == (250, 2)
+        assert f["probabilities"].shape == (250, 2)
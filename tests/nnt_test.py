@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import os
+
+# Third party modules
+import numpy
+import pytest
+
+# First party modules
+import nntoolkit.nnt as nnt
+import nntoolkit.utils as utils
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+def assert_same_model(a, b):
+    assert a["type"] == b["type"]
+    assert a["inputs"] == b["inputs"]
+    assert a["outputs"] == b["outputs"]
+    for layer_a, layer_b in zip(a["layers"], b["layers"]):
+        numpy.testing.assert_array_equal(layer_a["W"], layer_b["W"])
+        numpy.testing.assert_array_equal(layer_a["b"], layer_b["b"])
+        assert str(layer_a["activation"]) == str(layer_b["activation"])
+
+
+def test_convert_roundtrip(tmp_path):
+    nnt_file = str(tmp_path / "model.nnt")
+    tar_file = str(tmp_path / "model.tar")
+    assert utils.convert_model(model_file, nnt_file)
+    assert nnt.is_nnt_file(nnt_file)
+    assert not nnt.is_nnt_file(model_file)
+    assert utils.convert_model(nnt_file, tar_file)
+
+    model = utils.get_model(model_file)
+    assert_same_model(model, utils.get_model(nnt_file))
+    assert_same_model(model, utils.get_model(tar_file))
+
+
+def test_weights_are_memory_mapped(tmp_path):
+    nnt_file = str(tmp_path / "model.nnt")
+    nnt.write_model(utils.get_model(model_file), nnt_file)
+    model = nnt.read_model(nnt_file)
+    for layer in model["layers"]:
+        assert isinstance(layer["W"].base, numpy.memmap)
+        assert not layer["W"].flags.writeable
+        assert layer["W"].flags.aligned
+    model = nnt.read_model(nnt_file, mmap=False)
+    assert not isinstance(model["layers"][0]["W"].base, numpy.memmap)
+
+
+def test_read_header_rejects_other_files():
+    with pytest.raises(ValueError):
+        nnt.read_header(model_file)
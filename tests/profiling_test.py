@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import json
+import os
+import pickle
+
+# Third party modules
+import h5py
+import numpy
+from click.testing import CliRunner
+
+# First party modules
+import nntoolkit.cache as cache
+import nntoolkit.cli as cli
+import nntoolkit.profiling as profiling
+import nntoolkit.test as test
+import nntoolkit.utils as utils
+from nntoolkit.inference import CompiledMLP
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+def test_disabled_by_default():
+    assert profiling.get_profiler() is None
+    with profiling.stage("nothing"):
+        pass
+    assert profiling.get_profiler() is None
+
+
+def test_layer_profile():
+    model = utils.get_model(model_file)
+    predictor = CompiledMLP(model)
+    x = numpy.random.RandomState(0).uniform(size=(8, 167))
+    expected = predictor.predict(x)
+    with profiling.enable() as profiler:
+        numpy.testing.assert_array_equal(predictor.predict(x), expected)
+    report = profiler.report()
+    W = model["layers"][0]["W"]
+    assert report["layer 0: dot"]["flops"] == 2 * 8 * W.shape[0] * W.shape[1]
+    assert report["layer 2: Softmax"]["calls"] == 1
+    # The shares are fractions of the wall time
+    assert 0 < report["layer 0: dot"]["share"] <= 1
+    assert sum(stats["share"] for stats in report.values()) <= 1
+
+
+def test_load_stages():
+    with profiling.enable() as profiler:
+        utils.get_model(model_file)
+    assert profiler.report()["load: hdf5"]["calls"] == 3
+
+
+def test_cache_hit_stage():
+    model_cache = cache.ModelCache()
+    model_cache.get(model_file)
+    with profiling.enable() as profiler:
+        model_cache.get(model_file)
+    report = profiler.report()
+    assert report["load: cache hit"]["calls"] == 1
+    assert "load: hdf5" not in report
+
+
+def test_share_of_nested_stages():
+    profiler = profiling.Profiler()
+    profiler.add("outer", 0.2)
+    profiler.add("inner", 0.1)
+    profiler.started = 0.0
+    profiler.stopped = 0.4
+    report = profiler.report()
+    assert report["outer"]["share"] == 0.5
+    assert report["inner"]["share"] == 0.25
+
+
+def test_histogram():
+    profiler = profiling.Profiler()
+    for seconds in [0.0001, 0.0001, 0.003]:
+        profiler.add("stage", seconds)
+    counts = profiler.report()["stage"]["histogram"]["counts"]
+    assert sum(counts) == 3
+    assert counts[profiling.HISTOGRAM_EDGES_MS.index(0.1)] == 2
+
+
+def test_merge_pickled_profiler():
+    worker = profiling.Profiler()
+    worker.add("stage", 0.5, flops=10)
+    profiler = profiling.Profiler()
+    profiler.add("stage", 0.5, flops=10)
+    profiler.merge(pickle.loads(pickle.dumps(worker)))
+    assert profiler.report()["stage"]["calls"] == 2
+    assert profiler.report()["stage"]["flops"] == 20
+
+
+def test_profile_jobs(tmp_path):
+    data_file = str(tmp_path / "testdata.hdf5")
+    rng = numpy.random.RandomState(0)
+    with h5py.File(data_file, "w") as f:
+        f.create_dataset("data", data=rng.uniform(-1, 1, size=(64, 167)))
+        f.create_dataset("labels", data=rng.randint(0, 369, size=64))
+    with profiling.enable() as profiler:
+        test.main(model_file, data_file, verbose=False, batch_size=16, jobs=2)
+    assert profiler.report()["batch"]["calls"] == 4
+
+
+def test_cli_profile_json(tmp_path):
+    vec_file = str(tmp_path / "vec.json")
+    with open(vec_file, "w") as f:
+        json.dump([[0.1] * 167], f)
+    profile_file = str(tmp_path / "profile.json")
+    result = CliRunner().invoke(
+        cli.evaluate,
+        ["-m", model_file, "-i", vec_file, "--profile", "--profile-json", profile_file],
+    )
+    assert result.exit_code == 0, result.output
+    assert "layer 0: dot" in result.output
+    with open(profile_file) as f:
+        assert "layer 0: dot" in json.load(f)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import os
+
+# Third party modules
+import numpy
+import pytest
+
+# First party modules
+import nntoolkit.evaluate as evaluate
+import nntoolkit.quantize as quantize
+import nntoolkit.utils as utils
+from nntoolkit.inference import CompiledMLP
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+def test_quantize_int8_error():
+    W = numpy.random.RandomState(0).normal(size=(50, 20))
+    W_int8, scale = quantize.quantize_int8(W)
+    assert W_int8.dtype == numpy.int8
+    assert numpy.all(numpy.abs(W_int8 * scale - W) <= scale / 2 + 1e-6)
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_quantized_output(quantization):
+    model = utils.get_model(model_file)
+    x = numpy.random.RandomState(1).uniform(-1, 1, size=(20, 167))
+    quantized = quantize.quantize_model(model, quantization, x)
+    expected = CompiledMLP(model).predict(x)
+    compiled = CompiledMLP(quantized)
+    assert compiled.dtype == numpy.float32
+    for layer, stored in zip(compiled.layers, quantized["layers"]):
+        assert layer.W.dtype == stored["W"].dtype
+    output = compiled.predict(x)
+    numpy.testing.assert_allclose(output, expected, atol=0.05)
+    numpy.testing.assert_allclose(
+        evaluate.get_batch_output(quantized, x), output, rtol=1e-3, atol=1e-5
+    )
+
+
+@pytest.mark.parametrize("extension", [".tar", ".nnt"])
+def test_save_quantized(tmp_path, extension):
+    quantized = quantize.quantize_model(utils.get_model(model_file), "int8")
+    path = str(tmp_path / f"model{extension}")
+    utils.save_model(quantized, path)
+    loaded = utils.get_model(path)
+    assert loaded["quantization"] == "int8"
+    for layer, expected in zip(loaded["layers"], quantized["layers"]):
+        assert layer["W"].dtype == numpy.int8
+        numpy.testing.assert_array_equal(layer["W"], expected["W"])
+        numpy.testing.assert_array_equal(layer["W_scale"], expected["W_scale"])
+
+
+def test_main(tmp_path, test_data, capsys):
+    output_file = str(tmp_path / "model.nnt")
+    report = quantize.main(model_file, output_file, test_data, "int8", 64)
+    assert report["int8"]["file_bytes"] < report["original"]["file_bytes"] / 3
+    assert abs(report["int8"]["accuracy"] - report["original"]["accuracy"]) < 0.05
+    assert "Accuracy delta" in capsys.readouterr().out
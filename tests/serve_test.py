@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import asyncio
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Third party modules
+import numpy
+import pytest
+
+# First party modules
+import nntoolkit.evaluate as evaluate
+import nntoolkit.serve as serve
+from nntoolkit.batching import AsyncPredictor, MicroBatcher
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+@pytest.fixture
+def url():
+    model_server = serve.ModelServer({"model": model_file}, max_wait=0.05)
+    server = serve.create_server(model_server, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%i" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    model_server.close()
+
+
+def post(url, content):
+    request = urllib.request.Request(
+        url, data=json.dumps(content).encode("utf8"), method="POST"
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_predictions_match_evaluate(url):
+    rng = numpy.random.RandomState(0)
+    features = rng.uniform(size=(16, 167)).tolist()
+    with ThreadPoolExecutor(16) as executor:
+        responses = list(
+            executor.map(
+                lambda x: post(url + "/models/model/predict", {"features": x, "k": 3}),
+                features,
+            )
+        )
+    for x, response in zip(features, responses):
+        expected = evaluate.main(model_file, x, print_results=False)[:3]
+        assert [r["symbolnr"] for r in response] == [r["symbolnr"] for r in expected]
+        numpy.testing.assert_allclose(
+            [r["probability"] for r in response],
+            [r["probability"] for r in expected],
+            rtol=1e-5,
+        )
+
+    with urllib.request.urlopen(url + "/stats") as response:
+        stats = json.loads(response.read())["model"]
+    assert stats["requests"] == 16
+    assert stats["batches"] < 16
+    assert stats["p99_ms"] >= stats["p50_ms"]
+
+
+def test_bad_request(url):
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        post(url + "/models/model/predict", {"features": [1, 2, 3]})
+    assert excinfo.value.code == 400
+
+
+def test_micro_batcher_limits_batch_size():
+    batch_sizes = []
+
+    def predict(x):
+        batch_sizes.append(len(x))
+        return x * 2
+
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait=0.05)
+    futures = [batcher.submit([i]) for i in range(10)]
+    assert [f.result()[0] for f in futures] == [2 * i for i in range(10)]
+    batcher.close()
+    assert max(batch_sizes) <= 4
+    assert sum(batch_sizes) == 10
+
+
+def test_micro_batcher_rejects_other_shapes():
+    batcher = MicroBatcher(lambda x: x * 2, max_wait=0.05, n_inputs=2)
+    good = batcher.submit([1, 2])
+    with pytest.raises(ValueError):
+        batcher.submit([1, 2, 3])
+    numpy.testing.assert_array_equal(good.result(), [2, 4])
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit([1, 2])
+
+
+def test_micro_batcher_submit_races_close():
+    # Every accepted request gets resolved, even if close() runs concurrently
+    for _ in range(20):
+        batcher = MicroBatcher(lambda x: x, max_wait=0)
+        futures = []
+
+        def submit_all():
+            for i in range(200):
+                try:
+                    futures.append(batcher.submit([i]))
+                except RuntimeError:
+                    return
+
+        thread = threading.Thread(target=submit_all)
+        thread.start()
+        batcher.close()
+        thread.join()
+        for future in futures:
+            future.result(timeout=5)
+
+
+def test_async_predictor():
+    rng = numpy.random.RandomState(0)
+    features = rng.uniform(size=(20, 167))
+
+    async def classify():
+        async with await AsyncPredictor.open(model_file, max_wait=0.05) as predictor:
+            results = await asyncio.gather(*[predictor.predict(x) for x in features])
+        # Leaving the context stopped the background thread
+        assert not predictor._batcher._thread.is_alive()
+        return results, predictor.stats()
+
+    results, stats = asyncio.run(classify())
+    assert stats["requests"] == 20
+    assert stats["batches"] < 20
+    for x, result in zip(features, results):
+        expected = evaluate.main(model_file, x, print_results=False)
+        assert [r["symbolnr"] for r in result] == [r["symbolnr"] for r in expected]
+
+
+def test_unix_socket_replaces_only_sockets(tmp_path):
+    model_server = serve.ModelServer({"model": model_file})
+    path = str(tmp_path / "data.txt")
+    with open(path, "w") as f:
+        f.write("important")
+    with pytest.raises(FileExistsError):
+        serve.create_server(model_server, unix_socket=path)
+    with open(path) as f:
+        assert f.read() == "important"
+
+    # A socket of an earlier server gets replaced
+    path = str(tmp_path / "nntoolkit.sock")
+    for _ in range(2):
+        server = serve.create_server(model_server, unix_socket=path)
+        server.server_close()
+    model_server.close()
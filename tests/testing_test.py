@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import os
+
+# Third party modules
+import numpy
+import pytest
+
+# First party modules
+import nntoolkit.data as data
+import nntoolkit.evaluate as evaluate
+import nntoolkit.test as test
+import nntoolkit.utils as utils
+
+current_folder = os.path.dirname(os.path.realpath(__file__))
+model_file = os.path.join(current_folder, "misc", "model.tar")
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 100, 1024])
+def test_batched_accuracy_matches_per_row(test_data, batch_size):
+    """The batched test engine reports the same accuracy as a per-row loop."""
+    model = utils.get_model(model_file)
+    x_vec, y_vec = utils.get_data(test_data)
+    correct = 0
+    for x, y in zip(x_vec, y_vec):
+        y_pred = evaluate.get_model_output(model, numpy.array([x]))
+        if numpy.argmax(y_pred) == y[0]:
+            correct += 1
+    expected = float(correct) / len(x_vec)
+
+    accuracy = test.main(model_file, test_data, verbose=False, batch_size=batch_size)
+    assert accuracy == expected
+
+
+def test_jobs(test_data, capsys):
+    expected = test.main(model_file, test_data, verbose=False, batch_size=32)
+    accuracy = test.main(model_file, test_data, verbose=False, batch_size=32, jobs=3)
+    assert accuracy == expected
+    assert "Scaling efficiency" in capsys.readouterr().out
+
+
+def test_npy_matches_hdf5(tmp_path, test_data):
+    x, y = utils.get_data(test_data)
+    npy_file = str(tmp_path / "testdata.npy")
+    numpy.save(npy_file, x)
+    numpy.save(data.get_labels_file(npy_file), y.reshape(-1))
+    expected = test.main(model_file, test_data, verbose=False, batch_size=32)
+    assert test.main(model_file, npy_file, verbose=False, batch_size=32) == expected
+    assert test.main(model_file, npy_file, verbose=False, jobs=2) == expected
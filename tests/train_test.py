@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+# Core Library modules
+import logging
+import os
+import tracemalloc
+
+# Third party modules
+import h5py
+import numpy
+
+# First party modules
+import nntoolkit.train as train
+import nntoolkit.utils as utils
+from nntoolkit.activation_functions import Sigmoid, Softmax
+from nntoolkit.inference import CompiledMLP
+
+
+def create_model(neurons, seed=0):
+    rng = numpy.random.RandomState(seed)
+    layers = [
+        {
+            "W": rng.uniform(-1, 1, size=(n_in, n_out)),
+            "b": rng.uniform(-1, 1, size=n_out),
+            "activation": Sigmoid(),
+        }
+        for n_in, n_out in zip(neurons, neurons[1:])
+    ]
+    layers[-1]["activation"] = Softmax()
+    return {
+        "type": "mlp",
+        "layers": layers,
+        "inputs": [f"input {i}" for i in range(neurons[0])],
+        "outputs": [f"output {i}" for i in range(neurons[-1])],
+    }
+
+
+def get_loss(model, x, y):
+    output = CompiledMLP(model).predict(x)
+    return -numpy.mean(numpy.log(output[numpy.arange(len(y)), y]))
+
+
+def test_train_batch_uses_preallocated_buffers():
+    trainer = train.NumpyMLPTrainer(create_model([50, 400, 400, 10]))
+    rng = numpy.random.RandomState(0)
+    x = rng.uniform(size=(256, 50)).astype(numpy.float32)
+    y = rng.randint(0, 10, size=256)
+    trainer.train_batch(x, y)
+    tracemalloc.start()
+    try:
+        trainer.train_batch(x, y)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Far less than one 256x400 float32 activation (400 KB)
+    assert peak < 100 * 1024
+
+
+def test_gradients_match_finite_differences():
+    model = create_model([3, 4, 5, 2])
+    rng = numpy.random.RandomState(1)
+    x, y = rng.uniform(size=(6, 3)), rng.randint(0, 2, size=6)
+    lr = 1e-3
+    trainer = train.NumpyMLPTrainer(model, lr=lr, momentum=0, dtype=numpy.float64)
+    loss = trainer.train_batch(x, y)
+    assert numpy.isclose(loss, get_loss(model, x, y))
+
+    eps = 1e-6
+    for layer, trained_layer in zip(model["layers"], trainer.model["layers"]):
+        for key in "Wb":
+            gradient = (layer[key] - trained_layer[key]) / lr
+            numeric = numpy.zeros_like(layer[key])
+            for index in numpy.ndindex(layer[key].shape):
+                original = layer[key][index]
+                layer[key][index] = original + eps
+                loss_plus = get_loss(model, x, y)
+                layer[key][index] = original - eps
+                loss_minus = get_loss(model, x, y)
+                layer[key][index] = original
+                numeric[index] = (loss_plus - loss_minus) / (2 * eps)
+            numpy.testing.assert_allclose(gradient, numeric, rtol=1e-4, atol=1e-8)
+
+
+def test_numpy_engine(tmp_path):
+    rng = numpy.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(500, 2))
+    y = (x[:, 0] * x[:, 1] > 0).astype(int)
+    training_data = str(tmp_path / "train.hdf5")
+    with h5py.File(training_data, "w") as f:
+        f.create_dataset("data", data=x)
+        f.create_dataset("labels", data=y)
+    model_file = str(tmp_path / "model.tar")
+    train.main(
+        create_model([2, 16, 2]),
+        model_file,
+        training_data,
+        batch_size=16,
+        learning_rate=0.5,
+        epochs=150,
+        momentum=0.9,
+        engine="numpy",
+    )
+    assert os.path.isfile(model_file)
+    y_pred = CompiledMLP(utils.get_model(model_file)).predict(x).argmax(axis=1)
+    assert numpy.mean(y_pred == y) > 0.9
+
+
+def test_numpy_engine_shuffle_buffer(tmp_path, caplog):
+    rng = numpy.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(512, 2))
+    y = (x[:, 0] > 0).astype(int)
+    training_data = str(tmp_path / "train.hdf5")
+    with h5py.File(training_data, "w") as f:
+        f.create_dataset("data", data=x, chunks=(32, 2))
+        f.create_dataset("labels", data=y)
+    model_file = str(tmp_path / "model.tar")
+    with caplog.at_level(logging.INFO, logger="nntoolkit.train"):
+        train.main(
+            create_model([2, 8, 2]),
+            model_file,
+            training_data,
+            batch_size=16,
+            learning_rate=0.5,
+            epochs=30,
+            engine="numpy",
+            shuffle_buffer=64,
+            seed=0,
+        )
+    assert "Peak RSS" in caplog.text
+    y_pred = CompiledMLP(utils.get_model(model_file)).predict(x).argmax(axis=1)
+    assert numpy.mean(y_pred == y) > 0.9
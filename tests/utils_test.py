@@ -3,6 +3,7 @@
 # Core Library modules
 import argparse
 import os
+import tarfile
 
 # Third party modules
 import pytest
@@ -32,3 +33,31 @@ def test_is_valid_folder():
     # Does not exist
     with pytest.raises(SystemExit):
         utils.is_valid_folder(parser, "/etc/nonexistingfoler")
+
+
+def test_get_model_reads_from_tar(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("get_model must not extract the model")
+
+    monkeypatch.setattr(utils.tempfile, "mkdtemp", fail)
+    current_folder = os.path.dirname(os.path.realpath(__file__))
+    model = utils.get_model(os.path.join(current_folder, "misc", "model.tar"))
+    assert [layer["W"].shape for layer in model["layers"]] == [
+        (167, 500),
+        (500, 500),
+        (500, 369),
+    ]
+    assert [str(layer["activation"]) for layer in model["layers"]] == [
+        "Sigmoid",
+        "Sigmoid",
+        "Softmax",
+    ]
+    assert len(model["inputs"]) == 167
+    assert len(model["outputs"]) == 369
+
+
+def test_get_model_without_model_yml(tmp_path):
+    model_file = str(tmp_path / "model.tar")
+    with tarfile.open(model_file, "w:") as tar:
+        tar.add(os.path.realpath(__file__), arcname="input_semantics.csv")
+    assert utils.get_model(model_file) is None